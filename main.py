@@ -1,10 +1,74 @@
 from fastapi import FastAPI
+from contextlib import asynccontextmanager
 from modules.routes import router as api_routes
 from fastapi.middleware.cors import CORSMiddleware
-from modules.core.env import ALLOWED_ORIGINS, ALLOWED_ORIGINS_REGEX
+from modules.core.env import (
+    ALLOWED_ORIGINS, ALLOWED_ORIGINS_REGEX, COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER,
+    COSMOS_CONNECTION_STRING, SB_CONNECTION_STR, SB_EMAIL_QUEUE
+)
+from modules.core.middlewares.cosmos_metrics import CosmosMetricsMiddleware
 from modules.core.middlewares.authentication import AuthenticationMiddleware
+from modules.core.services.azure.blob_cache import close_blob_disk_cache
+from modules.core.services.azure.blob_storage_aio import close_async_blob_storage
+from modules.core.services.azure.cosmosdb import CosmosDB, close_cosmos_client
+from modules.core.services.azure.cosmosdb_aio import close_async_cosmos_client
+from modules.core.services.azure.service_bus import (
+    AzureServiceBusService, close_servicebus
+)
+from modules.core.services.email.smtp_mail import close_smtp_pools
+from modules.core.services.email.notification_coalescer import notification_coalescer
+from modules.core.services.email.jinja_environment import precompile_templates
+from modules.core.services.utils.task_dispatcher import task_dispatcher
+from modules.core.services.logging.audit_log_writer import audit_log_writer
+from modules.core.services.logging.audit_session_events import (
+    register_audit_session_events
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application startup and shutdown. Long-lived clients (connection pools)
+    are opened here and closed when the application stops.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    if COSMOS_CONNECTION_STRING:
+        CosmosDB().provision_containers(
+            [COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER])
+        audit_log_writer.start()
 
-app = FastAPI()
+    if SB_CONNECTION_STR:
+        AzureServiceBusService().open_senders([SB_EMAIL_QUEUE])
+
+    # Email templates compiled once, rendered from memory afterwards
+    precompile_templates()
+
+    # Post-response side effects (e.g. notifications)
+    task_dispatcher.start()
+
+    yield
+
+    # First: the remaining tasks may write audit logs and notifications
+    task_dispatcher.stop()
+    audit_log_writer.stop()
+    # Sends the buffered notifications (inline, the dispatcher is stopped)
+    # before the Service Bus client is closed
+    notification_coalescer.close()
+    close_servicebus()
+    close_smtp_pools()
+    close_blob_disk_cache()
+    await close_async_blob_storage()
+    await close_async_cosmos_client()
+    close_cosmos_client()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Audit logs of the BaseDB models, written once per committed transaction
+register_audit_session_events()
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,6 +84,11 @@ app.add_middleware(
     AuthenticationMiddleware,
 )
 
+# CosmosDB request charge (RU) and latency totals in the response headers
+app.add_middleware(
+    CosmosMetricsMiddleware,
+)
+
 # API Routes
 app.include_router(api_routes)
 
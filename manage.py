@@ -58,5 +58,174 @@ def initdata():
     init_data()
 
 
+@cli.command()
+@click.option('--source', required=True, help='Source CosmosDB container id')
+@click.option('--target', required=True, help='Target CosmosDB container id')
+@click.option('--partition-key', required=True,
+              help='Target partition key path (e.g. "/object_uuid" or "/user_month")')
+@click.option('--concurrency', default=16, show_default=True,
+              help='Max concurrent writes')
+def repartitioncontainer(source, target, partition_key, concurrency):
+    """
+    Copy a CosmosDB container into a new one with another partition key.
+    It can be re-run safely (items are upserted). After the copy, point the
+    container env variable (e.g. "COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER")
+    to the target and set its partition key (e.g. "COSMOS_AUDIT_LOG_PARTITION_KEY").
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    from modules.core.services.azure.cosmosdb import CosmosDB
+
+    click.echo(f"Copying '{source}' into '{target}' ({partition_key})...")
+    result = CosmosDB().copy_container(
+        source, target, partition_key, max_concurrency=concurrency)
+
+    for error in result['errors']:
+        click.echo(
+            f"Failed item '{error['id']}' ({error['status_code']}): {error['error']}")
+    click.echo(f"Copied items: {result['copied']}. Failed items: {result['failed']}.")
+
+
+@cli.command()
+@click.option('--rows', default=500, show_default=True, help='Amount of rows')
+@click.option('--columns', default=60, show_default=True, help='Columns of each row')
+@click.option('--children', default=20, show_default=True,
+              help='Loaded related objects of each row')
+def benchmarkauditserializer(rows, columns, children):
+    """
+    Benchmark the audit logs serialization (former deepcopy + indented JSON
+    against the column-only compact serializer) on wide rows with
+    loaded relationships
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    from modules.core.services.logging.audit_serializer_benchmark import (
+        run_audit_serializer_benchmark
+    )
+
+    result = run_audit_serializer_benchmark(rows, columns, children)
+
+    click.echo(
+        f"{result['rows']} rows, {result['columns']} columns, "
+        f"{result['children']} loaded children per row")
+    for name in ('legacy', 'current'):
+        click.echo(
+            f"{name:>8}: {result[name]['seconds']:.4f}s, "
+            f"{result[name]['avg_json_bytes']} bytes per log")
+    click.echo(
+        f"Speedup: {result['legacy']['seconds'] / result['current']['seconds']:.1f}x")
+
+
+@cli.command()
+@click.option('--requeue-dead-letters', is_flag=True, default=False,
+              help='Move the dead-lettered audit logs back to the spool first')
+def replayauditlogs(requeue_dead_letters):
+    """
+    Write the audit logs waiting in the local spool ("AUDIT_LOG_SPOOL_PATH")
+    to CosmosDB, e.g. after an outage while the application is stopped.
+    It is safe to run along the application (items are leased and upserted).
+    With "--requeue-dead-letters" the audit logs CosmosDB rejected too many
+    times are replayed again (e.g. once the cause was fixed).
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    from modules.core.services.logging.audit_log_writer import audit_log_writer
+
+    if audit_log_writer.spool is None:
+        click.echo("The audit logs spool is disabled (AUDIT_LOG_SPOOL_PATH).")
+        return
+
+    if requeue_dead_letters:
+        requeued = audit_log_writer.spool.requeue_dead_letters()
+        click.echo(f"Requeued dead-lettered audit logs: {requeued}")
+
+    click.echo(f"Spooled audit logs: {audit_log_writer.spool.count()}")
+    result = audit_log_writer.replay_spool()
+    click.echo(
+        f"Written: {result['written']}. Failed: {result['failed']} "
+        f"({result['dead_lettered']} dead-lettered, the others kept for retry). "
+        f"Remaining: {audit_log_writer.spool.count()}.")
+
+
+@cli.command()
+@click.option('--queue', 'queue_name', default=None,
+              help='Queue to consume (default: "SB_EMAIL_QUEUE")')
+@click.option('--receivers', default=None, type=int,
+              help='Concurrent receivers (default: "SB_WORKER_RECEIVERS")')
+@click.option('--prefetch', default=None, type=int,
+              help='Messages prefetched by each receiver (default: "SB_WORKER_PREFETCH")')
+@click.option('--batch-size', default=None, type=int,
+              help='Messages received and settled together (default: "SB_WORKER_BATCH_SIZE")')
+@click.option('--local', 'local_messages', default=0, show_default=True,
+              help='Measure the throughput on an in-memory queue with this amount '
+                   'of messages (no Azure connection, nothing is sent)')
+@click.option('--handler-latency-ms', default=10.0, show_default=True,
+              help='Simulated handler time of each message (with --local)')
+@click.option('--network-latency-ms', default=2.0, show_default=True,
+              help='Simulated round trip of each receive and settlement (with --local)')
+def servicebusworker(queue_name, receivers, prefetch, batch_size, local_messages,
+                     handler_latency_ms, network_latency_ms):
+    """
+    Consume a Service Bus queue with its registered handler (e.g. send the
+    queued emails), until SIGINT/SIGTERM. With "--local" it drains an
+    in-memory queue instead and prints the throughput.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    import time
+    from modules.core.env import SB_EMAIL_QUEUE
+    from modules.core.services.azure.service_bus import close_servicebus
+    from modules.core.services.email.smtp_mail import close_smtp_pools
+    from modules.core.services.azure.service_bus_worker import ServiceBusWorker
+    from modules.core.services.azure.service_bus_local import (
+        LocalServiceBusClient, LocalServiceBusMessage
+    )
+    # Registers the email queue handler
+    import modules.core.services.email.queue_handlers  # noqa: F401
+
+    queue_name = queue_name or SB_EMAIL_QUEUE
+    options = {
+        key: value for key, value in (
+            ('receivers', receivers), ('prefetch', prefetch), ('batch_size', batch_size)
+        ) if value is not None
+    }
+
+    if not local_messages:
+        click.echo(f"Consuming '{queue_name}'...")
+        try:
+            stats = ServiceBusWorker(queue_name, **options).run()
+        finally:
+            close_servicebus()
+            close_smtp_pools()
+        click.echo(
+            f"Completed: {stats['completed']}. Abandoned: {stats['abandoned']}. "
+            f"{stats['messages_per_second']} messages/s.")
+        return
+
+    servicebus_client = LocalServiceBusClient(latency_ms=network_latency_ms)
+    local_queue = servicebus_client.get_queue(queue_name)
+    for index in range(local_messages):
+        local_queue.put(LocalServiceBusMessage(f'{{"index": {index}}}'))
+
+    def handler(message):
+        time.sleep(handler_latency_ms / 1000)
+
+    stats = ServiceBusWorker(
+        queue_name, handler=handler, max_wait_time=0.2, lock_renewal_seconds=0,
+        servicebus_client=servicebus_client, stop_when_idle=True, **options
+    ).run()
+    click.echo(
+        f"{stats['completed']} messages in {stats['seconds']}s "
+        f"({stats['batches']} batches): {stats['messages_per_second']} messages/s")
+
+
 if __name__ == '__main__':
     cli()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 
 
 SECRET_KEY = os.getenv('SECRET_KEY')
@@ -12,6 +13,23 @@ AZURE_VLTSTORAGESERVICE1_CONNECTION_STRING = os.getenv(
     'AZURE_VLTSTORAGESERVICE1_CONNECTION_STRING')
 AZURE_VLTSTORAGESERVICE1_CONTAINER = os.getenv(
     'AZURE_VLTSTORAGESERVICE1_CONTAINER')
+AZURE_BLOB_MAX_CONNECTIONS = int(os.getenv('AZURE_BLOB_MAX_CONNECTIONS', 100))
+AZURE_BLOB_MAX_CONCURRENT_UPLOADS = int(
+    os.getenv('AZURE_BLOB_MAX_CONCURRENT_UPLOADS', 16))
+AZURE_BLOB_CACHE_DIR = os.getenv(
+    'AZURE_BLOB_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'blob_cache'))
+AZURE_BLOB_CACHE_MAX_BYTES = int(
+    os.getenv('AZURE_BLOB_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+AZURE_BLOB_CACHE_REVALIDATE_SECONDS = float(
+    os.getenv('AZURE_BLOB_CACHE_REVALIDATE_SECONDS', 30))
+AZURE_BLOB_FILES_COUNT_CACHE_SECONDS = float(
+    os.getenv('AZURE_BLOB_FILES_COUNT_CACHE_SECONDS', 60))
+AZURE_BLOB_SAS_EXPIRY_MINUTES = int(
+    os.getenv('AZURE_BLOB_SAS_EXPIRY_MINUTES', 15))
+AZURE_BLOB_SAS_MAX_UPLOAD_BYTES = int(
+    os.getenv('AZURE_BLOB_SAS_MAX_UPLOAD_BYTES', 1024 * 1024 * 1024))
+AZURE_BLOB_UPLOAD_CHUNK_SIZE = int(
+    os.getenv('AZURE_BLOB_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024))
 DJANGO_CONTENT_TYPE_ID_BASE_API = os.getenv('DJANGO_CONTENT_TYPE_ID_BASE_API')
 DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API = os.getenv(
     'DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API')
@@ -20,11 +38,56 @@ COSMOS_CONNECTION_STRING = os.getenv('COSMOS_CONNECTION_STRING')
 COSMOS_KEY = os.getenv('COSMOS_KEY')
 COSMOS_BASE_FASTAPI_DATABASE = os.getenv('COSMOS_BASE_FASTAPI_DATABASE')
 COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER = os.getenv('COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER')
+COSMOS_AUDIT_LOG_PARTITION_KEY = os.getenv('COSMOS_AUDIT_LOG_PARTITION_KEY', '/id')
+COSMOS_BULK_MAX_CONCURRENCY = int(os.getenv('COSMOS_BULK_MAX_CONCURRENCY', 16))
+COSMOS_BULK_MAX_RETRIES = int(os.getenv('COSMOS_BULK_MAX_RETRIES', 10))
+COSMOS_BULK_SDK_THROTTLE_RETRIES = int(os.getenv('COSMOS_BULK_SDK_THROTTLE_RETRIES', 0))
+COSMOS_PAGE_SIZE = int(os.getenv('COSMOS_PAGE_SIZE', 100))
+COSMOS_IN_QUERY_CHUNK_SIZE = int(os.getenv('COSMOS_IN_QUERY_CHUNK_SIZE', 256))
+COSMOS_METRICS_MAX_QUERIES = int(os.getenv('COSMOS_METRICS_MAX_QUERIES', 200))
+
+AUDIT_LOG_QUEUE_MAX_SIZE = int(os.getenv('AUDIT_LOG_QUEUE_MAX_SIZE', 10000))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv('AUDIT_LOG_BATCH_SIZE', 100))
+AUDIT_LOG_FLUSH_INTERVAL_SECONDS = float(
+    os.getenv('AUDIT_LOG_FLUSH_INTERVAL_SECONDS', 1))
+AUDIT_LOG_QUEUE_PUT_TIMEOUT_SECONDS = float(
+    os.getenv('AUDIT_LOG_QUEUE_PUT_TIMEOUT_SECONDS', 0.5))
+# "snapshot" (full object on every UPDATE) or "diff" (changed fields only)
+AUDIT_LOG_UPDATE_MODE = os.getenv('AUDIT_LOG_UPDATE_MODE', 'snapshot')
+AUDIT_LOG_SNAPSHOT_EVERY = int(os.getenv('AUDIT_LOG_SNAPSHOT_EVERY', 20))
+# Durable local spool of the audit logs, opt-in: a path on a persistent
+# volume (unset: in-memory queue only)
+AUDIT_LOG_SPOOL_PATH = os.getenv('AUDIT_LOG_SPOOL_PATH')
+AUDIT_LOG_SPOOL_LEASE_SECONDS = float(
+    os.getenv('AUDIT_LOG_SPOOL_LEASE_SECONDS', 60))
+# Failed replays of an audit log before it is parked in the dead-letter table
+AUDIT_LOG_SPOOL_MAX_ATTEMPTS = int(os.getenv('AUDIT_LOG_SPOOL_MAX_ATTEMPTS', 20))
 
 SB_CONNECTION_STR = os.getenv('SB_CONNECTION_STR')
 SB_EMAIL_QUEUE = os.getenv('SB_EMAIL_QUEUE')
 SB_MAX_WAIT_TIME = os.getenv('SB_MAX_WAIT_TIME')
 SB_MESSAGES_TO_READ = os.getenv('SB_MESSAGES_TO_READ')
+SB_SENDER_POOL_SIZE = int(os.getenv('SB_SENDER_POOL_SIZE', 4))
+SB_SENDER_ACQUIRE_TIMEOUT_SECONDS = float(
+    os.getenv('SB_SENDER_ACQUIRE_TIMEOUT_SECONDS', 30))
+SB_SEND_ATTEMPTS = int(os.getenv('SB_SEND_ATTEMPTS', 3))
+SB_COALESCE_LINGER_MS = float(os.getenv('SB_COALESCE_LINGER_MS', 5))
+SB_COALESCE_MAX_MESSAGES = int(os.getenv('SB_COALESCE_MAX_MESSAGES', 500))
+SB_COALESCE_RESULT_TIMEOUT_SECONDS = float(
+    os.getenv('SB_COALESCE_RESULT_TIMEOUT_SECONDS', 60))
+SB_WORKER_RECEIVERS = int(os.getenv('SB_WORKER_RECEIVERS', 4))
+SB_WORKER_PREFETCH = int(os.getenv('SB_WORKER_PREFETCH', 50))
+SB_WORKER_BATCH_SIZE = int(os.getenv('SB_WORKER_BATCH_SIZE', 20))
+SB_WORKER_LOCK_RENEWAL_SECONDS = float(
+    os.getenv('SB_WORKER_LOCK_RENEWAL_SECONDS', 300))
+
+TASK_DISPATCHER_WORKERS = int(os.getenv('TASK_DISPATCHER_WORKERS', 4))
+TASK_DISPATCHER_QUEUE_MAX_SIZE = int(os.getenv('TASK_DISPATCHER_QUEUE_MAX_SIZE', 1000))
+TASK_DISPATCHER_MAX_ATTEMPTS = int(os.getenv('TASK_DISPATCHER_MAX_ATTEMPTS', 3))
+TASK_DISPATCHER_RETRY_BACKOFF_SECONDS = float(
+    os.getenv('TASK_DISPATCHER_RETRY_BACKOFF_SECONDS', 1))
+TASK_DISPATCHER_PUT_TIMEOUT_SECONDS = float(
+    os.getenv('TASK_DISPATCHER_PUT_TIMEOUT_SECONDS', 0.5))
 
 DB_PORT = os.getenv('DB_PORT')
 DB_HOST = os.getenv('DB_HOST')
@@ -40,6 +103,26 @@ SMTP_FROM_EMAIL = os.getenv('SMTP_FROM_EMAIL')
 SMTP_EMAIL_HOST = os.getenv('SMTP_EMAIL_HOST')
 SMTP_EMAIL_PORT = os.getenv('SMTP_EMAIL_PORT')
 SMTP_EMAIL_HOST_PASSWORD = os.getenv('SMTP_EMAIL_HOST_PASSWORD')
+SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'True') == 'True'
+SMTP_TIMEOUT_SECONDS = float(os.getenv('SMTP_TIMEOUT_SECONDS', 30))
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
+SMTP_POOL_ACQUIRE_TIMEOUT_SECONDS = float(
+    os.getenv('SMTP_POOL_ACQUIRE_TIMEOUT_SECONDS', 30))
+SMTP_POOL_HEALTH_CHECK_SECONDS = float(
+    os.getenv('SMTP_POOL_HEALTH_CHECK_SECONDS', 30))
+SMTP_SEND_ATTEMPTS = int(os.getenv('SMTP_SEND_ATTEMPTS', 2))
+
+EMAIL_TEMPLATES_BYTECODE_CACHE_DIR = os.getenv(
+    'EMAIL_TEMPLATES_BYTECODE_CACHE_DIR',
+    os.path.join(tempfile.gettempdir(), 'email_templates_bytecode'))
+EMAIL_TEMPLATES_AUTO_RELOAD = os.getenv('EMAIL_TEMPLATES_AUTO_RELOAD', 'False') == 'True'
+NOTIFICATION_COALESCE_WINDOW_SECONDS = float(
+    os.getenv('NOTIFICATION_COALESCE_WINDOW_SECONDS', 60))
+NOTIFICATION_COALESCE_MAX_EVENTS = int(os.getenv('NOTIFICATION_COALESCE_MAX_EVENTS', 50))
+EMAIL_CLAIM_CHECK_THRESHOLD_BYTES = int(
+    os.getenv('EMAIL_CLAIM_CHECK_THRESHOLD_BYTES', 192 * 1024))
+EMAIL_CLAIM_CHECK_CONTAINER = os.getenv(
+    'EMAIL_CLAIM_CHECK_CONTAINER', AZURE_VLTSTORAGESERVICE1_CONTAINER)
 
 ANALYTICS_APPLICATION_USER = os.getenv('ANALYTICS_APPLICATION_USER')
 ANALYTICS_APPLICATION_PASSWORD = os.getenv('ANALYTICS_APPLICATION_PASSWORD')
@@ -56,4 +139,5 @@ SHAREPOINT_RRV_ACR_FILES_DIRECTORY = os.getenv(
 DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API = os.getenv(
     'DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL')
+DEFAULT_REPLY_TO_EMAIL = os.getenv('DEFAULT_REPLY_TO_EMAIL', DEFAULT_FROM_EMAIL)
 BASE_FASTAPI_FRONTEND_URL = os.getenv('BASE_FASTAPI_FRONTEND_URL')
@@ -0,0 +1,31 @@
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from modules.core.services.azure.cosmosdb_metrics import start_request_totals
+
+
+class CosmosMetricsMiddleware(BaseHTTPMiddleware):
+    """
+        This class was made to account the CosmosDB calls of each
+        request, returning the totals in the response headers:
+            - X-Cosmos-Request-Charge: RUs consumed
+            - X-Cosmos-Requests: CosmosDB HTTP calls (retries included)
+            - X-Cosmos-Duration-Ms: time spent in CosmosDB calls
+            - X-Cosmos-Retries: throttled calls
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        totals = start_request_totals()
+
+        response = await call_next(request)
+
+        if totals['requests']:
+            response.headers['X-Cosmos-Request-Charge'] = f"{totals['request_charge']:.2f}"
+            response.headers['X-Cosmos-Requests'] = str(totals['requests'])
+            response.headers['X-Cosmos-Duration-Ms'] = f"{totals['latency_ms']:.2f}"
+            response.headers['X-Cosmos-Retries'] = str(totals['retries'])
+
+        return response
@@ -1,20 +1,46 @@
+import json
+import time
+import base64
+import threading
+from datetime import datetime
+from typing import Dict, List
 from modules.core.database import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session
+from modules.core.env import AZURE_BLOB_FILES_COUNT_CACHE_SECONDS
 from sqlalchemy import (
-    BigInteger, Boolean, Column, DateTime, Integer,
-    String
+    BigInteger, Boolean, Column, DateTime, Index, Integer,
+    String, UniqueConstraint, and_, func, or_, select
 )
 
+# (filter name, filter value) -> (expires_at, count)
+_count_cache: Dict = {}
+_count_cache_lock = threading.Lock()
+
 
 class AzureBlobStorageFile(Base):
     """
     This class tracks Azure Blob Storage files
 
+    The composite indexes follow the listing access patterns: by user,
+    by container and by date, always ordered by "(date_create, id)" so
+    the listing methods can paginate by keyset instead of OFFSET.
+    A blob is registered once: "(container_name, name)" is unique.
+
     Author: Matheus Henrique (m.araujo)
 
     Date: 10th October 2024
     """
     __tablename__ = "azure_integrations_azureblobstoragefile"
+    __table_args__ = (
+        UniqueConstraint(
+            'container_name', 'name', name='uq_azureblobstoragefile_container_name'),
+        Index('ix_azureblobstoragefile_uuid', 'uuid'),
+        Index('ix_azureblobstoragefile_user_date_create',
+              'user_id', 'date_create', 'id'),
+        Index('ix_azureblobstoragefile_container_date_create',
+              'container_name', 'date_create', 'id'),
+        Index('ix_azureblobstoragefile_date_create', 'date_create', 'id'),
+    )
 
     id = Column(BigInteger, primary_key=True, index=True,
                 autoincrement=True)
@@ -23,10 +49,6 @@ class AzureBlobStorageFile(Base):
     is_active = Column(Boolean, nullable=False)
     uuid = Column(String(50), nullable=False)
 
-    operation_associated_files = relationship(
-        'OperationAssociatedFile',
-        back_populates='azure_file')
-
     original_file_name = Column(String(256), nullable=False)
     name = Column(String(256), nullable=False)
     user_id = Column(Integer, nullable=False)
@@ -38,3 +60,172 @@ class AzureBlobStorageFile(Base):
     request_id = Column(String(256), nullable=False)
     version = Column(String(256), nullable=False)
     container_name = Column(String(256), nullable=False)
+    content_md5 = Column(String(32), nullable=True)
+    content_sha256 = Column(String(64), nullable=True)
+
+    @classmethod
+    def list_by_user(
+        cls, db: Session, user_id: int, cursor: str = None, limit: int = 50
+    ) -> Dict:
+        """
+        Keyset-paginated listing of the user files, newest first
+
+        Args:
+            db (Session): SQLAlchemy session
+            user_id (int): auth_user id
+            cursor (str): "next_cursor" of the previous page
+            limit (int): page size
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'next_cursor': str})
+        """
+        return cls.__list_page(db, [cls.user_id == user_id], cursor, limit)
+
+    @classmethod
+    def list_by_container(
+        cls, db: Session, container_name: str, cursor: str = None, limit: int = 50
+    ) -> Dict:
+        """
+        Keyset-paginated listing of the container files, newest first
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'next_cursor': str})
+        """
+        return cls.__list_page(
+            db, [cls.container_name == container_name], cursor, limit)
+
+    @classmethod
+    def list_by_date_range(
+        cls, db: Session, start: datetime, end: datetime,
+        cursor: str = None, limit: int = 50
+    ) -> Dict:
+        """
+        Keyset-paginated listing of the files created between
+        "start" (inclusive) and "end" (exclusive), newest first
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'next_cursor': str})
+        """
+        return cls.__list_page(
+            db, [cls.date_create >= start, cls.date_create < end], cursor, limit)
+
+    @classmethod
+    def count_by_user(cls, db: Session, user_id: int) -> int:
+        """
+        Cached amount of active files of the user
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+        """
+        return cls.__cached_count(
+            db, ('user_id', user_id), [cls.user_id == user_id])
+
+    @classmethod
+    def count_by_container(cls, db: Session, container_name: str) -> int:
+        """
+        Cached amount of active files of the container
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+        """
+        return cls.__cached_count(
+            db, ('container_name', container_name),
+            [cls.container_name == container_name])
+
+    @classmethod
+    def clear_count_cache(cls):
+        """
+        Drop the cached counts (must be called when files are created or deleted)
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+        """
+        with _count_cache_lock:
+            _count_cache.clear()
+
+    @classmethod
+    def projection_columns(cls) -> List[Column]:
+        """
+        Lightweight columns returned by the listing methods
+        """
+        return [
+            cls.id, cls.uuid, cls.original_file_name, cls.name,
+            cls.file_extension, cls.content_type, cls.size, cls.path,
+            cls.container_name, cls.user_id, cls.date_create,
+        ]
+
+    @classmethod
+    def __list_page(
+        cls, db: Session, filters: List, cursor: str, limit: int
+    ) -> Dict:
+        """
+        Select one page ordered by "(date_create, id)" descending.
+        The cursor holds the last "(date_create, id)" already returned.
+        """
+        query = select(*cls.projection_columns()).where(
+            cls.is_active == True, *filters)  # noqa: E712
+
+        if cursor:
+            last_date_create, last_id = cls.__decode_cursor(cursor)
+            # Row value comparisons are not supported by MSSQL
+            query = query.where(or_(
+                cls.date_create < last_date_create,
+                and_(cls.date_create == last_date_create, cls.id < last_id)
+            ))
+
+        query = query.order_by(
+            cls.date_create.desc(), cls.id.desc()).limit(limit + 1)
+
+        rows = db.execute(query).all()
+        items = [row._asdict() for row in rows[:limit]]
+
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = cls.__encode_cursor(
+                items[-1]['date_create'], items[-1]['id'])
+
+        return {'items': items, 'next_cursor': next_cursor}
+
+    @classmethod
+    def __cached_count(cls, db: Session, cache_key: tuple, filters: List) -> int:
+        now = time.monotonic()
+        with _count_cache_lock:
+            cached = _count_cache.get(cache_key)
+            if cached and cached[0] > now:
+                return cached[1]
+
+        count = db.execute(
+            select(func.count()).select_from(cls).where(
+                cls.is_active == True, *filters)  # noqa: E712
+        ).scalar_one()
+
+        with _count_cache_lock:
+            _count_cache[cache_key] = (
+                now + AZURE_BLOB_FILES_COUNT_CACHE_SECONDS, count)
+
+        return count
+
+    @staticmethod
+    def __encode_cursor(date_create: datetime, id: int) -> str:
+        payload = json.dumps([date_create.isoformat(), id])
+        return base64.urlsafe_b64encode(payload.encode('UTF-8')).decode('UTF-8')
+
+    @staticmethod
+    def __decode_cursor(cursor: str) -> tuple:
+        date_create, id = json.loads(base64.urlsafe_b64decode(cursor))
+        return datetime.fromisoformat(date_create), int(id)
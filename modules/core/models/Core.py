@@ -17,6 +17,8 @@ class BaseDB(Base):
     Date: 9th September 2024
     """
     __abstract__ = True  # Indicate that this class is not a table
+    # Automatic audit logs on commit (see "register_audit_session_events")
+    __audit_log__ = True
 
     id = mapped_column(BigInteger, primary_key=True, index=True,
                        autoincrement=True, sort_order=-5)
@@ -1,4 +1,7 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException
+from modules.core.middlewares.authentication import get_user_from_request
+from modules.core.services.azure.cosmosdb_metrics import cosmos_metrics
+from modules.core.services.utils.task_dispatcher import task_dispatcher
 
 """
 Centralizer router file for Core module
@@ -9,3 +12,35 @@ Date: 3th September 2024
 """
 
 router = APIRouter()
+
+
+@router.get("/cosmos_metrics")
+def get_cosmos_metrics(top_queries: int = 20, user: dict = Depends(get_user_from_request)):
+    """
+    CosmosDB request charge (RU), latency, retries and status codes per
+    container and operation, and the most expensive queries (superusers only)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    if not user.get('is_superuser'):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    return cosmos_metrics.snapshot(top_queries=top_queries)
+
+
+@router.get("/task_dispatcher_metrics")
+def get_task_dispatcher_metrics(user: dict = Depends(get_user_from_request)):
+    """
+    Background tasks dispatched, succeeded, retried and failed (per task),
+    and the tasks waiting in the queue (superusers only)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    if not user.get('is_superuser'):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+    return task_dispatcher.snapshot()
@@ -0,0 +1,309 @@
+import io
+import os
+import abc
+import mmap
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from azure.core import MatchConditions
+from azure.storage.blob import BlobServiceClient
+from azure.core.exceptions import ResourceNotModifiedError
+from modules.core.env import (
+    AZURE_BLOB_CACHE_DIR, AZURE_BLOB_CACHE_MAX_BYTES,
+    AZURE_BLOB_CACHE_REVALIDATE_SECONDS
+)
+
+
+class BlobCache(abc.ABC):
+    """
+    Read-through cache interface used in front of Azure Blob Storage reads.
+    Implementations must return a readable file-like object for the blob.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    @abc.abstractmethod
+    def read(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        blob_name: str
+    ):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+class BlobDiskCache(BlobCache):
+    """
+    Read-through cache that keeps hot blobs on the local disk.
+
+    - Entries are keyed by "container/name" plus the blob "etag"
+    - Content is served through read-only memory-mapped files
+    - Least recently used entries are evicted above "max_bytes"
+    - Entries older than "revalidate_seconds" are revalidated with a
+      conditional request (If-None-Match), so an unchanged blob costs a
+      304 instead of a full download
+    - Each process caches in its own subdirectory of "directory" (the
+      index lives in its memory), removed by "close"; other workers sharing
+      "directory" are never touched, but the subdirectories of dead
+      processes (e.g. a crashed worker) are removed on startup
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(
+        self,
+        directory: str = AZURE_BLOB_CACHE_DIR,
+        max_bytes: int = AZURE_BLOB_CACHE_MAX_BYTES,
+        revalidate_seconds: float = AZURE_BLOB_CACHE_REVALIDATE_SECONDS
+    ) -> None:
+        self.root_directory = directory
+        self.directory = os.path.join(directory, str(os.getpid()))
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+
+        self._lock = threading.Lock()
+        # key -> {'etag', 'path', 'size', 'validated_at'}, oldest first
+        self._entries: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.bytes_saved = 0
+        self.bytes_downloaded = 0
+
+        # Leftovers of a previous process with the same pid are stale
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
+        self.__remove_dead_processes_directories()
+
+    def read(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        blob_name: str
+    ):
+        """
+        Return the blob content as a read-only "mmap" (or an empty BytesIO
+        for empty blobs). The caller must close the returned object.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        key = f'{container_name}/{blob_name}'
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+                entry = dict(entry)
+
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name, blob=blob_name)
+
+        downloader = None
+        if entry:
+            revalidated = False
+            if time.monotonic() - entry['validated_at'] >= self.revalidate_seconds:
+                try:
+                    downloader = blob_client.download_blob(
+                        etag=entry['etag'],
+                        match_condition=MatchConditions.IfModified)
+                except ResourceNotModifiedError:
+                    revalidated = True
+
+            if downloader is None:
+                try:
+                    content = self.__open(entry)
+                except FileNotFoundError:
+                    # Evicted in the meantime
+                    content = None
+
+                if content is not None:
+                    with self._lock:
+                        self.hits += 1
+                        self.bytes_saved += entry['size']
+                        if revalidated:
+                            self.revalidations += 1
+                            if key in self._entries:
+                                self._entries[key]['validated_at'] = time.monotonic()
+                    return content
+
+        if downloader is None:
+            downloader = blob_client.download_blob()
+
+        entry = self.__store(key, downloader)
+        with self._lock:
+            self.misses += 1
+            self.bytes_downloaded += entry['size']
+
+        return self.__open(entry)
+
+    def invalidate(self, container_name: str, blob_name: str):
+        """
+        Drop a blob from the cache
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        with self._lock:
+            entry = self._entries.pop(f'{container_name}/{blob_name}', None)
+            if entry:
+                self._total_bytes -= entry['size']
+        if entry:
+            self.__remove_file(entry['path'])
+
+    def close(self):
+        """
+        Drop every entry and remove the process cache directory
+        (application shutdown)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> dict:
+        """
+        Cache counters
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'revalidations': self.revalidations,
+                'hit_rate': self.hits / requests if requests else 0.0,
+                'bytes_saved': self.bytes_saved,
+                'bytes_downloaded': self.bytes_downloaded,
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+            }
+
+    def __store(self, key: str, downloader) -> dict:
+        """
+        Stream the downloaded blob to disk and register it in the index,
+        evicting the least recently used entries above the byte budget
+        """
+        etag = downloader.properties.etag
+        file_name = hashlib.sha256(f'{key}|{etag}'.encode('UTF-8')).hexdigest()
+        path = os.path.join(self.directory, file_name)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+
+        try:
+            with open(temp_path, 'wb') as file:
+                size = downloader.readinto(file)
+            os.replace(temp_path, path)
+        finally:
+            # Left behind only when the download failed
+            if os.path.exists(temp_path):
+                self.__remove_file(temp_path)
+
+        entry = {
+            'etag': etag,
+            'path': path,
+            'size': size,
+            'validated_at': time.monotonic(),
+        }
+
+        evicted = []
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous:
+                self._total_bytes -= previous['size']
+                if previous['path'] != path:
+                    evicted.append(previous['path'])
+
+            self._entries[key] = entry
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+                _, oldest = self._entries.popitem(last=False)
+                self._total_bytes -= oldest['size']
+                evicted.append(oldest['path'])
+
+        for evicted_path in evicted:
+            self.__remove_file(evicted_path)
+
+        return entry
+
+    def __open(self, entry: dict):
+        """
+        Memory-map a cached file
+        """
+        if entry['size'] == 0:
+            return io.BytesIO(b'')
+
+        with open(entry['path'], 'rb') as file:
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __remove_dead_processes_directories(self):
+        for name in os.listdir(self.root_directory):
+            path = os.path.join(self.root_directory, name)
+            if not name.isdigit() or not os.path.isdir(path) or is_process_alive(int(name)):
+                continue
+            shutil.rmtree(path, ignore_errors=True)
+
+    def __remove_file(self, path: str):
+        try:
+            os.remove(path)
+        except OSError as error:
+            # On Windows a file can't be removed while it is still mapped
+            logging.warning(f"Could not remove cached blob '{path}': {error}")
+
+
+def is_process_alive(pid: int) -> bool:
+    """
+    Whether a process with the "pid" is running (signal 0 only checks it)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Running, owned by another user
+        return True
+    return True
+
+
+_blob_disk_cache: BlobDiskCache = None
+_blob_disk_cache_lock = threading.Lock()
+
+
+def get_blob_disk_cache() -> BlobDiskCache:
+    """
+    Process-wide BlobDiskCache instance
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _blob_disk_cache
+
+    with _blob_disk_cache_lock:
+        if _blob_disk_cache is None:
+            _blob_disk_cache = BlobDiskCache()
+
+    return _blob_disk_cache
+
+
+def close_blob_disk_cache():
+    """
+    Close the process-wide BlobDiskCache, if it was used (application shutdown)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _blob_disk_cache
+
+    with _blob_disk_cache_lock:
+        if _blob_disk_cache is not None:
+            _blob_disk_cache.close()
+        _blob_disk_cache = None
@@ -1,17 +1,27 @@
 import io
 import os
+import jwt
 import uuid
-from typing import Dict, List
-from datetime import datetime
+import base64
+import hashlib
+from typing import Dict, Iterator, List, Tuple
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from azure.storage.blob import ContainerClient
 from azure.storage.blob import BlobServiceClient
-from modules.core.services.email.email import Email
+from datetime import datetime, timedelta, timezone
+from azure.storage.blob import BlobBlock, ContentSettings
+from azure.storage.blob import BlobSasPermissions, generate_blob_sas
+from modules.core.services.utils.task_dispatcher import task_dispatcher
+from modules.core.services.email.notification_coalescer import notification_coalescer
+from modules.core.services.azure.blob_cache import BlobCache
 from modules.core.services.utils.methods import string_to_hash256
 from modules.core.models.AzureBlobStorage import AzureBlobStorageFile
 from modules.core.env import (
+    AZURE_BLOB_SAS_EXPIRY_MINUTES, AZURE_BLOB_SAS_MAX_UPLOAD_BYTES,
+    AZURE_BLOB_UPLOAD_CHUNK_SIZE,
     AZURE_VLTSTORAGESERVICE1_CONNECTION_STRING,
-    AZURE_VLTSTORAGESERVICE1_DOMAIN, DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API
+    AZURE_VLTSTORAGESERVICE1_DOMAIN, SECRET_KEY
 )
 
 
@@ -73,6 +83,147 @@ class AzureBlobStorageService:
 
         return blob_client_response
 
+    def upload_blob_stream_with_checksums(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        file_name: str,
+        file_content: io.IOBase,
+        content_type: str = None,
+        chunk_size: int = AZURE_BLOB_UPLOAD_CHUNK_SIZE
+    ) -> Tuple[Dict, Dict]:
+        """
+        Upload file to Azure Blob Storage Container reading it only once.
+
+        Each chunk read feeds the size, MD5 and SHA-256 and is sent right
+        away as a block (validated by its own transactional MD5). The blob
+        MD5 is set as Content-MD5 when the block list is committed and the
+        SHA-256 is kept in the blob metadata. Files smaller than a chunk are
+        sent in a single request.
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            response: Dict (Azure response headers)
+            checksums: Dict ('size', 'content_md5' and 'content_sha256', hex encoded)
+        """
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=file_name
+        )
+
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size = 0
+
+        chunk = file_content.read(chunk_size)
+        if len(chunk) < chunk_size:
+            md5.update(chunk)
+            sha256.update(chunk)
+            size = len(chunk)
+
+            response = blob_client.upload_blob(
+                chunk,
+                blob_type="BlockBlob",
+                content_settings=ContentSettings(
+                    content_type=content_type,
+                    content_md5=bytearray(md5.digest())),
+                metadata={'sha256': sha256.hexdigest()},
+                validate_content=True
+            )
+        else:
+            block_list = []
+            while chunk:
+                md5.update(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+
+                block_id = base64.b64encode(
+                    f'{len(block_list):08d}'.encode('UTF-8')).decode('UTF-8')
+                blob_client.stage_block(
+                    block_id, chunk, validate_content=True)
+                block_list.append(BlobBlock(block_id=block_id))
+
+                chunk = file_content.read(chunk_size)
+
+            response = blob_client.commit_block_list(
+                block_list,
+                content_settings=ContentSettings(
+                    content_type=content_type,
+                    content_md5=bytearray(md5.digest())),
+                metadata={'sha256': sha256.hexdigest()}
+            )
+
+        checksums = {
+            'size': size,
+            'content_md5': md5.hexdigest(),
+            'content_sha256': sha256.hexdigest(),
+        }
+
+        return response, checksums
+
+    def download_blob(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        blob_name: str,
+        cache: BlobCache = None
+    ):
+        """
+        Download a blob from Azure Blob Storage Container.
+        When a "cache" is given (e.g. "get_blob_disk_cache()") the read goes
+        through it, so hot blobs are served from the local disk.
+        The returned file-like object must be closed by the caller.
+        Author: Matheus Henrique (m.araujo)
+        """
+        if cache is not None:
+            return cache.read(blob_service_client, container_name, blob_name)
+
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_name
+        )
+
+        file = io.BytesIO()
+        blob_client.download_blob().readinto(file)
+        file.seek(0)
+
+        return file
+
+    def download_blob_chunks(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        blob_name: str
+    ) -> Iterator[bytes]:
+        """
+        Stream a blob from Azure Blob Storage Container chunk by chunk
+        (only one chunk is held in memory at a time)
+        Author: Matheus Henrique (m.araujo)
+        """
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_name
+        )
+
+        return blob_client.download_blob().chunks()
+
+    def delete_blob(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        blob_name: str
+    ):
+        """
+        Delete a blob (and its snapshots) from Azure Blob Storage Container
+        Author: Matheus Henrique (m.araujo)
+        """
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=blob_name
+        )
+
+        blob_client.delete_blob(delete_snapshots='include')
+
     def get_or_create_azure_container(
             self, blob_service_client: BlobServiceClient, container_name: str
     ):
@@ -93,6 +244,50 @@ class AzureBlobStorageService:
 
         return container_name
 
+    def mount_blob_file_data(
+        self,
+        file_name: str,
+        blob_name: str,
+        file_extension: str,
+        user_id: int,
+        container_name: str,
+        file_size: int,
+        file_content_type: str,
+        response: Dict,
+        checksums: Dict = None
+    ) -> Dict:
+        """
+        Mount the AzureBlobStorageFile data of an uploaded blob
+        Author: Matheus Henrique (m.araujo)
+        """
+        file_path = os.path.join(
+            AZURE_VLTSTORAGESERVICE1_DOMAIN,
+            container_name,
+            blob_name
+        )
+
+        data = {
+            'date_update': datetime.now(),
+            'date_create': datetime.now(),
+            'is_active': True,
+            'uuid': str(uuid.uuid4()).replace('-', ''),
+            'original_file_name': file_name,
+            'name': blob_name,
+            'file_extension': file_extension,
+            'user_id': user_id,
+            'container_name': container_name,
+            'path': file_path.replace('\\', '/'),
+            'size': file_size,
+            'content_type': file_content_type,
+            'etag': response['etag'],
+            'request_id': response['request_id'],
+            'version': response['version'],
+            'content_md5': checksums['content_md5'] if checksums else None,
+            'content_sha256': checksums['content_sha256'] if checksums else None,
+        }
+
+        return data
+
     def upload_files_to_azure_blob_storage(
             self,
             db: Session,
@@ -137,41 +332,30 @@ class AzureBlobStorageService:
                     file_extension = file_name.split('.')[-1]
                     hash256_filename = f"{string_to_hash256(file_name, random=True)}.{
                         file_extension}"
-                    file_size = len(file.getvalue())
                     file_content_type = file.content_type
-                    file_content = file.read()
 
-                    response = self.upload_blob_stream(
+                    # Size and checksums are computed in the same pass that uploads
+                    file.seek(0)
+                    response, checksums = self.upload_blob_stream_with_checksums(
                         blob_service_client,
                         container_name,
                         hash256_filename,
-                        file_content
-                    )
-
-                    file_path = os.path.join(
-                        AZURE_VLTSTORAGESERVICE1_DOMAIN,
-                        container_name,
-                        hash256_filename
+                        file,
+                        file_content_type
                     )
 
                     # Save it's meta informations in the AzureBlobStorageFile
-                    data = {
-                        'date_update': datetime.now(),
-                        'date_create': datetime.now(),
-                        'is_active': True,
-                        'uuid': str(uuid.uuid4()).replace('-', ''),
-                        'original_file_name': file_name,
-                        'name': hash256_filename,
-                        'file_extension': file_extension,
-                        'user_id': blob_info['user_id'],
-                        'container_name': container_name,
-                        'path': file_path.replace('\\', '/'),
-                        'size': file_size,
-                        'content_type': file_content_type,
-                        'etag': response['etag'],
-                        'request_id': response['request_id'],
-                        'version': response['version'],
-                    }
+                    data = self.mount_blob_file_data(
+                        file_name=file_name,
+                        blob_name=hash256_filename,
+                        file_extension=file_extension,
+                        user_id=blob_info['user_id'],
+                        container_name=container_name,
+                        file_size=checksums['size'],
+                        file_content_type=file_content_type,
+                        response=response,
+                        checksums=checksums
+                    )
 
                     # Create the AzureBlobStorageFile on DB
                     azure_file = AzureBlobStorageFile(**data)
@@ -186,19 +370,223 @@ class AzureBlobStorageService:
                     print(
                         f"Error occurred when creating engine in Database class: {error}")
                     continue
+
+        if uploaded_files_objs:
+            AzureBlobStorageFile.clear_count_cache()
+
         return uploaded_files_objs
 
+    def generate_upload_sas_url(
+        self,
+        blob_service_client: BlobServiceClient,
+        blob_info: Dict,
+        file_name: str,
+        expiry_minutes: int = AZURE_BLOB_SAS_EXPIRY_MINUTES
+    ) -> Dict:
+        """
+        Issue a short-lived SAS URL, scoped to a single new blob (create only:
+        the blob can't be overwritten once it exists, e.g. after it was
+        validated), so the client can PUT the file directly to Azure Blob Storage.
+
+        The client must send the file with the "headers" returned, and then
+        call "complete_direct_upload" with the "upload_token".
+
+        Author: Matheus Henrique (m.araujo)
+
+        Args:
+            - blob_service_client: BlobServiceClient
+            - blob_info (Dict): A dictionary containing the following parameters:
+                - user_id (int): The user ID associated with the uploaded file.
+                - container_name (str): The name of the Azure Blob Storage container.
+            - file_name (str): The original file name
+            - expiry_minutes (int): SAS URL lifetime
+
+        Returns:
+            upload_info: Dict
+        """
+        container_name = self.get_or_create_azure_container(
+            blob_service_client, blob_info['container_name'])
+
+        file_extension = file_name.split('.')[-1]
+        hash256_filename = f"{string_to_hash256(file_name, random=True)}.{file_extension}"
+
+        now = datetime.now(timezone.utc)
+        expires_on = now + timedelta(minutes=expiry_minutes)
+
+        sas_token = generate_blob_sas(
+            account_name=blob_service_client.account_name,
+            container_name=container_name,
+            blob_name=hash256_filename,
+            account_key=blob_service_client.credential.account_key,
+            permission=BlobSasPermissions(create=True),
+            # Tolerates clock skew between the client and Azure
+            start=now - timedelta(minutes=5),
+            expiry=expires_on
+        )
+
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=hash256_filename
+        )
+
+        # Signed claims of what was issued, checked back on completion
+        upload_token = jwt.encode(
+            {
+                'container_name': container_name,
+                'name': hash256_filename,
+                'original_file_name': file_name,
+                'file_extension': file_extension,
+                'user_id': blob_info['user_id'],
+                'exp': expires_on + timedelta(minutes=expiry_minutes),
+            },
+            SECRET_KEY,
+            algorithm='HS512'
+        )
+
+        return {
+            'upload_url': f'{blob_client.url}?{sas_token}',
+            'headers': {'x-ms-blob-type': 'BlockBlob'},
+            'container_name': container_name,
+            'name': hash256_filename,
+            'expires_on': expires_on.isoformat(),
+            'upload_token': upload_token,
+        }
+
+    def complete_direct_upload(
+        self,
+        db: Session,
+        blob_service_client: BlobServiceClient,
+        upload_token: str,
+        user_id: int,
+        max_size: int = AZURE_BLOB_SAS_MAX_UPLOAD_BYTES
+    ) -> Dict:
+        """
+        Completion callback of a SAS direct upload ("generate_upload_sas_url").
+        Validates the uploaded blob properties and creates its AzureBlobStorageFile.
+        Invalid blobs (empty or bigger than "max_size") are deleted.
+
+        It is idempotent: completing an upload again (e.g. a client retry, or
+        two concurrent calls) returns the file already registered, the unique
+        "(container_name, name)" constraint keeping a single row.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Args:
+            - db: Session
+            - blob_service_client: BlobServiceClient
+            - upload_token (str): token returned by "generate_upload_sas_url"
+            - user_id (int): The user ID completing the upload
+            - max_size (int): max accepted blob size in bytes
+
+        Returns:
+            data: Dict (the AzureBlobStorageFile data)
+        """
+        try:
+            claims = jwt.decode(upload_token, SECRET_KEY, algorithms=['HS512'])
+        except jwt.PyJWTError as error:
+            raise ValueError(f'Invalid upload token: {error}')
+
+        if claims['user_id'] != user_id:
+            raise PermissionError('The upload token was not issued to this user')
+
+        registered = self.__get_registered_file_data(db, claims)
+        if registered is not None:
+            return registered
+
+        blob_client = blob_service_client.get_blob_client(
+            container=claims['container_name'],
+            blob=claims['name']
+        )
+
+        response_headers = {}
+        properties = blob_client.get_blob_properties(
+            raw_response_hook=lambda response: response_headers.update(
+                response.http_response.headers)
+        )
+
+        if properties.size == 0 or properties.size > max_size:
+            blob_client.delete_blob()
+            raise ValueError(
+                f'Invalid file size ({properties.size} bytes), the limit is {max_size} bytes')
+
+        # Only present when the client sent the Content-MD5 header
+        content_md5 = properties.content_settings.content_md5
+
+        data = self.mount_blob_file_data(
+            file_name=claims['original_file_name'],
+            blob_name=claims['name'],
+            file_extension=claims['file_extension'],
+            user_id=user_id,
+            container_name=claims['container_name'],
+            file_size=properties.size,
+            file_content_type=properties.content_settings.content_type,
+            response={
+                'etag': properties.etag,
+                'request_id': response_headers.get('x-ms-request-id'),
+                'version': response_headers.get('x-ms-version'),
+            },
+            checksums={
+                'content_md5': content_md5.hex() if content_md5 else None,
+                'content_sha256': (properties.metadata or {}).get('sha256'),
+            }
+        )
+
+        azure_file = AzureBlobStorageFile(**data)
+        db.add(azure_file)
+        try:
+            db.commit()
+        except IntegrityError:
+            # Completed concurrently, the other call registered the file
+            db.rollback()
+            registered = self.__get_registered_file_data(db, claims)
+            if registered is None:
+                raise
+            return registered
+        AzureBlobStorageFile.clear_count_cache()
+
+        data['id'] = azure_file.id
+        return data
+
+    def __get_registered_file_data(self, db: Session, claims: Dict) -> Dict:
+        """
+        Data of the AzureBlobStorageFile of a completed direct upload (None if not completed)
+        """
+        azure_file = db.query(AzureBlobStorageFile).filter(
+            AzureBlobStorageFile.container_name == claims['container_name'],
+            AzureBlobStorageFile.name == claims['name']
+        ).first()
+        if azure_file is None:
+            return None
+
+        return {
+            column.name: getattr(azure_file, column.name)
+            for column in AzureBlobStorageFile.__table__.columns
+        }
+
     def notify_uploader_user(
         self,
         uploaded_files_names: List,
         files: List,
         uploader_user_email: str,
-        error: bool = False
+        error: bool = False,
+        dispatch: bool = True
     ):
         """
         Will notify by e-mail the user who uploaded something to Azure Blob Storage Containers
         Author: Matheus Henrique (m.araujo)
+
+        The notifications of the same user within
+        "NOTIFICATION_COALESCE_WINDOW_SECONDS" are sent as a single digest email.
+        With "dispatch" it runs in the background ("task_dispatcher"), the
+        request doesn't wait for the rendering nor the queue.
         """
+        if dispatch:
+            # "dispatch=False": the task itself sends the notification
+            task_dispatcher.dispatch(
+                self.notify_uploader_user, uploaded_files_names, files,
+                uploader_user_email, error, dispatch=False)
+            return
+
         template_name = 'azure_integration_files_upload_error.html' if error else 'azure_integration_files_uploaded.html'
         subject = 'The files upload has failed!' if error else 'The files have been uploaded!'
         render_vars = {
@@ -207,11 +595,10 @@ class AzureBlobStorageService:
             'upload_date': datetime.now().strftime("%d/%m/%Y %H:%M"),
         }
 
-        Email().send_email(
-            users=[uploader_user_email],
+        notification_coalescer.notify(
+            recipient=uploader_user_email,
             template=template_name,
-            system='base_api',
-            subject=subject,
             render_vars=render_vars,
-            django_content_type_id=DJANGO_CONTENT_TYPE_ID_BASE_FASTAPI_API
+            subject=subject,
+            system='base_api'
         )
@@ -0,0 +1,339 @@
+import io
+import base64
+import asyncio
+import hashlib
+import aiohttp
+from typing import Dict, List, Tuple
+from sqlalchemy.orm import Session
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.storage.blob import BlobBlock, ContentSettings
+from azure.storage.blob.aio import BlobServiceClient, ContainerClient
+from modules.core.services.utils.methods import string_to_hash256
+from modules.core.models.AzureBlobStorage import AzureBlobStorageFile
+from modules.core.services.azure.blob_storage import AzureBlobStorageService
+from modules.core.env import (
+    AZURE_BLOB_MAX_CONCURRENT_UPLOADS, AZURE_BLOB_MAX_CONNECTIONS,
+    AZURE_BLOB_UPLOAD_CHUNK_SIZE,
+    AZURE_VLTSTORAGESERVICE1_CONNECTION_STRING
+)
+
+# Process-wide aiohttp session (connection pool) shared by every async client
+_aiohttp_session: aiohttp.ClientSession = None
+_blob_service_client: BlobServiceClient = None
+
+
+def get_aiohttp_transport() -> AioHttpTransport:
+    """
+    Return an Azure transport backed by the process-wide aiohttp
+    connection pool. The session is created lazily, inside the running
+    event loop, and is never closed by the clients that use it.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _aiohttp_session
+
+    if _aiohttp_session is None or _aiohttp_session.closed:
+        _aiohttp_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=AZURE_BLOB_MAX_CONNECTIONS,
+                limit_per_host=AZURE_BLOB_MAX_CONNECTIONS
+            ),
+            cookie_jar=aiohttp.DummyCookieJar(),
+            auto_decompress=False
+        )
+
+    return AioHttpTransport(session=_aiohttp_session, session_owner=False)
+
+
+async def close_async_blob_storage():
+    """
+    Close the shared async Blob Storage client and its connection pool.
+    Must be called on the application shutdown.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _aiohttp_session, _blob_service_client
+
+    if _blob_service_client is not None:
+        await _blob_service_client.close()
+        _blob_service_client = None
+
+    if _aiohttp_session is not None and not _aiohttp_session.closed:
+        await _aiohttp_session.close()
+    _aiohttp_session = None
+
+
+class AsyncAzureBlobStorageService:
+    """
+    This class provide async integration with Azure Blob Storage SDK
+    (azure.storage.blob.aio). It has the same surface of
+    "AzureBlobStorageService", but it must be awaited.
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def create_blob_service_client(self) -> BlobServiceClient:
+        """
+        Get the process-wide authenticated connection with Azure service
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _blob_service_client
+
+        if _blob_service_client is None:
+            _blob_service_client = BlobServiceClient.from_connection_string(
+                AZURE_VLTSTORAGESERVICE1_CONNECTION_STRING,
+                transport=get_aiohttp_transport())
+
+        return _blob_service_client
+
+    async def list_blob_containers(self, blob_service_client: BlobServiceClient):
+        """
+        List Azure Blob Storage Containers
+        Author: Matheus Henrique (m.araujo)
+        """
+        containers = []
+        async for container in blob_service_client.list_containers(
+                include_metadata=True):
+            containers.append(container)
+        return containers
+
+    async def create_blob_container(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str
+    ) -> ContainerClient:
+        """
+        Create Azure Blob Storage Container
+        Author: Matheus Henrique (m.araujo)
+        """
+        container_client = await blob_service_client.create_container(
+            name=container_name)
+        return container_client
+
+    async def upload_blob_stream(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        file_name: str,
+        file_content: io.BytesIO
+    ):
+        """
+        Upload file to Azure Blob Storage Container
+        Author: Matheus Henrique (m.araujo)
+        """
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=file_name
+        )
+
+        blob_client_response = await blob_client.upload_blob(
+            file_content, blob_type="BlockBlob")
+
+        return blob_client_response
+
+    async def upload_blob_stream_with_checksums(
+        self,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        file_name: str,
+        file_content: io.IOBase,
+        content_type: str = None,
+        chunk_size: int = AZURE_BLOB_UPLOAD_CHUNK_SIZE
+    ) -> Tuple[Dict, Dict]:
+        """
+        Upload file to Azure Blob Storage Container reading it only once
+        (see "AzureBlobStorageService.upload_blob_stream_with_checksums")
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            response: Dict (Azure response headers)
+            checksums: Dict ('size', 'content_md5' and 'content_sha256', hex encoded)
+        """
+        blob_client = blob_service_client.get_blob_client(
+            container=container_name,
+            blob=file_name
+        )
+
+        md5 = hashlib.md5()
+        sha256 = hashlib.sha256()
+        size = 0
+
+        chunk = file_content.read(chunk_size)
+        if len(chunk) < chunk_size:
+            md5.update(chunk)
+            sha256.update(chunk)
+            size = len(chunk)
+
+            response = await blob_client.upload_blob(
+                chunk,
+                blob_type="BlockBlob",
+                content_settings=ContentSettings(
+                    content_type=content_type,
+                    content_md5=bytearray(md5.digest())),
+                metadata={'sha256': sha256.hexdigest()},
+                validate_content=True
+            )
+        else:
+            block_list = []
+            while chunk:
+                md5.update(chunk)
+                sha256.update(chunk)
+                size += len(chunk)
+
+                block_id = base64.b64encode(
+                    f'{len(block_list):08d}'.encode('UTF-8')).decode('UTF-8')
+                await blob_client.stage_block(
+                    block_id, chunk, validate_content=True)
+                block_list.append(BlobBlock(block_id=block_id))
+
+                chunk = file_content.read(chunk_size)
+
+            response = await blob_client.commit_block_list(
+                block_list,
+                content_settings=ContentSettings(
+                    content_type=content_type,
+                    content_md5=bytearray(md5.digest())),
+                metadata={'sha256': sha256.hexdigest()}
+            )
+
+        checksums = {
+            'size': size,
+            'content_md5': md5.hexdigest(),
+            'content_sha256': sha256.hexdigest(),
+        }
+
+        return response, checksums
+
+    async def get_or_create_azure_container(
+            self, blob_service_client: BlobServiceClient, container_name: str
+    ):
+        """
+        Will get or create Azure Blob Storage Container if it doesn't exist
+        Author: Matheus Henrique (m.araujo)
+        """
+        containers = await self.list_blob_containers(blob_service_client)
+
+        containers_names = []
+        for container in containers:
+            containers_names.append(container['name'])
+
+        if container_name not in containers_names:
+            container = await self.create_blob_container(
+                blob_service_client, container_name)
+            container_name = container.container_name
+
+        return container_name
+
+    async def __upload_file(
+        self,
+        semaphore: asyncio.Semaphore,
+        blob_service_client: BlobServiceClient,
+        container_name: str,
+        user_id: int,
+        file: io.BytesIO
+    ) -> Dict:
+        """
+        Upload a single file, limited by the uploads semaphore
+        Author: Matheus Henrique (m.araujo)
+        """
+        async with semaphore:
+            file_name = file.name
+            file_extension = file_name.split('.')[-1]
+            hash256_filename = f"{string_to_hash256(file_name, random=True)}.{file_extension}"
+            file_content_type = file.content_type
+
+            # Size and checksums are computed in the same pass that uploads
+            file.seek(0)
+            response, checksums = await self.upload_blob_stream_with_checksums(
+                blob_service_client,
+                container_name,
+                hash256_filename,
+                file,
+                file_content_type
+            )
+
+        return AzureBlobStorageService().mount_blob_file_data(
+            file_name=file_name,
+            blob_name=hash256_filename,
+            file_extension=file_extension,
+            user_id=user_id,
+            container_name=container_name,
+            file_size=checksums['size'],
+            file_content_type=file_content_type,
+            response=response,
+            checksums=checksums
+        )
+
+    async def upload_files_to_azure_blob_storage(
+            self,
+            db: Session,
+            blob_info: Dict,
+            files: List[io.BytesIO]) -> List[str]:
+        """
+        Uploads each file in "files" to Azure Blob Storage concurrently.
+
+        Same contract of "AzureBlobStorageService.upload_files_to_azure_blob_storage",
+        but the uploads are kept in flight at the same time (up to
+        "AZURE_BLOB_MAX_CONCURRENT_UPLOADS") over the shared connection pool.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Args:
+            - db: Session
+            - blob_info (Dict): A dictionary containing the following parameters:
+                - user_id (int): The user ID associated with the uploaded files.
+                - container_name (str): The name of the Azure Blob Storage container.
+                ## IMPORTANT ##: io.BytesIO have no "name" and "content_type" attributes by default.
+                You must set it in the "io.BytesIO" object before calling this method!
+
+            - files (List[io.BytesIO]): A list of io.BytesIO objects representing the files
+                to be uploaded to Azure Blob Storage.
+
+        Returns:
+            uploaded_files_objs: List[dict]
+        """
+        blob_service_client = self.create_blob_service_client()
+
+        # Get or create the azure blob storage container
+        container_name = await self.get_or_create_azure_container(
+            blob_service_client, blob_info['container_name'])
+
+        files = [file for file in files if isinstance(file, io.BytesIO)]
+        semaphore = asyncio.Semaphore(AZURE_BLOB_MAX_CONCURRENT_UPLOADS)
+
+        results = await asyncio.gather(
+            *[
+                self.__upload_file(
+                    semaphore, blob_service_client, container_name,
+                    blob_info['user_id'], file)
+                for file in files
+            ],
+            return_exceptions=True
+        )
+
+        uploaded_files_objs = []
+        for file, data in zip(files, results):
+            if isinstance(data, Exception):
+                print(
+                    f"Error occurred when uploading file to Azure Blob Storage: {data}")
+                continue
+
+            try:
+                # Create the AzureBlobStorageFile on DB
+                azure_file = AzureBlobStorageFile(**data)
+                db.add(azure_file)
+                db.commit()
+
+                file.seek(0)
+                data['file'] = file
+                data['id'] = azure_file.id
+                uploaded_files_objs.append(data)
+            except Exception as error:
+                db.rollback()
+                print(
+                    f"Error occurred when saving AzureBlobStorageFile: {error}")
+                continue
+
+        if uploaded_files_objs:
+            AzureBlobStorageFile.clear_count_cache()
+
+        return uploaded_files_objs
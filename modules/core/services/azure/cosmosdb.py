@@ -1,16 +1,89 @@
-from typing import Dict, List
+import time
+import threading
+import contextvars
+from typing import Callable, Dict, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import azure.cosmos.container as ContainerProxy
 import azure.cosmos.cosmos_client as cosmos_client
 from azure.cosmos.partition_key import PartitionKey
+from azure.cosmos.documents import ConnectionPolicy, RetryOptions
+from azure.cosmos.exceptions import (
+    CosmosBatchOperationError, CosmosHttpResponseError
+)
+from modules.core.services.azure.cosmosdb_metrics import cosmos_metrics
+from modules.core.services.azure import cosmosdb_common
+from modules.core.services.azure.cosmosdb_common import (
+    DEFAULT_PARTITION_KEY_PATH, AimdLimit, bulk_outcome, raise_for_bulk_errors
+)
 from modules.core.env import (
-    COSMOS_CONNECTION_STRING, COSMOS_BASE_FASTAPI_DATABASE, COSMOS_KEY
+    COSMOS_BULK_MAX_CONCURRENCY, COSMOS_BULK_MAX_RETRIES, COSMOS_BULK_SDK_THROTTLE_RETRIES,
+    COSMOS_CONNECTION_STRING, COSMOS_BASE_FASTAPI_DATABASE, COSMOS_IN_QUERY_CHUNK_SIZE,
+    COSMOS_KEY, COSMOS_PAGE_SIZE
 )
 
+# One CosmosClient per process and the container proxies already provisioned
+_client: cosmos_client.CosmosClient = None
+_database = None
+_containers: Dict[str, ContainerProxy.ContainerProxy] = {}
+
+# CosmosClient of the bulk operations (see "CosmosDB.get_bulk_client")
+_bulk_client: cosmos_client.CosmosClient = None
+_bulk_containers: Dict[str, ContainerProxy.ContainerProxy] = {}
+_lock = threading.Lock()
+
+
+def close_cosmos_client():
+    """
+    Close the process-wide CosmosClient (application shutdown)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _client, _database, _bulk_client
+
+    with _lock:
+        if _client is not None:
+            _client.__exit__()
+        if _bulk_client is not None:
+            _bulk_client.__exit__()
+        _client = None
+        _database = None
+        _bulk_client = None
+        _containers.clear()
+        _bulk_containers.clear()
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Concurrency limit that adapts to throttling (AIMD, see "AimdLimit"),
+    shared by threads
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.state = AimdLimit(max_concurrency)
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            self._condition.wait_for(self.state.has_slot)
+            self.state.acquired()
+
+    def release(self, throttled: bool = False):
+        with self._condition:
+            self.state.released(throttled)
+            self._condition.notify_all()
+
 
 class CosmosDB:
     """
     This class have methods to handle CosmosDB iteractions
 
+    The CosmosClient, the database and the container proxies are shared by
+    the whole process: the provisioning ("create if not exists") runs once per
+    container, preferably at the application startup ("provision_containers"),
+    so each operation costs a single request.
+
     Author: Matheus Henrique (m.araujo)
     """
 
@@ -19,82 +92,336 @@ class CosmosDB:
         self.MASTER_KEY = COSMOS_KEY
         self.DATABASE_ID = COSMOS_BASE_FASTAPI_DATABASE
 
-    def get_container(self, container_id: str):
+    def get_client(self) -> cosmos_client.CosmosClient:
+        """
+        Retrieve the process-wide CosmosClient.
+        Every HTTP call it makes is recorded in "cosmos_metrics".
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _client
+
+        if _client is None:
+            with _lock:
+                if _client is None:
+                    _client = cosmos_client.CosmosClient(
+                        self.HOST, {'masterKey': self.MASTER_KEY},
+                        raw_request_hook=cosmos_metrics.on_request,
+                        raw_response_hook=cosmos_metrics.on_response)
+        return _client
+
+    def get_bulk_client(self) -> cosmos_client.CosmosClient:
+        """
+        Retrieve the process-wide CosmosClient of the bulk operations.
+        Its SDK throttling retries are limited to "COSMOS_BULK_SDK_THROTTLE_RETRIES"
+        (none by default), so the 429s reach "bulk_execute" and its adaptive
+        concurrency limit instead of being absorbed by the SDK (9 retries and
+        up to 30 seconds by default).
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _bulk_client
+
+        if _bulk_client is None:
+            with _lock:
+                if _bulk_client is None:
+                    connection_policy = ConnectionPolicy()
+                    connection_policy.RetryOptions = RetryOptions(
+                        max_retry_attempt_count=COSMOS_BULK_SDK_THROTTLE_RETRIES)
+                    _bulk_client = cosmos_client.CosmosClient(
+                        self.HOST, {'masterKey': self.MASTER_KEY},
+                        connection_policy=connection_policy,
+                        raw_request_hook=cosmos_metrics.on_request,
+                        raw_response_hook=cosmos_metrics.on_response)
+        return _bulk_client
+
+    def get_bulk_container(self, container):
         """
-        Retrieve the desired CosmosDB container
+        Proxy of the container bound to the bulk client ("get_bulk_client").
+        The container must be provisioned already ("get_container").
+        Other objects (e.g. "LocalCosmosContainer") are returned as they are.
 
         Author: Matheus Henrique (m.araujo)
         """
-        client = cosmos_client.CosmosClient(
-            self.HOST, {'masterKey': self.MASTER_KEY})
+        if not isinstance(container, ContainerProxy.ContainerProxy):
+            return container
 
-        db = client.create_database_if_not_exists(id=self.DATABASE_ID)
+        bulk_container = _bulk_containers.get(container.id)
+        if bulk_container is None:
+            bulk_container = self.get_bulk_client().get_database_client(
+                self.DATABASE_ID).get_container_client(container.id)
+            _bulk_containers[container.id] = bulk_container
+        return bulk_container
 
-        container = db.create_container_if_not_exists(
-            id=container_id,
-            partition_key=PartitionKey(path='/id', kind='Hash'))
+    def get_database(self):
+        """
+        Retrieve the CosmosDB database, creating it once if it doesn't exist
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _database
+
+        if _database is None:
+            client = self.get_client()
+            with _lock:
+                if _database is None:
+                    _database = client.create_database_if_not_exists(
+                        id=self.DATABASE_ID)
+        return _database
+
+    def get_container(self, container_id: str, partition_key_path: str = None):
+        """
+        Retrieve the desired CosmosDB container (cached proxy).
+        The container is created, when it doesn't exist, with the partition key
+        path configured in "CONTAINERS_PARTITION_KEYS" (or "partition_key_path").
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        container = _containers.get(container_id)
+        if container is not None:
+            return container
+
+        if partition_key_path is None:
+            partition_key_path = self.get_partition_key_path(container_id)
+
+        db = self.get_database()
+        with _lock:
+            container = _containers.get(container_id)
+            if container is None:
+                container = db.create_container_if_not_exists(
+                    id=container_id,
+                    partition_key=PartitionKey(path=partition_key_path, kind='Hash'))
+                _containers[container_id] = container
 
         return container
 
+    def provision_containers(self, container_ids: List[str]):
+        """
+        Provision (create if not exists) the database and the given containers.
+        Must be called on the application startup.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        for container_id in container_ids:
+            self.get_container(container_id)
+
+    def get_partition_key_path(self, container_id: str) -> str:
+        """
+        Partition key path configured for the container
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return cosmosdb_common.get_partition_key_path(container_id)
+
+    def get_partition_key_value(self, container_id: str, item: Dict):
+        """
+        Partition key value of an item, building it when the key is synthetic
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return cosmosdb_common.get_partition_key_value(container_id, item)
+
+    def apply_partition_key(self, container_id: str, items: List[Dict]) -> List[Dict]:
+        """
+        Set the synthetic partition key property in the items (in place)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return cosmosdb_common.apply_partition_key(container_id, items)
+
+    def partition_key_for_filter(self, container, field: str, value):
+        """
+        Return "value" when the container is partitioned by "field", so a query
+        filtered by it can target a single partition (None otherwise)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return cosmosdb_common.partition_key_for_filter(container.id, field, value)
+
     def create_items(self, container: ContainerProxy, items: List[Dict]):
         """
-        Create CosmosDB items in a container
+        Create CosmosDB items in a container (concurrently, see "bulk_create_items").
+        Raises the first failure after all the items were tried.
 
         Author: Matheus Henrique (m.araujo)
         """
-        created_items = []
-        for item in items:
-            created_items.append(container.create_item(body=item))
-        return created_items
+        return raise_for_bulk_errors(
+            self.bulk_create_items(container, items))
 
     def upsert_items(self, container: ContainerProxy, items: List[Dict]):
         """
-        Upsert CosmosDB items to a container
+        Upsert CosmosDB items to a container (concurrently, see "bulk_upsert_items").
+        Raises the first failure after all the items were tried.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return raise_for_bulk_errors(
+            self.bulk_upsert_items(container, items))
+
+    def bulk_create_items(
+        self, container: ContainerProxy, items: List[Dict],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Create CosmosDB items with bounded, throttling-adaptive concurrency
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (see "bulk_execute")
+        """
+        self.apply_partition_key(container.id, items)
+        container = self.get_bulk_container(container)
+
+        return self.bulk_execute(
+            [(container.create_item, {'body': item}) for item in items],
+            max_concurrency=max_concurrency)
+
+    def bulk_upsert_items(
+        self, container: ContainerProxy, items: List[Dict],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Upsert CosmosDB items with bounded, throttling-adaptive concurrency
 
         Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (see "bulk_execute")
         """
-        created_items = []
-        for item in items:
-            created_items.append(container.upsert_item(body=item))
-        return created_items
+        self.apply_partition_key(container.id, items)
+        container = self.get_bulk_container(container)
+
+        return self.bulk_execute(
+            [(container.upsert_item, {'body': item}) for item in items],
+            max_concurrency=max_concurrency)
+
+    def bulk_execute(
+        self,
+        operations: List[Tuple[Callable, Dict]],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY,
+        max_retries: int = COSMOS_BULK_MAX_RETRIES
+    ) -> List[Dict]:
+        """
+        Run CosmosDB operations ("(method, kwargs)" pairs) concurrently.
+
+        - At most "max_concurrency" operations are in flight
+        - Throttled operations (429) wait the "x-ms-retry-after-ms" header
+          (plus jitter) and are retried up to "max_retries" times
+        - The concurrency is halved on each throttle and grows back slowly
+          on successes (AIMD), so a throttled container is not hammered.
+          The methods should be bound to "get_bulk_container" proxies: the
+          shared client retries the 429s itself, hiding them from the limit
 
-    def read_item(self, container: ContainerProxy, uuid: str):
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] in the same order of "operations", with the keys:
+                - index (int), status_code (int), retries (int)
+                - item (Dict): CosmosDB response body (None when failed)
+                - error (str): error message (None when succeeded)
         """
-        Read container CosmosDB item
+        if not operations:
+            return []
+
+        limiter = AdaptiveConcurrencyLimiter(max_concurrency)
+
+        def execute(index: int, method: Callable, kwargs: Dict) -> Dict:
+            retries = 0
+            while True:
+                throttled = False
+                limiter.acquire()
+                try:
+                    item = method(**kwargs)
+                except (CosmosHttpResponseError, CosmosBatchOperationError) as error:
+                    throttled = error.status_code == 429
+                    if not throttled or retries >= max_retries:
+                        return bulk_outcome(index, retries, error=error)
+                    wait_seconds = cosmosdb_common.retry_after_seconds(error, retries)
+                finally:
+                    # Released on any outcome (e.g. ServiceRequestError), so
+                    # the other operations never wait for a lost slot
+                    limiter.release(throttled=throttled)
+
+                if throttled:
+                    time.sleep(wait_seconds)
+                    retries += 1
+                    continue
+
+                return bulk_outcome(index, retries, item=item)
+
+        with ThreadPoolExecutor(
+                max_workers=min(max_concurrency, len(operations))) as executor:
+            # The context is copied so the calls count in the current request totals
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, execute, index, method, kwargs)
+                for index, (method, kwargs) in enumerate(operations)
+            ]
+            return [future.result() for future in futures]
+
+    def read_item(self, container: ContainerProxy, uuid: str, partition_key=None):
+        """
+        Read container CosmosDB item.
+        When the container is not partitioned by "/id", pass the "partition_key"
+        for a point read, otherwise a cross-partition query is used.
 
         Author: Matheus Henrique (m.araujo)
         """
-        response = container.read_item(item=uuid, partition_key=uuid)
+        if partition_key is None:
+            if self.get_partition_key_path(container.id) != DEFAULT_PARTITION_KEY_PATH:
+                return self.__find_item(container, uuid)
+            partition_key = uuid
+
+        response = container.read_item(item=uuid, partition_key=partition_key)
         return response
 
     def read_items(self, container, max_item_count: int = 10):
         """
-        Read container CosmosDB items
+        Read container CosmosDB items (at most "max_item_count" items,
+        the first page of "read_items_page")
 
         Author: Matheus Henrique (m.araujo)
         """
         # NOTE: Use MaxItemCount on Options to control how many items come back per trip to the server
         #       Important to handle throttles whenever you are doing generations such as this that might
         #       result in a 429 (throttled request)
-        item_list = list(container.read_all_items(
-            max_item_count=max_item_count))
+        return self.read_items_page(container, max_item_count)['items']
 
-        return item_list
+    def read_items_page(
+        self, container, max_item_count: int = COSMOS_PAGE_SIZE,
+        continuation_token: str = None
+    ) -> Dict:
+        """
+        Read one page of container CosmosDB items
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
+        """
+        pager = container.read_all_items(
+            max_item_count=max_item_count).by_page(continuation_token)
+
+        return self.__first_page(pager)
 
     def read_all_items(self, container):
         """
         Read all container CosmosDB items
+        (prefer "iter_all_items" or "query_items_page" for big containers)
 
         Author: Matheus Henrique (m.araujo)
         """
-        # enable_cross_partition_query should be set to True as the container is partitioned
-        items = list(container.query_items(
-            query="SELECT * FROM r",
-            parameters=[],
-            enable_cross_partition_query=True
-        ))
+        return list(self.iter_all_items(container))
 
-        return items
+    def iter_all_items(self, container, max_item_count: int = COSMOS_PAGE_SIZE):
+        """
+        Stream all container CosmosDB items, fetching a page at a time
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return self.iter_query_items(
+            container, "SELECT * FROM r", max_item_count=max_item_count)
 
     def query_items_by_user_id(self, container, user_id):
         """
@@ -109,52 +436,270 @@ class CosmosDB:
         Returns:
             List[any]: list of Azure CosmosDB items
         """
-        # enable_cross_partition_query should be set to True as the container is partitioned
-        items = list(container.query_items(
-            query="SELECT * FROM r WHERE r.user_id=@user_id",
-            parameters=[
-                {"name": "@user_id", "value": user_id}
-            ],
-            enable_cross_partition_query=True
+        return list(self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.user_id=@user_id",
+            [{"name": "@user_id", "value": user_id}],
+            partition_key=self.partition_key_for_filter(
+                container, 'user_id', user_id)
         ))
 
-        return items
+    def query_items_by_object_uuid(self, container, object_uuid: str):
+        """
+        query all items (e.g. audit logs) of an object. It is a single
+        partition query when the container is partitioned by "/object_uuid".
+
+        Author: Matheus Henrique (m.araujo)
 
-    def query_items_where_in_id(self, container, uuid_list, is_in: bool = True):
+        Returns:
+            List[any]: list of Azure CosmosDB items
         """
-        This method will query all items that is IN or NOT (based on the "is_in" aparameter)
-        in the cosmosdb container.
+        return list(self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.object_uuid=@object_uuid",
+            [{"name": "@object_uuid", "value": object_uuid}],
+            partition_key=self.partition_key_for_filter(
+                container, 'object_uuid', object_uuid)
+        ))
+
+    def query_items_by_user_id_page(
+        self, container, user_id, max_item_count: int = COSMOS_PAGE_SIZE,
+        continuation_token: str = None
+    ) -> Dict:
+        """
+        query one page of items from user_id
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
+        """
+        return self.query_items_page(
+            container,
+            "SELECT * FROM r WHERE r.user_id=@user_id",
+            [{"name": "@user_id", "value": user_id}],
+            max_item_count=max_item_count,
+            continuation_token=continuation_token,
+            partition_key=self.partition_key_for_filter(
+                container, 'user_id', user_id)
+        )
+
+    def iter_query_items(
+        self, container, query: str, parameters: List[Dict] = None,
+        max_item_count: int = COSMOS_PAGE_SIZE, **kwargs
+    ) -> Iterator[Dict]:
+        """
+        Stream the query results: only one page ("max_item_count" items)
+        is held in memory at a time
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        self.__set_query_partition(kwargs)
+
+        for page in container.query_items(
+            query=query,
+            parameters=parameters or [],
+            max_item_count=max_item_count,
+            **kwargs
+        ).by_page():
+            yield from page
+
+    def query_items_page(
+        self, container, query: str, parameters: List[Dict] = None,
+        max_item_count: int = COSMOS_PAGE_SIZE, continuation_token: str = None,
+        **kwargs
+    ) -> Dict:
+        """
+        Fetch a single page of the query results. The returned
+        "continuation_token" (None on the last page) resumes the query,
+        so it can be handed to API clients as a cursor.
 
         Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
         """
-        query = "SELECT * FROM c WHERE " +\
-            f"{'' if is_in else 'NOT'} ARRAY_CONTAINS(@id, c.id)"
+        self.__set_query_partition(kwargs)
 
-        items = list(container.query_items(
+        pager = container.query_items(
             query=query,
-            parameters=[
-                {"name": "@id", "value": uuid_list}
-            ],
-            enable_cross_partition_query=True
+            parameters=parameters or [],
+            max_item_count=max_item_count,
+            **kwargs
+        ).by_page(continuation_token)
+
+        return self.__first_page(pager)
+
+    def __set_query_partition(self, kwargs: Dict):
+        """
+        Single partition query when a "partition_key" is known,
+        cross-partition otherwise
+        """
+        if kwargs.get('partition_key') is None:
+            kwargs.pop('partition_key', None)
+            # enable_cross_partition_query should be set to True as the container is partitioned
+            kwargs.setdefault('enable_cross_partition_query', True)
+
+    def __find_item(self, container, uuid: str) -> Dict:
+        """
+        Cross-partition lookup by id, for when the partition key is unknown
+        """
+        items = list(self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.id=@id",
+            [{"name": "@id", "value": uuid}]
         ))
+        if not items:
+            raise CosmosHttpResponseError(
+                status_code=404, message=f"Item '{uuid}' does not exist")
+        return items[0]
+
+    def copy_container(
+        self, source_container_id: str, target_container_id: str,
+        target_partition_key_path: str,
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> Dict:
+        """
+        Copy every item of a container into another one (created with
+        "target_partition_key_path" if it doesn't exist), e.g. to re-partition it.
+        Pages are read one at a time and written with bulk upserts, so the
+        copy can be safely re-run.
+
+        Author: Matheus Henrique (m.araujo)
 
-        return items
+        Returns:
+            result: Dict ({'copied': int, 'failed': int, 'errors': List[Dict]})
+        """
+        source = self.get_container(source_container_id)
+        target = self.get_bulk_container(self.get_container(
+            target_container_id, partition_key_path=target_partition_key_path))
+
+        result = {'copied': 0, 'failed': 0, 'errors': []}
+        for page in source.query_items(
+            query="SELECT * FROM r",
+            enable_cross_partition_query=True,
+            max_item_count=COSMOS_PAGE_SIZE
+        ).by_page():
+            items = cosmosdb_common.prepare_copied_items(page, target_partition_key_path)
+
+            outcomes = self.bulk_execute(
+                [(target.upsert_item, {'body': item}) for item in items],
+                max_concurrency=max_concurrency)
+            cosmosdb_common.add_copy_outcomes(result, items, outcomes)
+
+        return result
+
+    def __first_page(self, pager) -> Dict:
+        page = next(pager, None)
+        items = list(page) if page is not None else []
+
+        return {
+            'items': items,
+            'continuation_token': pager.continuation_token if items else None,
+        }
+
+    def query_items_where_in_id(
+        self, container, uuid_list, is_in: bool = True,
+        chunk_size: int = COSMOS_IN_QUERY_CHUNK_SIZE
+    ):
+        """
+        This method will query all items that is IN or NOT (based on the "is_in" aparameter)
+        in the cosmosdb container.
+
+        - IN on a container partitioned by "/id": parallel point reads (1 RU each)
+        - IN otherwise: the ids are split in chunks of "chunk_size", queried
+          in parallel and the results merged
+        - NOT IN with more than "chunk_size" ids: the container is streamed and
+          filtered locally (NOT IN can't be split in chunks)
 
-    def delete_item(self, container, uuid):
+        Author: Matheus Henrique (m.araujo)
+        """
+        uuid_list = list(dict.fromkeys(uuid_list))
+
+        if is_in and self.get_partition_key_path(container.id) == DEFAULT_PARTITION_KEY_PATH:
+            bulk_container = self.get_bulk_container(container)
+            outcomes = self.bulk_execute([
+                (bulk_container.read_item, {'item': uuid, 'partition_key': uuid})
+                for uuid in uuid_list
+            ])
+            return raise_for_bulk_errors(
+                [outcome for outcome in outcomes if outcome['status_code'] != 404])
+
+        if len(uuid_list) <= chunk_size:
+            return self.__query_where_in_id(container, uuid_list, is_in)
+
+        if not is_in:
+            excluded_ids = set(uuid_list)
+            return [
+                item for item in self.iter_all_items(container)
+                if item['id'] not in excluded_ids
+            ]
+
+        chunks_items = raise_for_bulk_errors(self.bulk_execute([
+            (self.__query_where_in_id,
+             {'container': container, 'uuid_list': chunk, 'is_in': True})
+            for chunk in cosmosdb_common.chunk_list(uuid_list, chunk_size)
+        ]))
+
+        return [item for items in chunks_items for item in items]
+
+    def __query_where_in_id(self, container, uuid_list: List[str], is_in: bool):
+        return list(self.iter_query_items(
+            container, *cosmosdb_common.where_in_id_query(uuid_list, is_in)))
+
+    def delete_item(self, container, uuid, partition_key=None):
         """
         Delete CosmosDB item
+        (pass the "partition_key" when the container is not partitioned by "/id")
 
         Author: Matheus Henrique (m.araujo)
         """
-        response = container.delete_item(item=uuid, partition_key=uuid)
+        if partition_key is None:
+            partition_key = uuid
+            if self.get_partition_key_path(container.id) != DEFAULT_PARTITION_KEY_PATH:
+                partition_key = self.get_partition_key_value(
+                    container.id, self.__find_item(container, uuid))
+
+        response = container.delete_item(item=uuid, partition_key=partition_key)
 
         return response
 
-    def delete_items(self, container, uuids: List[str]):
+    def delete_items(
+        self, container, uuids: List[str], partition_keys: Dict[str, any] = None
+    ):
         """
-        Delete CosmosDB items
+        Delete CosmosDB items (concurrently, see "bulk_delete_items").
+        Raises the first failure after all the items were tried.
 
         Author: Matheus Henrique (m.araujo)
         """
-        for id in uuids:
-            container.delete_item(item=id, partition_key=id)
+        raise_for_bulk_errors(
+            self.bulk_delete_items(container, uuids, partition_keys))
+
+    def bulk_delete_items(
+        self, container, uuids: List[str], partition_keys: Dict[str, any] = None,
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Delete CosmosDB items.
+
+        - Items sharing a partition key (given in "partition_keys", id -> key)
+          are deleted by transactional batches of up to 100 operations
+        - The other items are deleted one by one
+        Batches and single deletes run with bounded concurrency (see "bulk_execute").
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] in the same order of "uuids" (see "bulk_execute"),
+            the items of a failed batch share its error.
+        """
+        # "delete_item" looks the partition key up when it is unknown
+        operations, operations_uuids = cosmosdb_common.build_delete_operations(
+            self.get_bulk_container(container), uuids, partition_keys, self.delete_item)
+
+        return cosmosdb_common.delete_outcomes(
+            uuids,
+            self.bulk_execute(operations, max_concurrency=max_concurrency),
+            operations_uuids
+        )
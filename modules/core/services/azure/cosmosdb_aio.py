@@ -0,0 +1,654 @@
+import asyncio
+from typing import AsyncIterator, Callable, Dict, List, Tuple
+from azure.cosmos.aio import CosmosClient, ContainerProxy
+from azure.cosmos.documents import ConnectionPolicy, RetryOptions
+from azure.cosmos.partition_key import PartitionKey
+from azure.cosmos.exceptions import (
+    CosmosBatchOperationError, CosmosHttpResponseError
+)
+from modules.core.services.azure.cosmosdb_metrics import cosmos_metrics
+from modules.core.services.azure import cosmosdb_common
+from modules.core.services.azure.cosmosdb_common import (
+    DEFAULT_PARTITION_KEY_PATH, AimdLimit, bulk_outcome, raise_for_bulk_errors
+)
+from modules.core.env import (
+    COSMOS_BASE_FASTAPI_DATABASE, COSMOS_BULK_MAX_CONCURRENCY,
+    COSMOS_BULK_MAX_RETRIES, COSMOS_BULK_SDK_THROTTLE_RETRIES,
+    COSMOS_CONNECTION_STRING, COSMOS_IN_QUERY_CHUNK_SIZE, COSMOS_KEY,
+    COSMOS_PAGE_SIZE
+)
+
+# One async CosmosClient per process (bound to the application event loop)
+# and the container proxies already provisioned
+_client: CosmosClient = None
+_database = None
+_containers: Dict[str, ContainerProxy] = {}
+# Async CosmosClient of the bulk operations (see "AsyncCosmosDB.get_bulk_client")
+_bulk_client: CosmosClient = None
+_bulk_containers: Dict[str, ContainerProxy] = {}
+_lock: asyncio.Lock = None
+
+
+def _get_lock() -> asyncio.Lock:
+    global _lock
+
+    if _lock is None:
+        _lock = asyncio.Lock()
+    return _lock
+
+
+async def close_async_cosmos_client():
+    """
+    Close the process-wide async CosmosClient (application shutdown)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    global _client, _database, _bulk_client, _lock
+
+    if _client is not None:
+        await _client.close()
+    if _bulk_client is not None:
+        await _bulk_client.close()
+    _client = None
+    _database = None
+    _bulk_client = None
+    _lock = None
+    _containers.clear()
+    _bulk_containers.clear()
+
+
+class AsyncAdaptiveConcurrencyLimiter:
+    """
+    Async version of "AdaptiveConcurrencyLimiter" (AIMD, see "AimdLimit")
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.state = AimdLimit(max_concurrency)
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(self.state.has_slot)
+            self.state.acquired()
+
+    async def release(self, throttled: bool = False):
+        async with self._condition:
+            self.state.released(throttled)
+            self._condition.notify_all()
+
+
+class AsyncCosmosDB:
+    """
+    This class provide async integration with CosmosDB SDK (azure.cosmos.aio).
+    It has the same surface of "CosmosDB", but it must be awaited, so request
+    handlers don't park a thread per CosmosDB call.
+
+    The async CosmosClient is shared by the whole process, it is created on the
+    first use (inside the running event loop) and must be closed on the
+    application shutdown ("close_async_cosmos_client").
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self) -> None:
+        self.HOST = COSMOS_CONNECTION_STRING
+        self.MASTER_KEY = COSMOS_KEY
+        self.DATABASE_ID = COSMOS_BASE_FASTAPI_DATABASE
+
+    async def get_client(self) -> CosmosClient:
+        """
+        Retrieve the process-wide async CosmosClient.
+        Every HTTP call it makes is recorded in "cosmos_metrics".
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _client
+
+        if _client is None:
+            async with _get_lock():
+                if _client is None:
+                    client = CosmosClient(
+                        self.HOST, {'masterKey': self.MASTER_KEY},
+                        raw_request_hook=cosmos_metrics.on_request,
+                        raw_response_hook=cosmos_metrics.on_response)
+                    # Opens the connection pool and reads the account endpoints
+                    await client.__aenter__()
+                    _client = client
+        return _client
+
+    async def get_bulk_client(self) -> CosmosClient:
+        """
+        Retrieve the process-wide async CosmosClient of the bulk operations,
+        with the SDK throttling retries limited to "COSMOS_BULK_SDK_THROTTLE_RETRIES"
+        (see "CosmosDB.get_bulk_client"): the 429s reach "bulk_execute" and
+        its adaptive concurrency limit.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _bulk_client
+
+        if _bulk_client is None:
+            async with _get_lock():
+                if _bulk_client is None:
+                    connection_policy = ConnectionPolicy()
+                    connection_policy.RetryOptions = RetryOptions(
+                        max_retry_attempt_count=COSMOS_BULK_SDK_THROTTLE_RETRIES)
+                    client = CosmosClient(
+                        self.HOST, {'masterKey': self.MASTER_KEY},
+                        connection_policy=connection_policy,
+                        raw_request_hook=cosmos_metrics.on_request,
+                        raw_response_hook=cosmos_metrics.on_response)
+                    await client.__aenter__()
+                    _bulk_client = client
+        return _bulk_client
+
+    async def get_bulk_container(self, container):
+        """
+        Proxy of the container bound to the bulk client ("get_bulk_client"),
+        see "CosmosDB.get_bulk_container"
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not isinstance(container, ContainerProxy):
+            return container
+
+        bulk_container = _bulk_containers.get(container.id)
+        if bulk_container is None:
+            bulk_container = (await self.get_bulk_client()).get_database_client(
+                self.DATABASE_ID).get_container_client(container.id)
+            _bulk_containers[container.id] = bulk_container
+        return bulk_container
+
+    async def get_database(self):
+        """
+        Retrieve the CosmosDB database, creating it once if it doesn't exist
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        global _database
+
+        if _database is None:
+            client = await self.get_client()
+            async with _get_lock():
+                if _database is None:
+                    _database = await client.create_database_if_not_exists(
+                        id=self.DATABASE_ID)
+        return _database
+
+    async def get_container(self, container_id: str, partition_key_path: str = None):
+        """
+        Retrieve the desired CosmosDB container (cached proxy), see
+        "CosmosDB.get_container"
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        container = _containers.get(container_id)
+        if container is not None:
+            return container
+
+        if partition_key_path is None:
+            partition_key_path = self.get_partition_key_path(container_id)
+
+        db = await self.get_database()
+        async with _get_lock():
+            container = _containers.get(container_id)
+            if container is None:
+                container = await db.create_container_if_not_exists(
+                    id=container_id,
+                    partition_key=PartitionKey(path=partition_key_path, kind='Hash'))
+                _containers[container_id] = container
+
+        return container
+
+    async def provision_containers(self, container_ids: List[str]):
+        """
+        Provision (create if not exists) the database and the given containers
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        for container_id in container_ids:
+            await self.get_container(container_id)
+
+    def get_partition_key_path(self, container_id: str) -> str:
+        return cosmosdb_common.get_partition_key_path(container_id)
+
+    def get_partition_key_value(self, container_id: str, item: Dict):
+        return cosmosdb_common.get_partition_key_value(container_id, item)
+
+    def apply_partition_key(self, container_id: str, items: List[Dict]) -> List[Dict]:
+        return cosmosdb_common.apply_partition_key(container_id, items)
+
+    def partition_key_for_filter(self, container, field: str, value):
+        return cosmosdb_common.partition_key_for_filter(container.id, field, value)
+
+    async def create_items(self, container: ContainerProxy, items: List[Dict]):
+        """
+        Create CosmosDB items in a container (concurrently, see "bulk_create_items").
+        Raises the first failure after all the items were tried.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return raise_for_bulk_errors(
+            await self.bulk_create_items(container, items))
+
+    async def upsert_items(self, container: ContainerProxy, items: List[Dict]):
+        """
+        Upsert CosmosDB items to a container (concurrently, see "bulk_upsert_items").
+        Raises the first failure after all the items were tried.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return raise_for_bulk_errors(
+            await self.bulk_upsert_items(container, items))
+
+    async def bulk_create_items(
+        self, container: ContainerProxy, items: List[Dict],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Create CosmosDB items with bounded, throttling-adaptive concurrency
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (see "bulk_execute")
+        """
+        self.apply_partition_key(container.id, items)
+        container = await self.get_bulk_container(container)
+
+        return await self.bulk_execute(
+            [(container.create_item, {'body': item}) for item in items],
+            max_concurrency=max_concurrency)
+
+    async def bulk_upsert_items(
+        self, container: ContainerProxy, items: List[Dict],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Upsert CosmosDB items with bounded, throttling-adaptive concurrency
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (see "bulk_execute")
+        """
+        self.apply_partition_key(container.id, items)
+        container = await self.get_bulk_container(container)
+
+        return await self.bulk_execute(
+            [(container.upsert_item, {'body': item}) for item in items],
+            max_concurrency=max_concurrency)
+
+    async def bulk_execute(
+        self,
+        operations: List[Tuple[Callable, Dict]],
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY,
+        max_retries: int = COSMOS_BULK_MAX_RETRIES
+    ) -> List[Dict]:
+        """
+        Run CosmosDB operations ("(coroutine function, kwargs)" pairs)
+        concurrently on the event loop, see "CosmosDB.bulk_execute"
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] in the same order of "operations", with the keys:
+                - index (int), status_code (int), retries (int)
+                - item (Dict): CosmosDB response body (None when failed)
+                - error (str): error message (None when succeeded)
+        """
+        if not operations:
+            return []
+
+        limiter = AsyncAdaptiveConcurrencyLimiter(max_concurrency)
+
+        async def execute(index: int, method: Callable, kwargs: Dict) -> Dict:
+            retries = 0
+            while True:
+                throttled = False
+                await limiter.acquire()
+                try:
+                    item = await method(**kwargs)
+                except (CosmosHttpResponseError, CosmosBatchOperationError) as error:
+                    throttled = error.status_code == 429
+                    if not throttled or retries >= max_retries:
+                        return bulk_outcome(index, retries, error=error)
+                    wait_seconds = cosmosdb_common.retry_after_seconds(error, retries)
+                finally:
+                    await limiter.release(throttled=throttled)
+
+                if throttled:
+                    await asyncio.sleep(wait_seconds)
+                    retries += 1
+                    continue
+
+                return bulk_outcome(index, retries, item=item)
+
+        return list(await asyncio.gather(*[
+            execute(index, method, kwargs)
+            for index, (method, kwargs) in enumerate(operations)
+        ]))
+
+    async def read_item(self, container: ContainerProxy, uuid: str, partition_key=None):
+        """
+        Read container CosmosDB item (see "CosmosDB.read_item")
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if partition_key is None:
+            if self.get_partition_key_path(container.id) != DEFAULT_PARTITION_KEY_PATH:
+                return await self.__find_item(container, uuid)
+            partition_key = uuid
+
+        response = await container.read_item(item=uuid, partition_key=partition_key)
+        return response
+
+    async def read_items(self, container, max_item_count: int = 10):
+        """
+        Read container CosmosDB items (at most "max_item_count" items)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return (await self.read_items_page(container, max_item_count))['items']
+
+    async def read_items_page(
+        self, container, max_item_count: int = COSMOS_PAGE_SIZE,
+        continuation_token: str = None
+    ) -> Dict:
+        """
+        Read one page of container CosmosDB items
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
+        """
+        pager = container.read_all_items(
+            max_item_count=max_item_count).by_page(continuation_token)
+
+        return await self.__first_page(pager)
+
+    async def read_all_items(self, container):
+        """
+        Read all container CosmosDB items
+        (prefer "iter_all_items" or "query_items_page" for big containers)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return [item async for item in self.iter_all_items(container)]
+
+    def iter_all_items(
+        self, container, max_item_count: int = COSMOS_PAGE_SIZE
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream all container CosmosDB items, fetching a page at a time
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        return self.iter_query_items(
+            container, "SELECT * FROM r", max_item_count=max_item_count)
+
+    async def query_items_by_user_id(self, container, user_id):
+        """
+        query all items from user_id
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            List[any]: list of Azure CosmosDB items
+        """
+        return [item async for item in self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.user_id=@user_id",
+            [{"name": "@user_id", "value": user_id}],
+            partition_key=self.partition_key_for_filter(
+                container, 'user_id', user_id)
+        )]
+
+    async def query_items_by_object_uuid(self, container, object_uuid: str):
+        """
+        query all items (e.g. audit logs) of an object
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            List[any]: list of Azure CosmosDB items
+        """
+        return [item async for item in self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.object_uuid=@object_uuid",
+            [{"name": "@object_uuid", "value": object_uuid}],
+            partition_key=self.partition_key_for_filter(
+                container, 'object_uuid', object_uuid)
+        )]
+
+    async def query_items_by_user_id_page(
+        self, container, user_id, max_item_count: int = COSMOS_PAGE_SIZE,
+        continuation_token: str = None
+    ) -> Dict:
+        """
+        query one page of items from user_id
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
+        """
+        return await self.query_items_page(
+            container,
+            "SELECT * FROM r WHERE r.user_id=@user_id",
+            [{"name": "@user_id", "value": user_id}],
+            max_item_count=max_item_count,
+            continuation_token=continuation_token,
+            partition_key=self.partition_key_for_filter(
+                container, 'user_id', user_id)
+        )
+
+    async def iter_query_items(
+        self, container, query: str, parameters: List[Dict] = None,
+        max_item_count: int = COSMOS_PAGE_SIZE, **kwargs
+    ) -> AsyncIterator[Dict]:
+        """
+        Stream the query results: only one page ("max_item_count" items)
+        is held in memory at a time
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        self.__set_query_partition(kwargs)
+
+        async for page in container.query_items(
+            query=query,
+            parameters=parameters or [],
+            max_item_count=max_item_count,
+            **kwargs
+        ).by_page():
+            async for item in page:
+                yield item
+
+    async def query_items_page(
+        self, container, query: str, parameters: List[Dict] = None,
+        max_item_count: int = COSMOS_PAGE_SIZE, continuation_token: str = None,
+        **kwargs
+    ) -> Dict:
+        """
+        Fetch a single page of the query results (see "CosmosDB.query_items_page")
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            page: Dict ({'items': List[Dict], 'continuation_token': str})
+        """
+        self.__set_query_partition(kwargs)
+
+        pager = container.query_items(
+            query=query,
+            parameters=parameters or [],
+            max_item_count=max_item_count,
+            **kwargs
+        ).by_page(continuation_token)
+
+        return await self.__first_page(pager)
+
+    def __set_query_partition(self, kwargs: Dict):
+        """
+        Single partition query when a "partition_key" is known,
+        cross-partition otherwise (the async SDK enables it by itself)
+        """
+        if kwargs.get('partition_key') is None:
+            kwargs.pop('partition_key', None)
+
+    async def __find_item(self, container, uuid: str) -> Dict:
+        """
+        Cross-partition lookup by id, for when the partition key is unknown
+        """
+        async for item in self.iter_query_items(
+            container,
+            "SELECT * FROM r WHERE r.id=@id",
+            [{"name": "@id", "value": uuid}]
+        ):
+            return item
+        raise CosmosHttpResponseError(
+            status_code=404, message=f"Item '{uuid}' does not exist")
+
+    async def __first_page(self, pager) -> Dict:
+        try:
+            page = await pager.__anext__()
+            items = [item async for item in page]
+        except StopAsyncIteration:
+            items = []
+
+        return {
+            'items': items,
+            'continuation_token': pager.continuation_token if items else None,
+        }
+
+    async def copy_container(
+        self, source_container_id: str, target_container_id: str,
+        target_partition_key_path: str,
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> Dict:
+        """
+        Copy every item of a container into another one
+        (see "CosmosDB.copy_container")
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            result: Dict ({'copied': int, 'failed': int, 'errors': List[Dict]})
+        """
+        source = await self.get_container(source_container_id)
+        target = await self.get_bulk_container(await self.get_container(
+            target_container_id, partition_key_path=target_partition_key_path))
+
+        result = {'copied': 0, 'failed': 0, 'errors': []}
+        async for page in source.query_items(
+            query="SELECT * FROM r",
+            max_item_count=COSMOS_PAGE_SIZE
+        ).by_page():
+            items = cosmosdb_common.prepare_copied_items(
+                [item async for item in page], target_partition_key_path)
+
+            outcomes = await self.bulk_execute(
+                [(target.upsert_item, {'body': item}) for item in items],
+                max_concurrency=max_concurrency)
+            cosmosdb_common.add_copy_outcomes(result, items, outcomes)
+
+        return result
+
+    async def query_items_where_in_id(
+        self, container, uuid_list, is_in: bool = True,
+        chunk_size: int = COSMOS_IN_QUERY_CHUNK_SIZE
+    ):
+        """
+        This method will query all items that is IN or NOT (based on the "is_in" aparameter)
+        in the cosmosdb container (see "CosmosDB.query_items_where_in_id").
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        uuid_list = list(dict.fromkeys(uuid_list))
+
+        if is_in and self.get_partition_key_path(container.id) == DEFAULT_PARTITION_KEY_PATH:
+            bulk_container = await self.get_bulk_container(container)
+            outcomes = await self.bulk_execute([
+                (bulk_container.read_item, {'item': uuid, 'partition_key': uuid})
+                for uuid in uuid_list
+            ])
+            return raise_for_bulk_errors(
+                [outcome for outcome in outcomes if outcome['status_code'] != 404])
+
+        if len(uuid_list) <= chunk_size:
+            return await self.__query_where_in_id(container, uuid_list, is_in)
+
+        if not is_in:
+            excluded_ids = set(uuid_list)
+            return [
+                item async for item in self.iter_all_items(container)
+                if item['id'] not in excluded_ids
+            ]
+
+        chunks_items = raise_for_bulk_errors(await self.bulk_execute([
+            (self.__query_where_in_id,
+             {'container': container, 'uuid_list': chunk, 'is_in': True})
+            for chunk in cosmosdb_common.chunk_list(uuid_list, chunk_size)
+        ]))
+
+        return [item for items in chunks_items for item in items]
+
+    async def __query_where_in_id(self, container, uuid_list: List[str], is_in: bool):
+        return [item async for item in self.iter_query_items(
+            container, *cosmosdb_common.where_in_id_query(uuid_list, is_in))]
+
+    async def delete_item(self, container, uuid, partition_key=None):
+        """
+        Delete CosmosDB item
+        (pass the "partition_key" when the container is not partitioned by "/id")
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if partition_key is None:
+            partition_key = uuid
+            if self.get_partition_key_path(container.id) != DEFAULT_PARTITION_KEY_PATH:
+                partition_key = self.get_partition_key_value(
+                    container.id, await self.__find_item(container, uuid))
+
+        response = await container.delete_item(item=uuid, partition_key=partition_key)
+
+        return response
+
+    async def delete_items(
+        self, container, uuids: List[str], partition_keys: Dict[str, any] = None
+    ):
+        """
+        Delete CosmosDB items (concurrently, see "bulk_delete_items").
+        Raises the first failure after all the items were tried.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        raise_for_bulk_errors(
+            await self.bulk_delete_items(container, uuids, partition_keys))
+
+    async def bulk_delete_items(
+        self, container, uuids: List[str], partition_keys: Dict[str, any] = None,
+        max_concurrency: int = COSMOS_BULK_MAX_CONCURRENCY
+    ) -> List[Dict]:
+        """
+        Delete CosmosDB items, by transactional batches when they share a
+        partition key (see "CosmosDB.bulk_delete_items")
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] in the same order of "uuids" (see "bulk_execute")
+        """
+        # "delete_item" looks the partition key up when it is unknown
+        operations, operations_uuids = cosmosdb_common.build_delete_operations(
+            await self.get_bulk_container(container), uuids, partition_keys,
+            self.delete_item)
+
+        return cosmosdb_common.delete_outcomes(
+            uuids,
+            await self.bulk_execute(operations, max_concurrency=max_concurrency),
+            operations_uuids
+        )
@@ -0,0 +1,305 @@
+import random
+from typing import Callable, Dict, List, Tuple
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from modules.core.env import (
+    COSMOS_AUDIT_LOG_PARTITION_KEY, COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER
+)
+
+# Pure helpers shared by "CosmosDB" (cosmosdb.py) and "AsyncCosmosDB"
+# (cosmosdb_aio.py): partition keys, AIMD concurrency limit, throttling
+# backoff, bulk outcomes, query building, chunking and grouping. Only the
+# I/O (threads or event loop) is implemented by each class.
+
+DEFAULT_PARTITION_KEY_PATH = '/id'
+
+# CosmosDB limit of operations in a transactional batch
+TRANSACTIONAL_BATCH_MAX_OPERATIONS = 100
+
+# Partition key path of each container (the ones not listed use "/id")
+CONTAINERS_PARTITION_KEYS: Dict[str, str] = {
+    COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER: COSMOS_AUDIT_LOG_PARTITION_KEY,
+}
+
+# Synthetic partition keys: the value is built from the item and stored in
+# the property of the path before the item is written
+SYNTHETIC_PARTITION_KEYS: Dict[str, Callable[[Dict], str]] = {
+    # e.g.: "15_2024-10" (audit logs of a user in a month)
+    '/user_month': lambda item: f"{item.get('auth_user_id')}_{str(item.get('date_create', ''))[:7]}",
+}
+
+# CosmosDB system properties, not copied between containers
+SYSTEM_PROPERTIES = ('_rid', '_self', '_etag', '_attachments', '_ts')
+
+
+def get_partition_key_path(container_id: str) -> str:
+    """
+    Partition key path configured for the container
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    return CONTAINERS_PARTITION_KEYS.get(container_id) or DEFAULT_PARTITION_KEY_PATH
+
+
+def get_partition_key_value(container_id: str, item: Dict):
+    """
+    Partition key value of an item, building it when the key is synthetic
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    path = get_partition_key_path(container_id)
+
+    if path in SYNTHETIC_PARTITION_KEYS:
+        return SYNTHETIC_PARTITION_KEYS[path](item)
+
+    value = item
+    for key in path.strip('/').split('/'):
+        value = value.get(key) if isinstance(value, dict) else None
+    return value
+
+
+def apply_partition_key(container_id: str, items: List[Dict]) -> List[Dict]:
+    """
+    Set the synthetic partition key property in the items (in place)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    path = get_partition_key_path(container_id)
+
+    if path in SYNTHETIC_PARTITION_KEYS:
+        for item in items:
+            item[path.strip('/')] = SYNTHETIC_PARTITION_KEYS[path](item)
+    return items
+
+
+def partition_key_for_filter(container_id: str, field: str, value):
+    """
+    Return "value" when the container is partitioned by "field", so a query
+    filtered by it can target a single partition (None otherwise)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    if get_partition_key_path(container_id) == f'/{field}':
+        return value
+    return None
+
+
+class AimdLimit:
+    """
+    State of a concurrency limit that adapts to throttling (AIMD): each
+    throttled operation halves the limit, each success increases it by
+    "1 / limit". Not thread-safe: the limiters guard it with their own
+    (threading or asyncio) condition.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self, max_concurrency: int) -> None:
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.throttles = 0
+
+    def has_slot(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def acquired(self):
+        self.in_flight += 1
+
+    def released(self, throttled: bool = False):
+        self.in_flight -= 1
+        if throttled:
+            self.throttles += 1
+            self.limit = max(1.0, self.limit / 2)
+        else:
+            self.limit = min(
+                float(self.max_concurrency), self.limit + 1 / self.limit)
+
+
+def retry_after_seconds(error: CosmosHttpResponseError, retries: int) -> float:
+    """
+    Throttling wait time: the server hint ("x-ms-retry-after-ms") or an
+    exponential backoff, both with jitter
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    retry_after_ms = (error.headers or {}).get('x-ms-retry-after-ms')
+    if retry_after_ms is not None:
+        base = float(retry_after_ms) / 1000
+    else:
+        base = min(0.1 * 2 ** retries, 5)
+    return base + random.uniform(0, base / 2)
+
+
+def bulk_outcome(index: int, retries: int, item: Dict = None, error=None) -> Dict:
+    """
+    Outcome of a bulk operation (see "CosmosDB.bulk_execute"), failed when
+    "error" (a CosmosHttpResponseError) is given
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    if error is not None:
+        return {
+            'index': index,
+            'status_code': error.status_code,
+            'retries': retries,
+            'item': None,
+            'error': error.http_error_message or str(error),
+        }
+
+    return {
+        'index': index,
+        'status_code': 200,
+        'retries': retries,
+        'item': item,
+        'error': None,
+    }
+
+
+def raise_for_bulk_errors(outcomes: List[Dict]) -> List[Dict]:
+    """
+    Items of the bulk outcomes, raising the first failure
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    for outcome in outcomes:
+        if outcome['error'] is not None:
+            raise CosmosHttpResponseError(
+                status_code=outcome['status_code'], message=outcome['error'])
+    return [outcome['item'] for outcome in outcomes]
+
+
+def chunk_list(values: List, chunk_size: int) -> List[List]:
+    """
+    Split "values" in lists of at most "chunk_size" values, in order
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    return [
+        values[index:index + chunk_size]
+        for index in range(0, len(values), chunk_size)
+    ]
+
+
+def where_in_id_query(uuid_list: List[str], is_in: bool) -> Tuple[str, List[Dict]]:
+    """
+    Query (and its parameters) of the items whose id is IN or NOT IN "uuid_list"
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    query = "SELECT * FROM c WHERE " +\
+        f"{'' if is_in else 'NOT'} ARRAY_CONTAINS(@id, c.id)"
+
+    return query, [{"name": "@id", "value": uuid_list}]
+
+
+def build_delete_operations(
+    container, uuids: List[str], partition_keys: Dict[str, any],
+    delete_with_lookup: Callable
+) -> Tuple[List[Tuple[Callable, Dict]], List[List[str]]]:
+    """
+    Bulk operations deleting "uuids" (see "CosmosDB.bulk_delete_items"):
+
+    - Items sharing a partition key (given in "partition_keys", id -> key)
+      are deleted by transactional batches of up to 100 operations
+    - The other items are deleted one by one, "delete_with_lookup" (e.g.
+      "CosmosDB.delete_item") looking their partition key up when unknown
+
+    Author: Matheus Henrique (m.araujo)
+
+    Returns:
+        operations: List[Tuple[Callable, Dict]] (see "CosmosDB.bulk_execute")
+        operations_uuids: List[List[str]] (the uuids deleted by each operation)
+    """
+    is_partitioned_by_id = \
+        get_partition_key_path(container.id) == DEFAULT_PARTITION_KEY_PATH
+
+    groups: Dict[any, List[str]] = {}
+    unknown_partition_uuids = []
+    for uuid in dict.fromkeys(uuids):
+        if is_partitioned_by_id:
+            groups.setdefault(uuid, []).append(uuid)
+        elif partition_keys and uuid in partition_keys:
+            groups.setdefault(partition_keys[uuid], []).append(uuid)
+        else:
+            unknown_partition_uuids.append(uuid)
+
+    operations = []
+    operations_uuids = []
+    for partition_key, group_uuids in groups.items():
+        if len(group_uuids) == 1:
+            operations.append((container.delete_item, {
+                'item': group_uuids[0], 'partition_key': partition_key}))
+            operations_uuids.append(group_uuids)
+            continue
+
+        for batch_uuids in chunk_list(group_uuids, TRANSACTIONAL_BATCH_MAX_OPERATIONS):
+            operations.append((container.execute_item_batch, {
+                'batch_operations': [('delete', (uuid,)) for uuid in batch_uuids],
+                'partition_key': partition_key,
+            }))
+            operations_uuids.append(batch_uuids)
+
+    for uuid in unknown_partition_uuids:
+        operations.append(
+            (delete_with_lookup, {'container': container, 'uuid': uuid}))
+        operations_uuids.append([uuid])
+
+    return operations, operations_uuids
+
+
+def delete_outcomes(
+    uuids: List[str], outcomes: List[Dict], operations_uuids: List[List[str]]
+) -> List[Dict]:
+    """
+    Outcome of each deleted uuid, in the order of "uuids", from the outcomes
+    of "build_delete_operations" (the items of a failed batch share its error)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    outcomes_by_uuid = {}
+    for outcome, operation_uuids in zip(outcomes, operations_uuids):
+        for uuid in operation_uuids:
+            outcomes_by_uuid[uuid] = {**outcome, 'id': uuid, 'item': None}
+
+    return [
+        {**outcomes_by_uuid[uuid], 'index': index}
+        for index, uuid in enumerate(uuids)
+    ]
+
+
+def prepare_copied_items(items, target_partition_key_path: str) -> List[Dict]:
+    """
+    Items read from a container ready to be written into another one
+    (system properties dropped, synthetic partition key built)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    synthetic_builder = SYNTHETIC_PARTITION_KEYS.get(target_partition_key_path)
+
+    prepared = []
+    for item in items:
+        for system_property in SYSTEM_PROPERTIES:
+            item.pop(system_property, None)
+        if synthetic_builder:
+            item[target_partition_key_path.strip('/')] = synthetic_builder(item)
+        prepared.append(item)
+    return prepared
+
+
+def add_copy_outcomes(result: Dict, items: List[Dict], outcomes: List[Dict]) -> Dict:
+    """
+    Count the outcomes of a copied page in the "copy_container" result
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    for outcome in outcomes:
+        if outcome['error'] is None:
+            result['copied'] += 1
+        else:
+            result['failed'] += 1
+            result['errors'].append({
+                'id': items[outcome['index']]['id'],
+                'status_code': outcome['status_code'],
+                'error': outcome['error'],
+            })
+    return result
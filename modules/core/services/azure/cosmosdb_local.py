@@ -0,0 +1,220 @@
+import re
+import copy
+import time
+import random
+import threading
+from typing import Dict, List
+from azure.core.paging import ItemPaged
+from azure.cosmos.exceptions import (
+    CosmosBatchOperationError, CosmosHttpResponseError
+)
+
+
+class LocalCosmosContainer:
+    """
+    In-memory stand-in of a CosmosDB "ContainerProxy", to run the CosmosDB
+    service locally (development, load checks) without an Azure account.
+
+    It can simulate throttling: each request is rejected with a 429
+    (and a "x-ms-retry-after-ms" header) with probability "throttle_rate",
+    or whenever more than "max_concurrent_requests" are in flight.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(
+        self,
+        id: str = 'local',
+        partition_key_path: str = '/id',
+        throttle_rate: float = 0.0,
+        max_concurrent_requests: int = None,
+        retry_after_ms: int = 10,
+        latency_ms: float = 0.0
+    ) -> None:
+        self.id = id
+        self.partition_key_path = partition_key_path
+        self.throttle_rate = throttle_rate
+        self.max_concurrent_requests = max_concurrent_requests
+        self.retry_after_ms = retry_after_ms
+        self.latency_ms = latency_ms
+
+        self.items: Dict[str, Dict] = {}
+        self.requests = 0
+        self.throttled_requests = 0
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def create_item(self, body: Dict, **kwargs) -> Dict:
+        with self.__request():
+            with self._lock:
+                if body['id'] in self.items:
+                    raise CosmosHttpResponseError(
+                        status_code=409, message='Entity with the specified id already exists')
+                self.items[body['id']] = copy.deepcopy(body)
+            return copy.deepcopy(body)
+
+    def upsert_item(self, body: Dict, **kwargs) -> Dict:
+        with self.__request():
+            with self._lock:
+                self.items[body['id']] = copy.deepcopy(body)
+            return copy.deepcopy(body)
+
+    def read_item(self, item: str, partition_key=None, **kwargs) -> Dict:
+        with self.__request():
+            with self._lock:
+                if item not in self.items:
+                    raise CosmosHttpResponseError(
+                        status_code=404, message='Entity with the specified id does not exist')
+                return copy.deepcopy(self.items[item])
+
+    def delete_item(self, item: str, partition_key=None, **kwargs):
+        with self.__request():
+            with self._lock:
+                if item not in self.items:
+                    raise CosmosHttpResponseError(
+                        status_code=404, message='Entity with the specified id does not exist')
+                del self.items[item]
+
+    def execute_item_batch(
+        self, batch_operations: List[tuple], partition_key=None, **kwargs
+    ) -> List[Dict]:
+        """
+        Transactional batch: all the operations are applied, or none of them.
+        Only "create", "upsert" and "delete" operations are supported.
+        """
+        with self.__request():
+            with self._lock:
+                items = copy.deepcopy(self.items)
+                results = []
+                for index, (operation, args, *_) in enumerate(batch_operations):
+                    if operation == 'delete' and args[0] not in items:
+                        raise CosmosBatchOperationError(
+                            error_index=index, headers={}, status_code=404,
+                            message='Entity with the specified id does not exist',
+                            operation_responses=[])
+                    if operation == 'create' and args[0]['id'] in items:
+                        raise CosmosBatchOperationError(
+                            error_index=index, headers={}, status_code=409,
+                            message='Entity with the specified id already exists',
+                            operation_responses=[])
+
+                    if operation == 'delete':
+                        del items[args[0]]
+                        results.append({'statusCode': 204})
+                    elif operation in ('create', 'upsert'):
+                        items[args[0]['id']] = copy.deepcopy(args[0])
+                        results.append({'statusCode': 200, 'resourceBody': args[0]})
+                    else:
+                        raise NotImplementedError(
+                            f'Batch operation not supported locally: {operation}')
+
+                self.items = items
+                return results
+
+    def read_all_items(self, max_item_count: int = None, **kwargs) -> ItemPaged:
+        return self.__paged(lambda item: True, max_item_count)
+
+    def query_items(
+        self, query: str, parameters: List[Dict] = None,
+        max_item_count: int = None, **kwargs
+    ) -> ItemPaged:
+        """
+        Only "SELECT * FROM r [WHERE <condition> [AND ...]]" queries are supported,
+        the conditions being "r.field = @param" or "[NOT] ARRAY_CONTAINS(@param, r.field)"
+        """
+        match = re.fullmatch(
+            r'\s*SELECT \* FROM (\w+)(?: WHERE (.+))?\s*', query, re.IGNORECASE)
+        if not match:
+            raise NotImplementedError(f'Query not supported locally: {query}')
+
+        values = {
+            parameter['name']: parameter['value'] for parameter in parameters or []}
+        conditions = []
+        if match.group(2):
+            for condition in re.split(r'\s+AND\s+', match.group(2), flags=re.IGNORECASE):
+                equal_match = re.fullmatch(
+                    r'\s*\w+\.(\w+)\s*=\s*(@\w+)\s*', condition)
+                contains_match = re.fullmatch(
+                    r'\s*(NOT)?\s*ARRAY_CONTAINS\((@\w+),\s*\w+\.(\w+)\)\s*',
+                    condition, re.IGNORECASE)
+
+                if equal_match:
+                    field, value = equal_match.group(1), values[equal_match.group(2)]
+                    conditions.append(
+                        lambda item, field=field, value=value: item.get(field) == value)
+                elif contains_match:
+                    negate = contains_match.group(1) is not None
+                    field = contains_match.group(3)
+                    value = set(values[contains_match.group(2)])
+                    conditions.append(
+                        lambda item, field=field, value=value, negate=negate:
+                            (item.get(field) in value) != negate)
+                else:
+                    raise NotImplementedError(f'Query not supported locally: {query}')
+
+        def matches(item: Dict) -> bool:
+            return all(condition(item) for condition in conditions)
+
+        return self.__paged(matches, max_item_count)
+
+    def __paged(self, matches, max_item_count: int = None) -> ItemPaged:
+        """
+        Lazily paged results, the continuation token is the next offset
+        """
+        page_size = max_item_count or 100
+
+        def get_next(continuation_token: str = None):
+            with self.__request():
+                with self._lock:
+                    items = [
+                        copy.deepcopy(item) for item in self.items.values()
+                        if matches(item)
+                    ]
+            start = int(continuation_token or 0)
+            return items, start
+
+        def extract_data(response):
+            items, start = response
+            end = start + page_size
+            next_token = str(end) if end < len(items) else None
+            return next_token, iter(items[start:end])
+
+        return ItemPaged(get_next, extract_data)
+
+    def __request(self):
+        return _LocalRequest(self)
+
+
+class _LocalRequest:
+    """
+    Accounts one request against the local container, raising a 429
+    when it must be throttled
+    """
+
+    def __init__(self, container: LocalCosmosContainer) -> None:
+        self.container = container
+
+    def __enter__(self):
+        container = self.container
+        with container._lock:
+            container.requests += 1
+            overloaded = (
+                container.max_concurrent_requests is not None
+                and container.in_flight >= container.max_concurrent_requests
+            )
+            if overloaded or random.random() < container.throttle_rate:
+                container.throttled_requests += 1
+                error = CosmosHttpResponseError(
+                    status_code=429, message='Request rate is large')
+                error.headers = {
+                    'x-ms-retry-after-ms': str(container.retry_after_ms)}
+                raise error
+            container.in_flight += 1
+
+        if container.latency_ms:
+            time.sleep(container.latency_ms / 1000)
+        return self
+
+    def __exit__(self, *args):
+        with self.container._lock:
+            self.container.in_flight -= 1
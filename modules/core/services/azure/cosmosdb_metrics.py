@@ -0,0 +1,234 @@
+import json
+import time
+import threading
+import contextvars
+from typing import Dict
+from urllib.parse import unquote, urlparse
+from modules.core.env import COSMOS_METRICS_MAX_QUERIES
+
+# Status codes retried by the CosmosDB SDK (throttling and "retry with")
+RETRIED_STATUS_CODES = (429, 449)
+
+# Cosmos totals of the HTTP request being served (see "CosmosMetricsMiddleware")
+_request_totals: contextvars.ContextVar = contextvars.ContextVar(
+    'cosmos_request_totals', default=None)
+
+
+class CosmosMetrics:
+    """
+    Process-wide aggregation of the CosmosDB calls: request charge (RU),
+    latency, retries and status codes per "(container, operation)", plus
+    the most expensive queries by their text (parameters excluded).
+
+    Every HTTP call of the CosmosClient is recorded through the client
+    "raw_request_hook" / "raw_response_hook" (see "CosmosDB.get_client"),
+    so SDK retries and throttled calls are accounted too.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self, max_queries: int = COSMOS_METRICS_MAX_QUERIES) -> None:
+        self.max_queries = max_queries
+        self.operations: Dict[tuple, Dict] = {}
+        self.queries: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def on_request(self, request):
+        """
+        "raw_request_hook": start the latency clock
+        """
+        request.context['cosmos_metrics_start'] = time.perf_counter()
+
+    def on_response(self, response):
+        """
+        "raw_response_hook": record the HTTP call
+        """
+        start = response.context.get('cosmos_metrics_start')
+        latency_ms = (time.perf_counter() - start) * 1000 if start else 0.0
+
+        http_request = response.http_request
+        headers = response.http_response.headers
+        container, operation = self.describe(http_request)
+
+        self.record(
+            container=container,
+            operation=operation,
+            request_charge=float(headers.get('x-ms-request-charge') or 0),
+            latency_ms=latency_ms,
+            status_code=response.http_response.status_code,
+            query=self.query_text(http_request) if operation == 'query' else None
+        )
+
+    def record(
+        self, container: str, operation: str, request_charge: float,
+        latency_ms: float, status_code: int, query: str = None
+    ):
+        """
+        Aggregate one CosmosDB call (also summed in the current HTTP request totals)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        retried = status_code in RETRIED_STATUS_CODES
+
+        with self._lock:
+            stats = self.operations.get((container, operation))
+            if stats is None:
+                stats = self.operations[(container, operation)] = self.__new_stats()
+            self.__add(stats, request_charge, latency_ms, status_code, retried)
+
+            if query is not None:
+                query_stats = self.queries.get(query)
+                if query_stats is None and len(self.queries) < self.max_queries:
+                    query_stats = self.queries[query] = self.__new_stats()
+                if query_stats is not None:
+                    self.__add(
+                        query_stats, request_charge, latency_ms, status_code, retried)
+
+            totals = _request_totals.get()
+            if totals is not None:
+                totals['requests'] += 1
+                totals['request_charge'] += request_charge
+                totals['latency_ms'] += latency_ms
+                totals['retries'] += int(retried)
+
+    def snapshot(self, top_queries: int = 20) -> Dict:
+        """
+        Metrics aggregated since the start (or the last "reset"), the
+        operations and queries sorted by total request charge
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            metrics: Dict ({'operations': List[Dict], 'queries': List[Dict]})
+        """
+        with self._lock:
+            operations = [
+                {'container': container, 'operation': operation, **self.__summary(stats)}
+                for (container, operation), stats in self.operations.items()
+            ]
+            queries = [
+                {'query': query, **self.__summary(stats)}
+                for query, stats in self.queries.items()
+            ]
+
+        operations.sort(key=lambda stats: stats['request_charge'], reverse=True)
+        queries.sort(key=lambda stats: stats['request_charge'], reverse=True)
+
+        return {'operations': operations, 'queries': queries[:top_queries]}
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+            self.queries.clear()
+
+    @staticmethod
+    def describe(http_request) -> tuple:
+        """
+        "(container, operation)" of a CosmosDB REST call, e.g.:
+            - POST /dbs/db/colls/logs/docs (query header) -> ('logs', 'query')
+            - DELETE /dbs/db/colls/logs/docs/1 -> ('logs', 'delete')
+            - GET /dbs/db/colls/logs -> ('logs', 'read_colls')
+        """
+        segments = [
+            unquote(segment)
+            for segment in urlparse(http_request.url).path.strip('/').split('/')
+            if segment
+        ]
+        container = segments[3] if len(segments) > 3 and segments[2] == 'colls' else '-'
+
+        # "/type/id" pairs: an odd amount of segments targets a feed
+        is_feed = len(segments) % 2 == 1
+        if is_feed:
+            resource_type = segments[-1]
+        elif segments:
+            resource_type = segments[-2]
+        else:
+            resource_type = 'account'
+
+        method = http_request.method.upper()
+        headers = {key.lower(): value for key, value in http_request.headers.items()}
+
+        if resource_type == 'docs':
+            if method == 'POST':
+                if str(headers.get('x-ms-documentdb-isquery')).lower() == 'true':
+                    return container, 'query'
+                if str(headers.get('x-ms-cosmos-is-batch-request')).lower() == 'true':
+                    return container, 'batch'
+                if str(headers.get('x-ms-documentdb-is-upsert')).lower() == 'true':
+                    return container, 'upsert'
+                return container, 'create'
+            return container, {
+                'GET': 'read_feed' if is_feed else 'read',
+                'PUT': 'replace',
+                'PATCH': 'patch',
+                'DELETE': 'delete',
+            }.get(method, method.lower())
+
+        verb = 'read' if method == 'GET' else method.lower()
+        return container, f'{verb}_{resource_type}'
+
+    @staticmethod
+    def query_text(http_request) -> str:
+        try:
+            body = http_request.body
+            if isinstance(body, bytes):
+                body = body.decode('UTF-8')
+            return json.loads(body)['query']
+        except Exception:
+            return None
+
+    @staticmethod
+    def __new_stats() -> Dict:
+        return {
+            'requests': 0, 'request_charge': 0.0, 'latency_ms': 0.0,
+            'max_latency_ms': 0.0, 'retries': 0, 'status_codes': {},
+        }
+
+    @staticmethod
+    def __add(
+        stats: Dict, request_charge: float, latency_ms: float,
+        status_code: int, retried: bool
+    ):
+        stats['requests'] += 1
+        stats['request_charge'] += request_charge
+        stats['latency_ms'] += latency_ms
+        stats['max_latency_ms'] = max(stats['max_latency_ms'], latency_ms)
+        stats['retries'] += int(retried)
+        stats['status_codes'][status_code] = stats['status_codes'].get(status_code, 0) + 1
+
+    @staticmethod
+    def __summary(stats: Dict) -> Dict:
+        requests = stats['requests'] or 1
+        return {
+            'requests': stats['requests'],
+            'request_charge': round(stats['request_charge'], 2),
+            'avg_request_charge': round(stats['request_charge'] / requests, 2),
+            'avg_latency_ms': round(stats['latency_ms'] / requests, 2),
+            'max_latency_ms': round(stats['max_latency_ms'], 2),
+            'retries': stats['retries'],
+            'status_codes': dict(stats['status_codes']),
+        }
+
+
+cosmos_metrics = CosmosMetrics()
+
+
+def start_request_totals() -> Dict:
+    """
+    Start accounting the Cosmos calls of the current HTTP request
+    (the totals dict is shared with the tasks and threads that copy the context)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    totals = {'requests': 0, 'request_charge': 0.0, 'latency_ms': 0.0, 'retries': 0}
+    _request_totals.set(totals)
+    return totals
+
+
+def get_request_totals() -> Dict:
+    """
+    Cosmos totals of the current HTTP request (None outside a request)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    return _request_totals.get()
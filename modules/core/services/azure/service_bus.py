@@ -1,7 +1,274 @@
 import json
-from typing import Dict, List
-from azure.servicebus import ServiceBusClient, ServiceBusMessage
-from modules.core.env import SB_CONNECTION_STR, SB_EMAIL_QUEUE, SB_MAX_WAIT_TIME
+import time
+import queue
+import threading
+from typing import Callable, Dict, List
+from concurrent.futures import Future
+from azure.servicebus import (
+    ServiceBusClient, ServiceBusMessage, ServiceBusSender
+)
+from azure.servicebus.exceptions import (
+    MessageSizeExceededError, OperationTimeoutError, ServiceBusAuthenticationError,
+    ServiceBusCommunicationError, ServiceBusConnectionError
+)
+from modules.core.env import (
+    SB_COALESCE_LINGER_MS, SB_COALESCE_MAX_MESSAGES,
+    SB_COALESCE_RESULT_TIMEOUT_SECONDS, SB_CONNECTION_STR,
+    SB_EMAIL_QUEUE, SB_MAX_WAIT_TIME, SB_SEND_ATTEMPTS,
+    SB_SENDER_ACQUIRE_TIMEOUT_SECONDS, SB_SENDER_POOL_SIZE
+)
+
+# Errors after which a sender is discarded and the send retried with a new one
+RECONNECT_ERRORS = (
+    OperationTimeoutError, ServiceBusAuthenticationError,
+    ServiceBusCommunicationError, ServiceBusConnectionError
+)
+
+# The pools of senders and the coalescing senders of each queue
+_sender_pools: Dict[str, 'ServiceBusSenderPool'] = {}
+_coalescing_senders: Dict[str, 'ServiceBusCoalescingSender'] = {}
+_lock = threading.Lock()
+
+
+def close_servicebus():
+    """
+    Close the pooled senders and their clients (application shutdown)
+
+    Author: Matheus Henrique (m.araujo)
+    """
+    with _lock:
+        coalescing_senders = list(_coalescing_senders.values())
+        _coalescing_senders.clear()
+
+    # Sends what is waiting before the senders are closed
+    for coalescing_sender in coalescing_senders:
+        coalescing_sender.close()
+
+    with _lock:
+        for pool in _sender_pools.values():
+            pool.close()
+        _sender_pools.clear()
+
+
+class ServiceBusSenderPool:
+    """
+    Pool of open senders of a queue. Neither a sender nor a ServiceBusClient
+    is thread-safe, so each sender has its own client (AMQP connection),
+    created by "client_factory", and is leased to a single thread at a
+    time: no connection is ever used by two threads. Up to "max_size"
+    senders are opened on demand and kept open for reuse.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(
+        self, client_factory: Callable[[], ServiceBusClient], queue_name: str,
+        max_size: int = SB_SENDER_POOL_SIZE,
+        acquire_timeout: float = SB_SENDER_ACQUIRE_TIMEOUT_SECONDS
+    ) -> None:
+        self.client_factory = client_factory
+        self.queue_name = queue_name
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+
+        # LIFO: the most recently used (warm) senders are reused first
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+        self.size = 0
+        # Sender -> its own client, closed with it
+        self.clients: Dict[ServiceBusSender, ServiceBusClient] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> ServiceBusSender:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            create = self.size < self.max_size
+            if create:
+                self.size += 1
+
+        if not create:
+            try:
+                return self.idle.get(timeout=self.acquire_timeout)
+            except queue.Empty:
+                raise Exception(
+                    f"No Service Bus sender available for '{self.queue_name}' "
+                    f"after {self.acquire_timeout}s")
+
+        servicebus_client = None
+        try:
+            servicebus_client = self.client_factory()
+            sender = servicebus_client.get_queue_sender(queue_name=self.queue_name)
+            # Opens the connection and the AMQP link now, not on the first send
+            sender.__enter__()
+        except Exception:
+            with self._lock:
+                self.size -= 1
+            if servicebus_client is not None:
+                servicebus_client.close()
+            raise
+
+        with self._lock:
+            self.clients[sender] = servicebus_client
+        return sender
+
+    def release(self, sender: ServiceBusSender):
+        self.idle.put(sender)
+
+    def discard(self, sender: ServiceBusSender):
+        """
+        Close a broken sender and its client, a new one will be opened
+        when needed
+        """
+        with self._lock:
+            self.size -= 1
+            servicebus_client = self.clients.pop(sender, None)
+        for closable in (sender, servicebus_client):
+            try:
+                if closable is not None:
+                    closable.close()
+            except Exception:
+                pass
+
+    def close(self):
+        while True:
+            try:
+                sender = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(sender)
+
+
+class ServiceBusCoalescingSender:
+    """
+    Coalesce the messages sent to a queue by many threads (e.g. one email
+    per request) within a short window ("linger_seconds") and send them
+    together, packed in as few batches as possible.
+
+    "submit" returns a Future resolved when the messages were sent (or
+    with the error of their batch). Once closed, "submit" is rejected and
+    everything submitted before is still sent.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(
+        self, queue_name: str,
+        linger_seconds: float = SB_COALESCE_LINGER_MS / 1000,
+        max_messages: int = SB_COALESCE_MAX_MESSAGES
+    ) -> None:
+        self.queue_name = queue_name
+        self.linger_seconds = linger_seconds
+        self.max_messages = max_messages
+
+        self.pending: queue.Queue = queue.Queue()
+        self.stats = {'submissions': 0, 'messages': 0, 'sends': 0, 'batches': 0}
+        self.closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self.__run, name=f'servicebus-coalescer-{queue_name}', daemon=True)
+        self._thread.start()
+
+    def submit(self, messages: List[ServiceBusMessage]) -> Future:
+        future = Future()
+        with self._close_lock:
+            if self.closed:
+                raise Exception(
+                    f"Service Bus coalescing sender of '{self.queue_name}' is closed")
+            self.pending.put((messages, future))
+        return future
+
+    def close(self, timeout: float = 30):
+        with self._close_lock:
+            if self.closed:
+                return
+            # The sentinel is the last item: "submit" is rejected from now on
+            self.closed = True
+            self.pending.put(None)
+        self._thread.join(timeout)
+
+    def __run(self):
+        stopping = False
+        while not stopping:
+            first = self.pending.get()
+            if first is None:
+                break
+
+            submissions = [first]
+            messages_count = len(first[0])
+            deadline = time.monotonic() + self.linger_seconds
+            while messages_count < self.max_messages:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    submission = self.pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if submission is None:
+                    stopping = True
+                    break
+                submissions.append(submission)
+                messages_count += len(submission[0])
+
+            self.__send(submissions)
+
+        self.__drain()
+
+    def __drain(self):
+        """
+        Send whatever is still queued after the sentinel, so no Future
+        is left unresolved
+        """
+        submissions = []
+        messages_count = 0
+        while True:
+            try:
+                submission = self.pending.get_nowait()
+            except queue.Empty:
+                break
+            if submission is None:
+                continue
+            submissions.append(submission)
+            messages_count += len(submission[0])
+            if messages_count >= self.max_messages:
+                self.__send(submissions)
+                submissions = []
+                messages_count = 0
+
+        if submissions:
+            self.__send(submissions)
+
+    def __send(self, submissions: List[tuple]):
+        messages = []
+        owners = []
+        for index, (submission_messages, _) in enumerate(submissions):
+            messages.extend(submission_messages)
+            owners.extend([index] * len(submission_messages))
+
+        errors = {}
+        try:
+            outcomes = AzureServiceBusService().send_batched(messages, self.queue_name)
+            for outcome in outcomes:
+                if outcome['error'] is not None:
+                    for message_index in outcome['indexes']:
+                        errors.setdefault(owners[message_index], outcome['error'])
+        except Exception as error:
+            errors = {index: error for index in range(len(submissions))}
+            outcomes = []
+
+        self.stats['submissions'] += len(submissions)
+        self.stats['messages'] += len(messages)
+        self.stats['sends'] += 1
+        self.stats['batches'] += len(outcomes)
+
+        for index, (_, future) in enumerate(submissions):
+            if index in errors:
+                future.set_exception(errors[index])
+            else:
+                future.set_result(None)
 
 
 class AzureServiceBusService:
@@ -13,7 +280,9 @@ class AzureServiceBusService:
 
     def get_servicebus_client(self, ):
         """
-        Get the Service Bus client
+        Get a new Service Bus client (one AMQP connection). A client is not
+        thread-safe: use it from a single thread (each pooled sender and
+        each worker receiver has its own).
 
         Author: Matheus Henrique (m.araujo)
         """
@@ -21,6 +290,64 @@ class AzureServiceBusService:
             conn_str=SB_CONNECTION_STR)
         return servicebus_client
 
+    def get_sender_pool(self, queue_name: str = None) -> ServiceBusSenderPool:
+        """
+        Get the pool of senders of the queue
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not queue_name:
+            queue_name = SB_EMAIL_QUEUE
+
+        pool = _sender_pools.get(queue_name)
+        if pool is None:
+            with _lock:
+                pool = _sender_pools.get(queue_name)
+                if pool is None:
+                    pool = _sender_pools[queue_name] = ServiceBusSenderPool(
+                        self.get_servicebus_client, queue_name)
+        return pool
+
+    def open_senders(self, queue_names: List[str]):
+        """
+        Open one sender of each queue (application startup), so the first
+        messages don't pay for the AMQP connection
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        for queue_name in queue_names:
+            pool = self.get_sender_pool(queue_name)
+            pool.release(pool.acquire())
+
+    def send_to_queue(self, messages, queue_name: str = None, attempts: int = SB_SEND_ATTEMPTS):
+        """
+        Send messages (a list or a "ServiceBusMessageBatch") to the queue
+        through a pooled sender. When the connection is broken the sender is
+        replaced and the send retried, up to "attempts" times.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        pool = self.get_sender_pool(queue_name)
+
+        for attempt in range(1, attempts + 1):
+            sender = pool.acquire()
+            try:
+                sender.send_messages(messages)
+            except RECONNECT_ERRORS as error:
+                pool.discard(sender)
+                if attempt == attempts:
+                    raise
+                print(
+                    f"Service Bus sender of '{pool.queue_name}' reconnecting "
+                    f"(attempt {attempt}): {error}")
+                continue
+            except Exception:
+                pool.release(sender)
+                raise
+
+            pool.release(sender)
+            return
+
     def get_sender(self, servicebus_client, queue_name: str):
         """
         Get Service Bus instance to send messages to queue
@@ -71,12 +398,107 @@ class AzureServiceBusService:
         for message in messages:
             receiver.complete_message(message)
 
+    def create_message_batches(
+        self, messages: List[ServiceBusMessage], queue_name: str = None
+    ) -> List[Dict]:
+        """
+        Pack the messages, in order, in as few "ServiceBusMessageBatch" as
+        the queue size limit allows (a new batch starts when one is full)
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            batches: List[Dict], with the keys:
+                - batch (ServiceBusMessageBatch): None when the message alone
+                  exceeds the size limit
+                - indexes (List[int]): indexes of its messages in "messages"
+                - error (Exception): MessageSizeExceededError or None
+        """
+        pool = self.get_sender_pool(queue_name)
+        sender = pool.acquire()
+        try:
+            current = {'batch': sender.create_message_batch(), 'indexes': [], 'error': None}
+            batches = [current]
+            for index, message in enumerate(messages):
+                try:
+                    current['batch'].add_message(message)
+                    current['indexes'].append(index)
+                    continue
+                except MessageSizeExceededError:
+                    pass
+
+                # The current batch is full, the message goes to a new one
+                batch = sender.create_message_batch()
+                try:
+                    batch.add_message(message)
+                except MessageSizeExceededError as error:
+                    batches.append({'batch': None, 'indexes': [index], 'error': error})
+                    continue
+                current = {'batch': batch, 'indexes': [index], 'error': None}
+                batches.append(current)
+        except RECONNECT_ERRORS:
+            pool.discard(sender)
+            raise
+        except Exception:
+            pool.release(sender)
+            raise
+
+        pool.release(sender)
+        return [batch for batch in batches if batch['indexes']]
+
+    def send_batched(
+        self, messages: List[ServiceBusMessage], queue_name: str = None
+    ) -> List[Dict]:
+        """
+        Send the messages packed in size-limited batches (see
+        "create_message_batches"), one send per batch. A failed batch
+        doesn't stop the next ones.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (one per batch: 'indexes' and 'error')
+        """
+        outcomes = []
+        for batch in self.create_message_batches(messages, queue_name):
+            error = batch['error']
+            if error is None:
+                try:
+                    self.send_to_queue(batch['batch'], queue_name)
+                except Exception as send_error:
+                    error = send_error
+            outcomes.append({'indexes': batch['indexes'], 'error': error})
+        return outcomes
+
+    def get_coalescing_sender(self, queue_name: str = None) -> ServiceBusCoalescingSender:
+        """
+        Get the process-wide coalescing sender of the queue
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not queue_name:
+            queue_name = SB_EMAIL_QUEUE
+
+        coalescing_sender = _coalescing_senders.get(queue_name)
+        if coalescing_sender is None:
+            with _lock:
+                coalescing_sender = _coalescing_senders.get(queue_name)
+                if coalescing_sender is None:
+                    coalescing_sender = _coalescing_senders[queue_name] = \
+                        ServiceBusCoalescingSender(queue_name)
+        return coalescing_sender
+
     def send_a_bunch_of_dict_to_queue(self, messages: List[Dict], queue_name: str = None):
         """
         It will put a bunch of messages in Azure Service Bus queue
 
         Author: Matheus Henrique (m.araujo)
 
+        The messages are packed in size-limited batches, together with the
+        ones sent by other threads in the same "SB_COALESCE_LINGER_MS" window.
+        It returns when they were sent and raises the error of their batch
+        (or a TimeoutError after "SB_COALESCE_RESULT_TIMEOUT_SECONDS").
+
         Parameters:
         - messages: List[Dict]
         - queue_name: str (if none, default will be "SB_EMAIL_QUEUE")
@@ -85,7 +507,11 @@ class AzureServiceBusService:
         for message in messages:
             msgs.append(ServiceBusMessage(json.dumps(message)))
 
-        servicebus_client = AzureServiceBusService().get_servicebus_client()
-        sender = AzureServiceBusService().get_sender(servicebus_client, queue_name)
+        if SB_COALESCE_LINGER_MS > 0:
+            self.get_coalescing_sender(queue_name).submit(msgs).result(
+                timeout=SB_COALESCE_RESULT_TIMEOUT_SECONDS)
+            return
 
-        AzureServiceBusService().send_messages(msgs, sender)
+        for outcome in self.send_batched(msgs, queue_name):
+            if outcome['error'] is not None:
+                raise outcome['error']
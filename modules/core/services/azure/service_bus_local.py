@@ -0,0 +1,144 @@
+import time
+import uuid
+import queue
+import threading
+from typing import Dict, List
+
+
+class LocalServiceBusMessage:
+    """
+    Received message of the in-memory Service Bus stand-in
+    """
+
+    def __init__(self, body: str, delivery_count: int = 0) -> None:
+        self.body_text = body
+        self.message_id = str(uuid.uuid4())
+        self.delivery_count = delivery_count
+
+    @property
+    def body(self):
+        yield self.body_text.encode('UTF-8')
+
+    def __str__(self) -> str:
+        return self.body_text
+
+
+class LocalServiceBusClient:
+    """
+    In-memory stand-in of "ServiceBusClient" (queues only), to run the
+    Service Bus senders and the worker locally (development, throughput
+    checks) without an Azure namespace.
+
+    Abandoned messages are delivered again until "max_delivery_count",
+    then they are moved to the queue dead letters.
+
+    Author: Matheus Henrique (m.araujo)
+    """
+
+    def __init__(self, max_delivery_count: int = 10, latency_ms: float = 0.0) -> None:
+        self.max_delivery_count = max_delivery_count
+        self.latency_ms = latency_ms
+        self.queues: Dict[str, queue.Queue] = {}
+        self.dead_letters: Dict[str, List[LocalServiceBusMessage]] = {}
+        self.completed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_queue(self, queue_name: str) -> queue.Queue:
+        with self._lock:
+            if queue_name not in self.queues:
+                self.queues[queue_name] = queue.Queue()
+                self.dead_letters[queue_name] = []
+                self.completed[queue_name] = 0
+            return self.queues[queue_name]
+
+    def get_queue_sender(self, queue_name: str, **kwargs) -> 'LocalServiceBusSender':
+        return LocalServiceBusSender(self, queue_name)
+
+    def get_queue_receiver(
+        self, queue_name: str, max_wait_time: float = None, **kwargs
+    ) -> 'LocalServiceBusReceiver':
+        return LocalServiceBusReceiver(self, queue_name, max_wait_time)
+
+    def close(self):
+        pass
+
+    def wait(self):
+        # Simulated network round trip
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+
+class LocalServiceBusSender:
+
+    def __init__(self, client: LocalServiceBusClient, queue_name: str) -> None:
+        self.client = client
+        self.queue = client.get_queue(queue_name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def send_messages(self, messages):
+        self.client.wait()
+        if not isinstance(messages, list):
+            messages = list(getattr(messages, 'messages', [messages]))
+        for message in messages:
+            body = b''.join(message.body) if not isinstance(message, str) else message
+            self.queue.put(LocalServiceBusMessage(
+                body.decode('UTF-8') if isinstance(body, bytes) else body))
+
+    def close(self):
+        pass
+
+
+class LocalServiceBusReceiver:
+
+    def __init__(
+        self, client: LocalServiceBusClient, queue_name: str, max_wait_time: float = None
+    ) -> None:
+        self.client = client
+        self.queue_name = queue_name
+        self.queue = client.get_queue(queue_name)
+        self.max_wait_time = max_wait_time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def receive_messages(
+        self, max_message_count: int = 1, max_wait_time: float = None
+    ) -> List[LocalServiceBusMessage]:
+        self.client.wait()
+        timeout = max_wait_time or self.max_wait_time or 5
+
+        messages = []
+        try:
+            messages.append(self.queue.get(timeout=timeout))
+            while len(messages) < max_message_count:
+                messages.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        for message in messages:
+            message.delivery_count += 1
+        return messages
+
+    def complete_message(self, message: LocalServiceBusMessage):
+        self.client.wait()
+        with self.client._lock:
+            self.client.completed[self.queue_name] += 1
+
+    def abandon_message(self, message: LocalServiceBusMessage):
+        self.client.wait()
+        if message.delivery_count >= self.client.max_delivery_count:
+            with self.client._lock:
+                self.client.dead_letters[self.queue_name].append(message)
+        else:
+            self.queue.put(message)
+
+    def close(self):
+        pass
@@ -0,0 +1,222 @@
+import json
+import time
+import signal
+import threading
+from typing import Callable, Dict, List
+from azure.servicebus import AutoLockRenewer, ServiceBusClient, ServiceBusReceivedMessage
+from modules.core.services.azure.service_bus import AzureServiceBusService
+from modules.core.env import (
+    SB_MAX_WAIT_TIME, SB_WORKER_BATCH_SIZE, SB_WORKER_LOCK_RENEWAL_SECONDS,
+    SB_WORKER_PREFETCH, SB_WORKER_RECEIVERS
+)
+
+# Queue name -> handler of its messages (see "register_queue_handler")
+QUEUE_HANDLERS: Dict[str, Callable[[Dict], None]] = {}
+
+# Seconds before a receiver is opened again after a connection error
+RECEIVER_RETRY_SECONDS = 5
+
+
+def register_queue_handler(queue_name: str):
+    """
+    Register the decorated function as the handler of the messages of a
+    queue. It gets the JSON body of one message (Dict); the message is
+    completed when it returns and abandoned (delivered again, up to the
+    queue "max delivery count") when it raises.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    def decorator(handler: Callable[[Dict], None]):
+        QUEUE_HANDLERS[queue_name] = handler
+        return handler
+    return decorator
+
+
+class ServiceBusWorker:
+    """
+    Consume a queue with "receivers" concurrent receivers, one thread each.
+    A ServiceBusClient is not thread-safe, so each receiver thread opens
+    its own client (AMQP connection); an injected "servicebus_client" (e.g.
+    the local stand-in) is shared by the threads and must be thread-safe.
+
+    - Each receiver prefetches up to "prefetch" messages, so the next batch
+      is already local while the current one is handled.
+    - The message locks are renewed by an "AutoLockRenewer" (up to
+      "lock_renewal_seconds"), a slow handler never loses its message.
+    - The messages are settled by batch: after the handlers of a received
+      batch ran, the succeeded ones are completed and the failed ones
+      abandoned, together.
+    - "stop" (SIGINT/SIGTERM when running in the main thread) lets every
+      receiver finish and settle its current batch before closing. The
+      prefetched messages not handled yet are redelivered when their
+      lock expires.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self,
+        queue_name: str,
+        handler: Callable[[Dict], None] = None,
+        receivers: int = SB_WORKER_RECEIVERS,
+        prefetch: int = SB_WORKER_PREFETCH,
+        batch_size: int = SB_WORKER_BATCH_SIZE,
+        max_wait_time: float = float(SB_MAX_WAIT_TIME or 5),
+        lock_renewal_seconds: float = SB_WORKER_LOCK_RENEWAL_SECONDS,
+        servicebus_client: ServiceBusClient = None,
+        stop_when_idle: bool = False
+    ) -> None:
+        if handler is None:
+            handler = QUEUE_HANDLERS.get(queue_name)
+        if handler is None:
+            raise Exception(f"There is no handler registered for the queue '{queue_name}'")
+
+        self.queue_name = queue_name
+        self.handler = handler
+        self.receivers = receivers
+        self.prefetch = max(prefetch, batch_size)
+        self.batch_size = batch_size
+        self.max_wait_time = max_wait_time
+        self.lock_renewal_seconds = lock_renewal_seconds
+        self.servicebus_client = servicebus_client
+        # Stop once the queue is empty (drain / benchmark runs)
+        self.stop_when_idle = stop_when_idle
+
+        self.stats = {
+            'received': 0, 'completed': 0, 'abandoned': 0, 'batches': 0,
+            'seconds': 0.0, 'messages_per_second': 0.0,
+        }
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._lock_renewer: AutoLockRenewer = None
+
+    def run(self) -> Dict:
+        """
+        Consume the queue until "stop" is called (or the queue is empty,
+        with "stop_when_idle")
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            stats: Dict
+        """
+        if self.lock_renewal_seconds:
+            self._lock_renewer = AutoLockRenewer(
+                max_lock_renewal_duration=self.lock_renewal_seconds)
+
+        previous_handlers = self.__install_signal_handlers()
+        started = time.monotonic()
+
+        threads = [
+            threading.Thread(
+                target=self.__receive_loop, name=f'servicebus-worker-{self.queue_name}-{index}')
+            for index in range(self.receivers)
+        ]
+        for thread in threads:
+            thread.start()
+
+        try:
+            # Joined with a timeout, so the main thread still gets the signals
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        finally:
+            self._stopping.set()
+            for thread in threads:
+                thread.join()
+            if self._lock_renewer is not None:
+                self._lock_renewer.close()
+            for signal_number, previous_handler in previous_handlers.items():
+                signal.signal(signal_number, previous_handler)
+
+        seconds = time.monotonic() - started
+        self.stats['seconds'] = round(seconds, 3)
+        self.stats['messages_per_second'] = round(
+            self.stats['completed'] / seconds, 1) if seconds else 0.0
+        return self.stats
+
+    def stop(self, *args):
+        """
+        Graceful stop: the receivers finish and settle their current batch
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not self._stopping.is_set():
+            print(f"Stopping the Service Bus worker of '{self.queue_name}'...")
+        self._stopping.set()
+
+    def __install_signal_handlers(self) -> Dict:
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+
+        previous_handlers = {}
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            previous_handlers[signal_number] = signal.getsignal(signal_number)
+            signal.signal(signal_number, self.stop)
+        return previous_handlers
+
+    def __receive_loop(self):
+        while not self._stopping.is_set():
+            servicebus_client = self.servicebus_client
+            if servicebus_client is None:
+                # Its own client (connection): one per receiver thread
+                servicebus_client = AzureServiceBusService().get_servicebus_client()
+            try:
+                receiver = servicebus_client.get_queue_receiver(
+                    queue_name=self.queue_name,
+                    prefetch_count=self.prefetch,
+                    auto_lock_renewer=self._lock_renewer
+                )
+                with receiver:
+                    while not self._stopping.is_set():
+                        messages = receiver.receive_messages(
+                            max_message_count=self.batch_size,
+                            max_wait_time=self.max_wait_time)
+
+                        if not messages:
+                            if self.stop_when_idle:
+                                return
+                            continue
+
+                        self.__process(receiver, messages)
+            except Exception as error:
+                print(f"Error occurred in the Service Bus receiver of '{self.queue_name}': {error}")
+                self._stopping.wait(RECEIVER_RETRY_SECONDS)
+            finally:
+                if servicebus_client is not self.servicebus_client:
+                    servicebus_client.close()
+
+    def __process(self, receiver, messages: List[ServiceBusReceivedMessage]):
+        succeeded = []
+        failed = []
+        for message in messages:
+            try:
+                self.handler(json.loads(str(message)))
+                succeeded.append(message)
+            except Exception as error:
+                print(
+                    f"Error occurred when handling the message "
+                    f"{message.message_id} of '{self.queue_name}': {error}")
+                failed.append(message)
+
+        # Batched settlement, once the whole batch was handled
+        for settle, settled in ((receiver.complete_message, succeeded),
+                                (receiver.abandon_message, failed)):
+            for message in settled:
+                try:
+                    settle(message)
+                except Exception as error:
+                    # e.g. lock lost: the message is delivered again
+                    print(
+                        f"Error occurred when settling the message "
+                        f"{message.message_id} of '{self.queue_name}': {error}")
+
+        with self._stats_lock:
+            self.stats['received'] += len(messages)
+            self.stats['completed'] += len(succeeded)
+            self.stats['abandoned'] += len(failed)
+            self.stats['batches'] += 1
@@ -0,0 +1,95 @@
+import io
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Union
+from modules.core.env import EMAIL_CLAIM_CHECK_CONTAINER
+
+# Blob name prefix of the email payloads stored out of the queue messages
+CLAIM_CHECK_PREFIX = 'email-claim-check'
+
+
+def _get_blob_service():
+    # Imported here: "blob_storage" imports the email services
+    from modules.core.services.azure.blob_storage import AzureBlobStorageService
+
+    blob_storage = AzureBlobStorageService()
+    return blob_storage, blob_storage.create_blob_service_client()
+
+
+def store_payload(
+    content: Union[bytes, io.IOBase], name: str, content_type: str = None
+) -> Dict:
+    """
+    Claim-check: store an email payload (large body, attachment) in Blob
+    Storage and return the reference to put in the queue message instead.
+    A file-like "content" is uploaded by chunks, never read whole.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        reference: Dict ('container', 'blob_name', 'name', 'content_type', 'size')
+    """
+    if isinstance(content, (bytes, bytearray)):
+        content = io.BytesIO(content)
+
+    blob_name = f"{CLAIM_CHECK_PREFIX}/{datetime.now().strftime('%Y/%m/%d')}/{uuid.uuid4()}/{name}"
+
+    blob_storage, blob_service_client = _get_blob_service()
+    _, checksums = blob_storage.upload_blob_stream_with_checksums(
+        blob_service_client, EMAIL_CLAIM_CHECK_CONTAINER, blob_name, content,
+        content_type=content_type)
+
+    return {
+        'container': EMAIL_CLAIM_CHECK_CONTAINER,
+        'blob_name': blob_name,
+        'name': name,
+        'content_type': content_type or 'application/octet-stream',
+        'size': checksums['size'],
+    }
+
+
+def open_payload_stream(reference: Dict) -> Iterator[bytes]:
+    """
+    Stream a stored payload chunk by chunk
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    blob_storage, blob_service_client = _get_blob_service()
+    return blob_storage.download_blob_chunks(
+        blob_service_client, reference['container'], reference['blob_name'])
+
+
+def read_payload_text(reference: Dict) -> str:
+    """
+    Read a stored text payload (e.g. an email body)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    return b''.join(open_payload_stream(reference)).decode('UTF-8')
+
+
+def delete_payloads(references: List[Dict]):
+    """
+    Delete the stored payloads of a sent email. A failure is only logged:
+    the leftovers can be removed by a lifecycle rule on the prefix.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    if not references:
+        return
+
+    blob_storage, blob_service_client = _get_blob_service()
+    for reference in references:
+        try:
+            blob_storage.delete_blob(
+                blob_service_client, reference['container'], reference['blob_name'])
+        except Exception as error:
+            print(f"Error occurred when deleting the email payload '{reference['blob_name']}': {error}")
@@ -1,8 +1,10 @@
-import os
 from ast import Dict
 from typing import List
-from jinja2 import Environment, FileSystemLoader
-from modules.core.env import DEFAULT_FROM_EMAIL, ENV, SB_EMAIL_QUEUE
+from modules.core.services.email.claim_check import store_payload
+from modules.core.services.email.jinja_environment import render_template
+from modules.core.env import (
+    DEFAULT_FROM_EMAIL, EMAIL_CLAIM_CHECK_THRESHOLD_BYTES, ENV, SB_EMAIL_QUEUE
+)
 from modules.core.services.azure.service_bus import AzureServiceBusService
 
 
@@ -17,12 +19,19 @@ class Email:
     def send_email(
         self, users: List[str] = [], bcc_email: List[str] = [], template: str = '',
         system: str = 'base_fastapi_plus', subject: str = 'Base Fastapi Architecture template notification',
-        render_vars: Dict = {}, body: str = None, email_queue_name: str = SB_EMAIL_QUEUE
+        render_vars: Dict = {}, body: str = None, email_queue_name: str = SB_EMAIL_QUEUE,
+        attachments: List[Dict] = []
     ) -> bool:
         """
         This method send messages
 
         Author: Matheus Henrique (m.araujo)
+
+        Claim-check: a body bigger than "EMAIL_CLAIM_CHECK_THRESHOLD_BYTES"
+        and the attachments ({'name', 'file': bytes or file-like,
+        'content_type'}) are stored in Blob Storage, the queue message only
+        carries their references ("body_ref", "attachments").
+
         Returns:
             bool: sent message or not
         """
@@ -30,7 +39,7 @@ class Email:
         email_dict = self.__mount_email_queue_message(
             users=users, bcc_email=bcc_email, template=template,
             system=system, render_vars=render_vars, subject=subject,
-            body=body
+            body=body, attachments=attachments
         )
 
         AzureServiceBusService().send_a_bunch_of_dict_to_queue(
@@ -38,7 +47,8 @@ class Email:
 
     def __mount_email_queue_message(
         self, users: List[str], bcc_email: List[str], template: str,
-        system: str, subject: str, render_vars: Dict, body: str = None
+        system: str, subject: str, render_vars: Dict, body: str = None,
+        attachments: List[Dict] = []
     ):
         message_dict = {}
 
@@ -51,17 +61,23 @@ class Email:
         message_dict["subject"] = subject
         message_dict["env"] = 'dev' if ENV == 'DEV' else 'prod'
 
-        if body:
-            message_dict["body"] = body
+        if not body:
+            body = render_template(
+                template, render_vars
+            ).replace('\n', '')
+
+        encoded_body = body.encode('UTF-8')
+        if len(encoded_body) > EMAIL_CLAIM_CHECK_THRESHOLD_BYTES:
+            message_dict["body_ref"] = store_payload(
+                encoded_body, 'body.html', 'text/html; charset=utf-8')
         else:
-            templates_path = 'modules/core/services/email/templates'
-            jinja_env = Environment(loader=FileSystemLoader(
-                os.path.abspath(templates_path)
-            ))
-            template = jinja_env.get_template(template)
+            message_dict["body"] = body
 
-            message_dict["body"] = template.render(
-                **render_vars
-            ).replace('\n', '')
+        if attachments:
+            message_dict["attachments"] = [
+                store_payload(
+                    attachment['file'], attachment['name'], attachment.get('content_type'))
+                for attachment in attachments
+            ]
 
         return message_dict
@@ -0,0 +1,108 @@
+import os
+import threading
+from typing import Dict
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from modules.core.env import (
+    EMAIL_TEMPLATES_AUTO_RELOAD, EMAIL_TEMPLATES_BYTECODE_CACHE_DIR
+)
+
+# Absolute, so the templates are found whatever the working directory
+EMAIL_TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+
+# Templates path -> shared Jinja environment
+_environments: Dict[str, Environment] = {}
+_lock = threading.Lock()
+
+
+def get_jinja_environment(templates_path: str = EMAIL_TEMPLATES_PATH) -> Environment:
+    """
+    Get the process-wide Jinja environment of a templates directory.
+
+    The environment keeps the compiled templates in memory, so a template
+    is read and compiled once, not once per email. The compiled bytecode is
+    also cached on disk ("EMAIL_TEMPLATES_BYTECODE_CACHE_DIR"), so a new
+    process (or worker) skips the compilation too.
+    The template files are checked for changes only with
+    "EMAIL_TEMPLATES_AUTO_RELOAD" (development).
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    templates_path = os.path.abspath(templates_path)
+
+    environment = _environments.get(templates_path)
+    if environment is None:
+        with _lock:
+            environment = _environments.get(templates_path)
+            if environment is None:
+                bytecode_cache = None
+                if EMAIL_TEMPLATES_BYTECODE_CACHE_DIR:
+                    os.makedirs(EMAIL_TEMPLATES_BYTECODE_CACHE_DIR, exist_ok=True)
+                    bytecode_cache = FileSystemBytecodeCache(EMAIL_TEMPLATES_BYTECODE_CACHE_DIR)
+
+                environment = _environments[templates_path] = Environment(
+                    loader=FileSystemLoader(templates_path),
+                    bytecode_cache=bytecode_cache,
+                    auto_reload=EMAIL_TEMPLATES_AUTO_RELOAD,
+                    # Every template of the directory stays compiled in memory
+                    cache_size=-1,
+                )
+    return environment
+
+
+def render_template(
+    template: str, render_vars: Dict, templates_path: str = EMAIL_TEMPLATES_PATH
+) -> str:
+    """
+    Render a template with the shared Jinja environment of its directory
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    return get_jinja_environment(templates_path).get_template(template).render(**render_vars)
+
+
+def render_template_block(
+    template: str, block: str, render_vars: Dict,
+    templates_path: str = EMAIL_TEMPLATES_PATH
+) -> str:
+    """
+    Render only a "{% block %}" of a template (e.g. the "item" of an
+    event, embedded in a digest); the whole template when it has no such block
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    compiled = get_jinja_environment(templates_path).get_template(template)
+    if block not in compiled.blocks:
+        return compiled.render(**render_vars)
+
+    context = compiled.new_context(render_vars)
+    return ''.join(compiled.blocks[block](context))
+
+
+def precompile_templates(templates_path: str = EMAIL_TEMPLATES_PATH) -> int:
+    """
+    Compile every template of the directory (application startup), so the
+    first emails render from memory
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        compiled: int (amount of templates)
+    """
+    environment = get_jinja_environment(templates_path)
+
+    compiled = 0
+    for template in environment.list_templates():
+        try:
+            environment.get_template(template)
+            compiled += 1
+        except Exception as error:
+            print(f"Error occurred when compiling the email template '{template}': {error}")
+    return compiled
@@ -0,0 +1,177 @@
+import time
+import threading
+from typing import Dict, List, Tuple
+from modules.core.services.email.email import Email
+from modules.core.services.utils.task_dispatcher import task_dispatcher
+from modules.core.services.email.jinja_environment import (
+    render_template, render_template_block
+)
+from modules.core.env import (
+    NOTIFICATION_COALESCE_MAX_EVENTS, NOTIFICATION_COALESCE_WINDOW_SECONDS
+)
+
+DIGEST_TEMPLATE = 'notifications_digest.html'
+# Block of the event templates embedded in the digest (their whole email otherwise)
+DIGEST_ITEM_BLOCK = 'item'
+
+
+class NotificationCoalescer:
+    """
+    Coalesce the email notifications of a recipient: the notifications of
+    the same recipient and template within "window_seconds" (from the first
+    one) are sent as a single digest email, instead of one email (and one
+    queue message) per event.
+
+    - A lone notification is sent as usual, with its own template.
+    - A digest embeds only the "{% block item %}" of each notification
+      (its event details), not the whole email (greeting, signature).
+    - A digest is sent right away when it reaches "max_events".
+    - With "window_seconds" 0 the notifications are sent immediately.
+    - "close" sends everything buffered (application shutdown).
+    - The emails are sent by the "task_dispatcher": a send that fails
+      (e.g. Service Bus unavailable) is retried with backoff and counted
+      in the dispatcher failures ("NotificationCoalescer.send").
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = NOTIFICATION_COALESCE_WINDOW_SECONDS,
+        max_events: int = NOTIFICATION_COALESCE_MAX_EVENTS
+    ) -> None:
+        self.window_seconds = window_seconds
+        self.max_events = max_events
+
+        # (recipient, template, subject, system) -> {'first_at': float, 'events': [render_vars]}
+        self.buffers: Dict[Tuple, Dict] = {}
+        self.stats = {'notifications': 0, 'emails': 0, 'digests': 0}
+        self._condition = threading.Condition()
+        self._closing = False
+        self._thread: threading.Thread = None
+
+    def notify(
+        self, recipient: str, template: str, render_vars: Dict, subject: str,
+        system: str = 'base_fastapi_plus'
+    ):
+        """
+        Buffer a notification, sent alone or in a digest when its window ends
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        key = (recipient, template, subject, system)
+
+        with self._condition:
+            self.stats['notifications'] += 1
+            if self.window_seconds <= 0 or self._closing:
+                ready = [(key, [render_vars])]
+            else:
+                buffer = self.buffers.setdefault(
+                    key, {'first_at': time.monotonic(), 'events': []})
+                buffer['events'].append(render_vars)
+
+                ready = []
+                if len(buffer['events']) >= self.max_events:
+                    ready.append((key, self.buffers.pop(key)['events']))
+                else:
+                    self.__start()
+                    self._condition.notify()
+
+        for ready_key, events in ready:
+            self.__send(ready_key, events)
+
+    def flush(self, force: bool = False):
+        """
+        Send the buffers whose window ended (all of them with "force")
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        for key, events in self.__take_ready(force):
+            self.__send(key, events)
+
+    def close(self, timeout: float = 30):
+        """
+        Send everything buffered and stop (application shutdown)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush(force=True)
+
+    def __start(self):
+        # Called with the condition held
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self.__run, name='notification-coalescer', daemon=True)
+            self._thread.start()
+
+    def __run(self):
+        while True:
+            with self._condition:
+                if self._closing:
+                    return
+
+                if self.buffers:
+                    next_deadline = min(
+                        buffer['first_at'] for buffer in self.buffers.values()
+                    ) + self.window_seconds
+                    timeout = max(next_deadline - time.monotonic(), 0)
+                else:
+                    timeout = None
+                self._condition.wait(timeout)
+
+            self.flush()
+
+    def __take_ready(self, force: bool) -> List[Tuple]:
+        now = time.monotonic()
+        with self._condition:
+            keys = [
+                key for key, buffer in self.buffers.items()
+                if force or now - buffer['first_at'] >= self.window_seconds
+            ]
+            return [(key, self.buffers.pop(key)['events']) for key in keys]
+
+    def __send(self, key: Tuple, events: List[Dict]):
+        # Retried by the dispatcher when it fails (in the background, or
+        # inline when the dispatcher is not running, e.g. at the shutdown)
+        task_dispatcher.dispatch(self.send, key, events)
+
+    def send(self, key: Tuple, events: List[Dict]):
+        """
+        Send the notifications of a buffer, alone or as a digest.
+        The errors are raised, for the "task_dispatcher" to retry.
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        recipient, template, subject, system = key
+        if len(events) == 1:
+            Email().send_email(
+                users=[recipient], template=template, system=system,
+                subject=subject, render_vars=events[0])
+        else:
+            body = render_template(DIGEST_TEMPLATE, {
+                'count': len(events),
+                # Only the "item" block of each event, not its whole email
+                'notifications': [
+                    render_template_block(template, DIGEST_ITEM_BLOCK, render_vars)
+                    for render_vars in events],
+            })
+            Email().send_email(
+                users=[recipient], system=system,
+                subject=f'{subject} ({len(events)} notifications)',
+                body=body.replace('\n', ''))
+
+        with self._condition:
+            self.stats['emails'] += 1
+            if len(events) > 1:
+                self.stats['digests'] += 1
+
+
+notification_coalescer = NotificationCoalescer()
@@ -0,0 +1,46 @@
+from typing import Dict
+from modules.core.env import SB_EMAIL_QUEUE
+from modules.core.services.email.smtp_mail import SMTPEmail
+from modules.core.services.azure.service_bus_worker import register_queue_handler
+from modules.core.services.email.claim_check import (
+    delete_payloads, open_payload_stream, read_payload_text
+)
+
+
+@register_queue_handler(SB_EMAIL_QUEUE)
+def send_queued_email(message: Dict):
+    """
+    Send by SMTP an email put in the queue by "Email.send_email"
+    (the body is already rendered)
+
+    The claim-checked body ("body_ref") is read from Blob Storage and the
+    attachments are streamed from it into the email, then both are deleted.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    to_email = [email for email in message['to_email'].split(',') if email]
+    bcc_email = [email for email in (message.get('bcc_email') or '').split(',') if email]
+
+    body_ref = message.get('body_ref')
+    body = read_payload_text(body_ref) if body_ref else message['body']
+    references = message.get('attachments') or []
+
+    # Sent over a pooled connection (no handshake per email)
+    if references:
+        attachments = [
+            {
+                'name': reference['name'],
+                'content_type': reference['content_type'],
+                'open': lambda reference=reference: open_payload_stream(reference),
+            }
+            for reference in references
+        ]
+        SMTPEmail().send_streamed_mail(
+            body, message['subject'], to_email, bcc_email, attachments)
+    else:
+        SMTPEmail().send_html_mail(
+            body, message['subject'], to_email, bcc_email)
+
+    delete_payloads(references + ([body_ref] if body_ref else []))
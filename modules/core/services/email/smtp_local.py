@@ -0,0 +1,126 @@
+import time
+import socket
+import threading
+import socketserver
+from typing import Dict, List
+
+
+class LocalSMTPServer:
+    """
+    Minimal in-process SMTP server stand-in (no TLS, any login accepted),
+    to run the SMTP senders locally (development, throughput checks)
+    without a mail server. The received emails are kept in "messages".
+
+    "latency_ms" simulates the round trip of every SMTP command, so the
+    cost of the handshakes (EHLO, AUTH) shows up as with a remote server.
+    "drop_connections" closes the open connections, as a server does with
+    the idle ones (reconnection checks).
+
+    Usage:
+        server = LocalSMTPServer().start()
+        SMTPEmail(server.host, server.port, None)  # with SMTP_USE_TLS=False
+        ...
+        server.stop()
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.messages: List[Dict] = []
+        self.stats = {'connections': 0, 'commands': 0}
+        self._lock = threading.Lock()
+        self._connections = set()
+
+        local_server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with local_server._lock:
+                    local_server._connections.add(self.connection)
+                try:
+                    local_server._handle(self.rfile, self.wfile)
+                except OSError:
+                    # Connection dropped ("drop_connections")
+                    pass
+                finally:
+                    with local_server._lock:
+                        local_server._connections.discard(self.connection)
+
+        self._server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self.host, self.port = self._server.server_address
+        self._thread: threading.Thread = None
+
+    def start(self) -> 'LocalSMTPServer':
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name='local-smtp-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def drop_connections(self):
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def _handle(self, rfile, wfile):
+        def reply(line: str):
+            if self.latency_ms:
+                time.sleep(self.latency_ms / 1000)
+            wfile.write(f'{line}\r\n'.encode('ASCII'))
+            wfile.flush()
+
+        with self._lock:
+            self.stats['connections'] += 1
+
+        reply('220 localhost ESMTP')
+        envelope = {'from': None, 'recipients': []}
+
+        for raw_line in rfile:
+            line = raw_line.decode('UTF-8').rstrip('\r\n')
+            command = line[:4].upper()
+            with self._lock:
+                self.stats['commands'] += 1
+
+            if command == 'EHLO':
+                reply('250-localhost')
+                reply('250-8BITMIME')
+                reply('250 AUTH PLAIN LOGIN')
+            elif command == 'HELO':
+                reply('250 localhost')
+            elif command == 'AUTH':
+                reply('235 Authentication successful')
+            elif command == 'MAIL':
+                envelope = {'from': line[10:].strip('<> '), 'recipients': []}
+                reply('250 OK')
+            elif command == 'RCPT':
+                envelope['recipients'].append(line[8:].strip('<> '))
+                reply('250 OK')
+            elif command == 'DATA':
+                reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+                for data_line in rfile:
+                    if data_line == b'.\r\n':
+                        break
+                    # Dot-stuffing: a leading dot was doubled by the client
+                    data.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                with self._lock:
+                    self.messages.append({**envelope, 'data': b''.join(data)})
+                reply('250 OK')
+            elif command in ('RSET', 'NOOP'):
+                reply('250 OK')
+            elif command == 'QUIT':
+                reply('221 Bye')
+                return
+            else:
+                reply('502 Command not implemented')
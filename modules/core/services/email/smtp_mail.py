@@ -1,21 +1,216 @@
-import os
-from smtplib import SMTP
-from typing import Dict, List
+import time
+import uuid
+import queue
+import base64
+import threading
+from email import policy
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from smtplib import (
+    SMTP, SMTPConnectError, SMTPDataError, SMTPRecipientsRefused,
+    SMTPSenderRefused, SMTPServerDisconnected, quotedata
+)
+from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Environment, FileSystemLoader
 from email.mime.application import MIMEApplication
+from modules.core.services.email.jinja_environment import render_template
 from modules.core.env import (
-    DEFAULT_REPLY_TO_EMAIL, SMTP_EMAIL_HOST,
-    SMTP_EMAIL_HOST_PASSWORD, SMTP_EMAIL_PORT, SMTP_FROM_EMAIL
+    DEFAULT_REPLY_TO_EMAIL, SMTP_EMAIL_HOST, SMTP_EMAIL_HOST_PASSWORD,
+    SMTP_EMAIL_PORT, SMTP_FROM_EMAIL, SMTP_POOL_ACQUIRE_TIMEOUT_SECONDS,
+    SMTP_POOL_HEALTH_CHECK_SECONDS, SMTP_POOL_SIZE, SMTP_SEND_ATTEMPTS,
+    SMTP_TIMEOUT_SECONDS, SMTP_USE_TLS
+)
+
+# Errors after which a connection is discarded and the send retried with a new one
+SMTP_RECONNECT_ERRORS = (
+    SMTPServerDisconnected, SMTPConnectError, ConnectionError, TimeoutError
 )
 
+# Bytes encoded per base64 line (76 characters, RFC 2045)
+BASE64_LINE_BYTES = 57
+
+# (host, port, login) -> pool of authenticated SMTP connections
+_smtp_pools: Dict[Tuple, 'SMTPConnectionPool'] = {}
+_lock = threading.Lock()
+
+
+def get_smtp_pool(
+    email_host: str = SMTP_EMAIL_HOST,
+    email_port: int = SMTP_EMAIL_PORT,
+    from_email: str = SMTP_FROM_EMAIL,
+    email_host_password: str = SMTP_EMAIL_HOST_PASSWORD
+) -> 'SMTPConnectionPool':
+    """
+    Get the process-wide pool of connections of a SMTP server (and login)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    key = (email_host, int(email_port or 0), from_email)
+
+    pool = _smtp_pools.get(key)
+    if pool is None:
+        with _lock:
+            pool = _smtp_pools.get(key)
+            if pool is None:
+                pool = _smtp_pools[key] = SMTPConnectionPool(
+                    email_host, int(email_port or 0), from_email, email_host_password)
+    return pool
+
+
+def close_smtp_pools():
+    """
+    Quit the pooled SMTP connections (application shutdown)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    with _lock:
+        for pool in _smtp_pools.values():
+            pool.close()
+        _smtp_pools.clear()
+
+
+class SMTPConnectionPool:
+    """
+    Pool of open and authenticated SMTP connections. A connection is not
+    thread-safe, so each one is leased to a single thread at a time; up to
+    "max_size" connections are opened on demand (connect, STARTTLS, login)
+    and kept open for reuse.
+
+    A connection idle for more than "health_check_seconds" is checked
+    with a NOOP before it is leased, and replaced when the server closed it.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self,
+        email_host: str,
+        email_port: int,
+        from_email: str,
+        email_host_password: str = None,
+        use_tls: bool = SMTP_USE_TLS,
+        max_size: int = SMTP_POOL_SIZE,
+        acquire_timeout: float = SMTP_POOL_ACQUIRE_TIMEOUT_SECONDS,
+        health_check_seconds: float = SMTP_POOL_HEALTH_CHECK_SECONDS,
+        timeout: float = SMTP_TIMEOUT_SECONDS
+    ) -> None:
+        self.email_host = email_host
+        self.email_port = email_port
+        self.from_email = from_email
+        self.email_host_password = email_host_password
+        self.use_tls = use_tls
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.health_check_seconds = health_check_seconds
+        self.timeout = timeout
+
+        # LIFO: the most recently used connections are reused first,
+        # the others can be closed by the server when idle
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+        self.size = 0
+        self.stats = {'connections': 0, 'reconnections': 0}
+        self._lock = threading.Lock()
+
+    def acquire(self) -> SMTP:
+        while True:
+            try:
+                server, last_used = self.idle.get_nowait()
+            except queue.Empty:
+                break
+
+            if self.__is_healthy(server, last_used):
+                return server
+            self.discard(server)
+            self.stats['reconnections'] += 1
+
+        with self._lock:
+            create = self.size < self.max_size
+            if create:
+                self.size += 1
+
+        if not create:
+            try:
+                server, last_used = self.idle.get(timeout=self.acquire_timeout)
+            except queue.Empty:
+                raise Exception(
+                    f"No SMTP connection available to '{self.email_host}' "
+                    f"after {self.acquire_timeout}s")
+            if self.__is_healthy(server, last_used):
+                return server
+            self.discard(server)
+            self.stats['reconnections'] += 1
+            return self.acquire()
+
+        try:
+            return self.__connect()
+        except Exception:
+            with self._lock:
+                self.size -= 1
+            raise
+
+    def release(self, server: SMTP):
+        self.idle.put((server, time.monotonic()))
+
+    def discard(self, server: SMTP):
+        """
+        Close a broken connection, a new one will be opened when needed
+        """
+        with self._lock:
+            self.size -= 1
+        try:
+            server.quit()
+        except Exception:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self.idle.get_nowait()
+            except queue.Empty:
+                return
+            self.discard(server)
+
+    def __connect(self) -> SMTP:
+        server = SMTP(self.email_host, self.email_port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.email_host_password:
+                server.login(self.from_email, self.email_host_password)
+        except Exception:
+            server.close()
+            raise
+
+        self.stats['connections'] += 1
+        return server
+
+    def __is_healthy(self, server: SMTP, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.health_check_seconds:
+            return True
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
 
 class SMTPEmail:
     """
     This class implement e-mail service
     using smtp lib that allows file sending
 
+    The SMTP connections are pooled (see "SMTPConnectionPool"): creating
+    an instance doesn't connect, each send leases an open connection.
+
     Author: Matheus Henrique (m.araujo)
     """
 
@@ -24,12 +219,13 @@ class SMTPEmail:
         email_host: str = SMTP_EMAIL_HOST,
         email_port: int = SMTP_EMAIL_PORT,
         email_host_password: str = SMTP_EMAIL_HOST_PASSWORD,
+        attempts: int = SMTP_SEND_ATTEMPTS
     ) -> None:
         self.from_email: str = SMTP_FROM_EMAIL
+        self.attempts = attempts
 
-        self.server = SMTP(email_host, email_port)
-        self.server.starttls()
-        self.server.login(self.from_email, email_host_password)
+        self.pool = get_smtp_pool(
+            email_host, email_port, self.from_email, email_host_password)
 
     def send_mail(
         self,
@@ -62,15 +258,32 @@ class SMTPEmail:
         if from_email is None:
             from_email = self.from_email
 
-        templates_path = 'base_api/core/services/email/templates'
-        jinja_env = Environment(loader=FileSystemLoader(
-            os.path.abspath(templates_path)
-        ))
-        template = jinja_env.get_template(template)
+        template = render_template(template, render_vars)
+
+        self.send_html_mail(
+            template, subject, to_email, bcc_email, from_email,
+            reply_to_email, attachment_obj)
+
+    def send_html_mail(
+        self,
+        html_body: str,
+        subject: str,
+        to_email: List[str],
+        bcc_email: List[str] = [],
+        from_email: str = None,
+        reply_to_email: str = DEFAULT_REPLY_TO_EMAIL,
+        attachment_obj: bytes = None
+    ):
+        """
+        This method send an already rendered HTML email
+
+        Author: Matheus Henrique (m.araujo)
 
-        template = template.render(
-            **render_vars
-        )
+        Returns:
+            None
+        """
+        if from_email is None:
+            from_email = self.from_email
 
         message = MIMEMultipart()
         message['Subject'] = subject
@@ -79,23 +292,235 @@ class SMTPEmail:
         message['Bcc'] = ','.join(bcc_email) if len(bcc_email) > 0 else ''
         message['Reply-To'] = reply_to_email
 
-        message.attach(MIMEText(template, "html"))
+        message.attach(MIMEText(html_body, "html"))
 
         if attachment_obj:
             attachment = MIMEApplication(
                 attachment_obj['file'], attachment_obj['name'])
-            attachment['Content-Disposition'] = f"attachment; filename={
-                attachment_obj['name']}"
+            attachment['Content-Disposition'] = \
+                f"attachment; filename={attachment_obj['name']}"
             message.attach(attachment)
 
         msg_body = message.as_string()
 
-        self.server.sendmail(from_email, to_email + bcc_email, msg_body)
+        self.__send_with_connection(
+            lambda server: server.sendmail(from_email, to_email + bcc_email, msg_body))
+
+    def send_streamed_mail(
+        self,
+        html_body: str,
+        subject: str,
+        to_email: List[str],
+        bcc_email: List[str] = [],
+        attachments: List[Dict] = [],
+        from_email: str = None,
+        reply_to_email: str = DEFAULT_REPLY_TO_EMAIL
+    ):
+        """
+        This method send an HTML email with attachments streamed into it:
+        the MIME message is written to the SMTP DATA command part by part and
+        each attachment is base64 encoded chunk by chunk, so a large
+        attachment is never held in memory.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+
+        Parameters:
+        - attachments: List[Dict] with the keys:
+            - name (str), content_type (str)
+            - open (Callable): returns an iterable of bytes chunks, called
+              again when the send is retried
+
+        Returns:
+            None
+        """
+        if from_email is None:
+            from_email = self.from_email
+
+        message = MIMEMultipart(boundary=f'==============={uuid.uuid4().hex}==')
+        message['Subject'] = subject
+        message['From'] = from_email
+        message['To'] = ','.join(to_email) if len(to_email) > 0 else ''
+        message['Bcc'] = ','.join(bcc_email) if len(bcc_email) > 0 else ''
+        message['Reply-To'] = reply_to_email
+
+        def send(server: SMTP):
+            self.__send_data(
+                server, from_email, to_email + bcc_email,
+                self.__iter_streamed_message(message, html_body, attachments))
+
+        # A connection broken in the middle of DATA can't be reset
+        self.__send_with_connection(send, reset_on_error=False)
+
+    def send_many(self, emails: List[Dict], max_workers: int = None) -> List[Dict]:
+        """
+        Send many emails concurrently over the pooled connections (one
+        handshake per connection, not per email). A failed email doesn't
+        stop the others.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Date: 19th October 2026
+
+        Parameters:
+        - emails: List[Dict], the parameters of "send_mail" (with "template")
+          or of "send_html_mail" (with "html_body")
+        - max_workers: int (default: the pool size)
+
+        Returns:
+            outcomes: List[Dict] in the same order of "emails", with the keys:
+                - index (int)
+                - error (str): error message (None when sent)
+        """
+        if not emails:
+            return []
+
+        def send(index: int, email: Dict) -> Dict:
+            try:
+                if 'template' in email:
+                    self.send_mail(**email)
+                else:
+                    self.send_html_mail(**email)
+            except Exception as error:
+                print(f"Error occurred when sending the email {index}: {error}")
+                return {'index': index, 'error': str(error)}
+            return {'index': index, 'error': None}
+
+        with ThreadPoolExecutor(
+                max_workers=min(max_workers or self.pool.max_size, len(emails))) as executor:
+            futures = [
+                executor.submit(send, index, email) for index, email in enumerate(emails)
+            ]
+            return [future.result() for future in futures]
 
     def quit_server_connection(self):
         """
         Quit SMTP connection
 
+        The connections are pooled and reused by the next emails, they are
+        closed by "close_smtp_pools" (application shutdown)
+
         Author: Matheus Henrique (m.araujo)
         """
-        self.server.quit()
+        pass
+
+    def __send_with_connection(self, send: Callable[[SMTP], None], reset_on_error: bool = True):
+        """
+        Send through a pooled connection. When the connection is broken it
+        is replaced and the send retried, up to "attempts" times.
+        """
+        for attempt in range(1, self.attempts + 1):
+            server = self.pool.acquire()
+            try:
+                send(server)
+            except SMTP_RECONNECT_ERRORS as error:
+                self.pool.discard(server)
+                if attempt == self.attempts:
+                    raise
+                print(f"SMTP connection reconnecting (attempt {attempt}): {error}")
+                continue
+            except Exception:
+                # e.g. refused recipient: the connection is still usable
+                if reset_on_error:
+                    self.__reset_or_discard(server)
+                else:
+                    self.pool.discard(server)
+                raise
+
+            self.pool.release(server)
+            return
+
+    def __reset_or_discard(self, server: SMTP):
+        try:
+            server.rset()
+        except Exception:
+            self.pool.discard(server)
+            return
+        self.pool.release(server)
+
+    def __send_data(
+        self, server: SMTP, from_email: str, recipients: List[str], chunks: Iterable[bytes]
+    ):
+        """
+        "SMTP.sendmail" with the message written chunk by chunk (the chunks
+        are already dot-stuffed, with CRLF line endings)
+        """
+        server.ehlo_or_helo_if_needed()
+
+        code, response = server.mail(from_email)
+        if code != 250:
+            server.rset()
+            raise SMTPSenderRefused(code, response, from_email)
+
+        refused = {}
+        for recipient in recipients:
+            code, response = server.rcpt(recipient)
+            if code not in (250, 251):
+                refused[recipient] = (code, response)
+        if len(refused) == len(recipients):
+            server.rset()
+            raise SMTPRecipientsRefused(refused)
+
+        code, response = server.docmd('data')
+        if code != 354:
+            server.rset()
+            raise SMTPDataError(code, response)
+
+        for chunk in chunks:
+            server.send(chunk)
+        server.send(b'.\r\n')
+
+        code, response = server.getreply()
+        if code != 250:
+            raise SMTPDataError(code, response)
+
+    def __iter_streamed_message(
+        self, message: MIMEMultipart, html_body: str, attachments: List[Dict]
+    ) -> Iterator[bytes]:
+        boundary = message.get_boundary()
+
+        yield self.__fold_headers(message) + b'\r\n'
+
+        html_part = MIMEText(html_body, "html")
+        yield f'--{boundary}\r\n'.encode('ASCII')
+        # Dot-stuffing and CRLF line endings of the SMTP DATA
+        yield quotedata(html_part.as_string()).encode('UTF-8') + b'\r\n'
+
+        for attachment in attachments:
+            maintype, _, subtype = (
+                attachment.get('content_type') or 'application/octet-stream'
+            ).partition(';')[0].strip().partition('/')
+            part = MIMEBase(maintype, subtype or 'octet-stream')
+            del part['MIME-Version']
+            part['Content-Transfer-Encoding'] = 'base64'
+            part.add_header('Content-Disposition', 'attachment', filename=attachment['name'])
+
+            yield f'--{boundary}\r\n'.encode('ASCII')
+            yield self.__fold_headers(part) + b'\r\n'
+            # Base64 lines never start with a dot, no dot-stuffing needed
+            yield from self.__iter_base64_lines(attachment['open']())
+
+        yield f'--{boundary}--\r\n'.encode('ASCII')
+
+    def __fold_headers(self, message: MIMEBase) -> bytes:
+        return ''.join(
+            # RFC 2047 encoded (non-ASCII subject, names) and folded with CRLF
+            policy.SMTP.fold(*policy.SMTP.header_store_parse(name, value))
+            for name, value in message.items() if value is not None
+        ).encode('ASCII')
+
+    def __iter_base64_lines(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Base64 encode a stream in 76 characters lines, "chunks" of any size
+        """
+        pending = b''
+        for chunk in chunks:
+            pending += chunk
+            complete = len(pending) - len(pending) % BASE64_LINE_BYTES
+            if complete:
+                yield base64.encodebytes(pending[:complete]).replace(b'\n', b'\r\n')
+                pending = pending[complete:]
+
+        if pending:
+            yield base64.encodebytes(pending).replace(b'\n', b'\r\n')
@@ -0,0 +1,237 @@
+import json
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, Iterable, List
+from sqlalchemy import and_, inspect, or_, select
+from sqlalchemy.orm import Mapper, Session
+from sqlalchemy.orm.attributes import set_committed_value
+from modules.core.services.logging.audit_serializer import get_mapper_columns
+from modules.core.env import AUDIT_LOG_SNAPSHOT_EVERY
+
+AUDIT_TYPE_SNAPSHOT = 'snapshot'
+AUDIT_TYPE_DIFF = 'diff'
+
+# Most objects tracked by the snapshot counter (least recently updated are
+# forgotten, their next update is a full snapshot again)
+MAX_TRACKED_OBJECTS = 100000
+
+# (source, object uuid) -> updates logged as diffs since the last full snapshot
+_updates_since_snapshot: OrderedDict = OrderedDict()
+_updates_lock = threading.Lock()
+
+# Mapper -> keys of the columns refreshed by the UPDATE itself ("onupdate")
+_onupdate_columns: Dict[Mapper, List[str]] = {}
+
+
+def get_onupdate_columns(mapper: Mapper) -> List[str]:
+    """
+    Column attribute keys with an "onupdate" (e.g. "date_update"), cached
+    per mapper. Their new value has no attribute history.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    columns = _onupdate_columns.get(mapper)
+    if columns is None:
+        columns = [
+            attr.key for attr in mapper.column_attrs
+            if any(
+                column.onupdate is not None or column.server_onupdate is not None
+                for column in attr.columns
+            )
+        ]
+        with _updates_lock:
+            _onupdate_columns[mapper] = columns
+    return columns
+
+
+def load_previous_values(session: Session, objects: List[any]) -> Dict:
+    """
+    Values stored in the database of the objects about to be updated, to be
+    called before the flush ("before_flush"): the old values of the changed
+    columns whose previous value was not loaded (e.g. expired by the
+    commit, "expire_on_commit") and of the "onupdate" columns.
+    The columns not loaded are also set in the objects, so their snapshot
+    is complete. A single query per mapped class.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        previous_values: Dict (InstanceState -> {field: old value})
+    """
+    previous_values = {}
+    to_load: Dict[Mapper, List] = {}
+    for obj in objects:
+        state = inspect(obj)
+        previous = previous_values[state] = {}
+
+        missing = False
+        for key in get_mapper_columns(state.mapper):
+            history = state.attrs[key].history
+            if history.deleted:
+                continue
+            if key in get_onupdate_columns(state.mapper) and key in state.dict:
+                previous[key] = state.dict[key]
+            elif history.added or key not in state.dict:
+                missing = True
+
+        if missing and state.key is not None:
+            to_load.setdefault(state.mapper, []).append(state)
+
+    for mapper, states in to_load.items():
+        keys = get_mapper_columns(mapper)
+        primary_keys = [mapper.get_property_by_column(column).key for column in mapper.primary_key]
+
+        query = select(*[getattr(mapper.class_, key) for key in keys]).where(or_(*[
+            and_(*[
+                column == value
+                for column, value in zip(mapper.primary_key, state.key[1])
+            ])
+            for state in states
+        ]))
+        with session.no_autoflush:
+            rows = {
+                tuple(row[keys.index(key)] for key in primary_keys): row
+                for row in session.execute(query)
+            }
+
+        for state in states:
+            row = rows.get(tuple(state.key[1]))
+            if row is None:
+                continue
+            previous = previous_values[state]
+            for key, value in zip(keys, row):
+                history = state.attrs[key].history
+                if key not in state.dict:
+                    set_committed_value(state.obj(), key, value)
+                if not history.deleted:
+                    previous.setdefault(key, value)
+
+    return previous_values
+
+
+def get_object_changes(obj, previous_values: Dict = None) -> Dict:
+    """
+    Changed column values of a SQLAlchemy instance since it was loaded or
+    last flushed, from the attribute history: {field: [old, new]}.
+    The old values missing in the history (not loaded before the change)
+    are taken from "previous_values" ("load_previous_values"), None otherwise.
+    Called after the flush, the "onupdate" columns (e.g. "date_update")
+    refreshed by it are included too.
+    No attribute is loaded to compute it.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        changes: Dict
+    """
+    state = inspect(obj)
+    previous_values = previous_values or {}
+
+    changes = {}
+    for key in get_mapper_columns(state.mapper):
+        history = state.attrs[key].history
+        if history.added or history.deleted:
+            changes[key] = [
+                history.deleted[0] if history.deleted else previous_values.get(key),
+                history.added[0] if history.added else None,
+            ]
+
+    for key in get_onupdate_columns(state.mapper):
+        if key in changes or key not in previous_values or key not in state.dict:
+            continue
+        if state.dict[key] != previous_values[key]:
+            changes[key] = [previous_values[key], state.dict[key]]
+
+    return changes
+
+
+def should_snapshot(source: str, object_uuid: str,
+                    snapshot_every: int = AUDIT_LOG_SNAPSHOT_EVERY) -> bool:
+    """
+    Whether the update of an object must be logged as a full snapshot: the
+    first update seen by the process and then one every "snapshot_every",
+    so a diff chain never has to be replayed from far away.
+    Each call counts an update: call it only for the logs really written
+    (after the commit, see "resolve_audit_types").
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    key = (source, object_uuid)
+
+    with _updates_lock:
+        updates = _updates_since_snapshot.pop(key, None)
+        snapshot = updates is None or updates + 1 >= snapshot_every
+
+        _updates_since_snapshot[key] = 0 if snapshot else updates + 1
+        if len(_updates_since_snapshot) > MAX_TRACKED_OBJECTS:
+            _updates_since_snapshot.popitem(last=False)
+
+    return snapshot
+
+
+def rebuild_state(
+    audit_logs: Iterable[Dict], until_log_id: str = None, until: datetime = None
+) -> Dict:
+    """
+    Rebuild an object state from its audit logs: the latest full snapshot
+    (INSERT, DELETE or snapshot UPDATE) up to the requested version, then
+    the diffs logged after it, applied in order.
+
+    Args:
+        audit_logs (Iterable[Dict]): audit logs of a single object
+        until_log_id (str): state right after this audit log (a version)
+        until (datetime): state at this moment
+        (the latest state when neither is given)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        state: Dict (None when there is no audit log up to the version)
+    """
+    chain = sorted(audit_logs, key=_chain_order)
+
+    if until_log_id is not None:
+        ids = [audit_log['id'] for audit_log in chain]
+        if until_log_id not in ids:
+            raise Exception(f"Audit log '{until_log_id}' not found in the object logs")
+        chain = chain[:ids.index(until_log_id) + 1]
+
+    if until is not None:
+        until = until.strftime('%Y-%m-%d %H:%M:%S')
+        chain = [audit_log for audit_log in chain if audit_log['date_create'] <= until]
+
+    if not chain:
+        return None
+
+    base_index = None
+    for index in range(len(chain) - 1, -1, -1):
+        if chain[index].get('audit_type', AUDIT_TYPE_SNAPSHOT) == AUDIT_TYPE_SNAPSHOT:
+            base_index = index
+            break
+
+    if base_index is None:
+        raise Exception(
+            "The audit logs have no full snapshot to rebuild the state from")
+
+    state = dict(json.loads(chain[base_index]['json_object']))
+    for audit_log in chain[base_index + 1:]:
+        for key, (_, new_value) in json.loads(audit_log['json_object']).items():
+            state[key] = new_value
+
+    return state
+
+
+def _chain_order(audit_log: Dict) -> tuple:
+    # "sequence" (ns) orders the logs written in the same second
+    return audit_log['date_create'], audit_log.get('sequence', 0)
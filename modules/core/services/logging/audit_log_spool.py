@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, List
+from modules.core.env import (
+    AUDIT_LOG_SPOOL_LEASE_SECONDS, AUDIT_LOG_SPOOL_MAX_ATTEMPTS
+)
+
+
+class AuditLogSpool:
+    """
+    Durable local spool of audit logs (SQLite database in WAL mode).
+
+    The audit logs are appended to the spool (one transaction per call) and
+    a replayer drains it to CosmosDB later, so a slow or unavailable
+    CosmosDB never fails a request nor loses its audit logs.
+
+    - "synchronous=NORMAL" in WAL mode: commits are not fsync-ed one by
+      one, the WAL is synced at the checkpoints (fsync batching). A commit
+      survives an application crash, only an OS crash may lose the last ones.
+    - The replayers claim the rows they send for "lease_seconds", so several
+      processes can share the same spool. The rows are removed only when
+      CosmosDB accepted them; as the audit log ids are kept, a replay after
+      a crash upserts the same documents (idempotent).
+    - An item rejected by CosmosDB "max_attempts" times is parked in the
+      "audit_log_dead_letter" table, so it doesn't block the spool; it is
+      kept there for inspection and can be requeued ("requeue_dead_letters",
+      "manage.py replayauditlogs --requeue-dead-letters"). Items given back
+      because CosmosDB was unavailable don't count an attempt.
+    - The SQLite database is opened on the first use, not on import.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self, path: str, lease_seconds: float = AUDIT_LOG_SPOOL_LEASE_SECONDS,
+        max_attempts: int = AUDIT_LOG_SPOOL_MAX_ATTEMPTS
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection = None
+
+    def append(self, items: List[Dict]):
+        """
+        Durably append audit log items (ignores ids already spooled)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not items:
+            return
+
+        now = time.time()
+        rows = [
+            (item['id'], json.dumps(item, default=str), self.max_attempts, now)
+            for item in items
+        ]
+
+        with self._lock:
+            with self.__transaction() as connection:
+                connection.executemany(
+                    'INSERT OR IGNORE INTO audit_log '
+                    '(id, body, max_attempts, available_at) VALUES (?, ?, ?, ?)', rows)
+
+    def claim(self, limit: int) -> List[Dict]:
+        """
+        Claim (lease) up to "limit" of the oldest available items
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        now = time.time()
+
+        with self._lock:
+            with self.__transaction() as connection:
+                rows = connection.execute(
+                    'SELECT sequence, body FROM audit_log WHERE available_at <= ? '
+                    'ORDER BY available_at, sequence LIMIT ?', (now, limit)).fetchall()
+                connection.executemany(
+                    'UPDATE audit_log SET available_at = ? WHERE sequence = ?',
+                    [(now + self.lease_seconds, sequence) for sequence, _ in rows])
+
+        return [json.loads(body) for _, body in rows]
+
+    def remove(self, ids: List[str]):
+        """
+        Remove the items written to CosmosDB
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if not ids:
+            return
+
+        with self._lock:
+            with self.__transaction() as connection:
+                connection.executemany(
+                    'DELETE FROM audit_log WHERE id = ?', [(id,) for id in ids])
+
+    def release(
+        self, ids: List[str], count_attempt: bool = True, retry_in_seconds: float = 0
+    ) -> int:
+        """
+        Give back items that could not be written:
+
+        - Rejected by CosmosDB ("count_attempt"): retried later with an
+          exponential backoff (up to 5 minutes); the items that reached
+          their "max_attempts" are moved to the dead-letter table.
+        - CosmosDB unavailable or busy (not "count_attempt"): retried in
+          "retry_in_seconds", as many times as needed.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            dead_lettered: int (items moved to the dead-letter table)
+        """
+        if not ids:
+            return 0
+
+        now = time.time()
+
+        if not count_attempt:
+            with self._lock:
+                with self.__transaction() as connection:
+                    connection.executemany(
+                        'UPDATE audit_log SET available_at = ? WHERE id = ?',
+                        [(now + retry_in_seconds, id) for id in ids])
+            return 0
+
+        with self._lock:
+            with self.__transaction() as connection:
+                connection.executemany(
+                    'UPDATE audit_log SET attempts = attempts + 1, '
+                    'available_at = ? + MIN(300, 1 << MIN(attempts, 9)) WHERE id = ?',
+                    [(now, id) for id in ids])
+                connection.execute(
+                    'INSERT OR REPLACE INTO audit_log_dead_letter '
+                    '(id, body, attempts, dead_lettered_at) '
+                    'SELECT id, body, attempts, ? FROM audit_log '
+                    'WHERE attempts >= max_attempts', (now,))
+                return connection.execute(
+                    'DELETE FROM audit_log WHERE attempts >= max_attempts').rowcount
+
+    def requeue_dead_letters(self) -> int:
+        """
+        Move the dead-lettered items back to the spool, with their
+        attempts reset (e.g. once the cause of the rejections was fixed)
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            requeued: int
+        """
+        with self._lock:
+            with self.__transaction() as connection:
+                connection.execute(
+                    'INSERT OR IGNORE INTO audit_log (id, body, max_attempts, available_at) '
+                    'SELECT id, body, ?, ? FROM audit_log_dead_letter ORDER BY dead_lettered_at',
+                    (self.max_attempts, time.time()))
+                return connection.execute('DELETE FROM audit_log_dead_letter').rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self.__get_connection().execute(
+                'SELECT COUNT(*) FROM audit_log').fetchone()[0]
+
+    def dead_letter_count(self) -> int:
+        with self._lock:
+            return self.__get_connection().execute(
+                'SELECT COUNT(*) FROM audit_log_dead_letter').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def __get_connection(self) -> sqlite3.Connection:
+        """
+        Open the SQLite database on the first use (called holding "_lock")
+        """
+        if self._connection is not None:
+            return self._connection
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(
+            self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute(
+            """
+                CREATE TABLE IF NOT EXISTS audit_log (
+                    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL,
+                    available_at REAL NOT NULL
+                )
+            """
+        )
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS ix_audit_log_available_at '
+            'ON audit_log (available_at, sequence)')
+        connection.execute(
+            """
+                CREATE TABLE IF NOT EXISTS audit_log_dead_letter (
+                    id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    dead_lettered_at REAL NOT NULL
+                )
+            """
+        )
+
+        self._connection = connection
+        return connection
+
+    def __transaction(self):
+        return _SqliteTransaction(self.__get_connection())
+
+
+class _SqliteTransaction:
+    """
+    "BEGIN IMMEDIATE" transaction: the write lock is taken upfront, so two
+    processes never claim the same rows
+    """
+
+    def __init__(self, connection: sqlite3.Connection) -> None:
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, error_type, *args):
+        self.connection.execute('ROLLBACK' if error_type else 'COMMIT')
@@ -0,0 +1,350 @@
+import time
+import queue
+import threading
+from typing import Dict, List
+from modules.core.services.azure.cosmosdb import CosmosDB
+from modules.core.services.logging.audit_log_spool import AuditLogSpool
+from modules.core.env import (
+    AUDIT_LOG_BATCH_SIZE, AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+    AUDIT_LOG_QUEUE_MAX_SIZE, AUDIT_LOG_QUEUE_PUT_TIMEOUT_SECONDS,
+    AUDIT_LOG_SPOOL_PATH, COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER
+)
+
+# Status codes of the items CosmosDB can't take for now (busy or unavailable,
+# also any 5xx), as opposed to the items it rejects (e.g. 400, 413)
+RETRYABLE_STATUS_CODES = (408, 429, 449)
+
+# Longest wait between two writes of a batch CosmosDB couldn't take
+WRITE_RETRY_MAX_SECONDS = 60
+
+
+def is_retryable_outcome(outcome: Dict) -> bool:
+    """
+    Whether a failed bulk outcome (see "CosmosDB.bulk_execute") is worth
+    writing again later, i.e. CosmosDB was busy or unavailable
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    return outcome['error'] is not None and (
+        outcome['status_code'] in RETRYABLE_STATUS_CODES
+        or outcome['status_code'] >= 500
+    )
+
+
+class AuditLogWriter:
+    """
+    Process-wide buffered writer of audit logs.
+
+    The items are put in a bounded in-memory queue and a background thread
+    writes them to CosmosDB by batches, whenever "batch_size" items are
+    waiting or "flush_interval" seconds have passed, so the request path
+    never waits for CosmosDB.
+
+    Backpressure: when the queue is full, "write" blocks up to "put_timeout"
+    seconds and then writes the items itself (no audit log is dropped).
+    While the writer is not started (e.g. scripts) the items are written inline.
+
+    A batch CosmosDB can't take (unavailable, throttled) is written again
+    with an exponential backoff until it is accepted, while new items wait
+    in the queue. Audit logs are lost only when CosmosDB rejects them
+    (e.g. invalid document) or when it is still unavailable at the shutdown.
+
+    With a "spool" (see "AuditLogSpool", "AUDIT_LOG_SPOOL_PATH") the items
+    are durably appended to it instead of the in-memory queue and the
+    background thread replays it: the audit logs survive a restart and
+    a CosmosDB outage (failed items are retried with backoff, up to
+    "AUDIT_LOG_SPOOL_MAX_ATTEMPTS" times before being dead-lettered).
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self,
+        container_id: str = COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER,
+        max_queue_size: int = AUDIT_LOG_QUEUE_MAX_SIZE,
+        batch_size: int = AUDIT_LOG_BATCH_SIZE,
+        flush_interval: float = AUDIT_LOG_FLUSH_INTERVAL_SECONDS,
+        put_timeout: float = AUDIT_LOG_QUEUE_PUT_TIMEOUT_SECONDS,
+        spool: AuditLogSpool = None
+    ) -> None:
+        self.container_id = container_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.spool = spool
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = {
+            'enqueued': 0, 'spooled': 0, 'written': 0, 'failed': 0,
+            'batches': 0, 'inline_writes': 0, 'retries': 0, 'lost': 0,
+            'dead_lettered': 0,
+        }
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._spooled = threading.Event()
+        self._spooled_since_replay = 0
+        self._spooled_lock = threading.Lock()
+        self._thread: threading.Thread = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """
+        Start the background flusher (application startup)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if self.is_running:
+            return
+
+        self._stopping.clear()
+        self._thread = threading.Thread(
+            target=self.__run, name='audit-log-writer', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30):
+        """
+        Stop the background flusher, writing everything still queued
+        (application shutdown)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if self._thread is None:
+            return
+
+        self._stopping.set()
+        self._spooled.set()
+        self._thread.join(timeout)
+        self._thread = None
+
+        # Anything left (e.g. the join timed out) is written here.
+        # What the spool could not replay is kept for the next start.
+        self.flush()
+
+    def write(self, items: List[Dict]):
+        """
+        Queue audit log items to be written by the background flusher
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if self.spool is not None and self.__append_to_spool(items):
+            if not self.is_running:
+                self.replay_spool()
+            return
+
+        if not self.is_running:
+            self.write_batch(items)
+            self.__count('inline_writes')
+            return
+
+        for index, item in enumerate(items):
+            try:
+                self.queue.put(item, timeout=self.put_timeout)
+                self.__count('enqueued')
+            except queue.Full:
+                # Backpressure: the caller pays for the write
+                self.write_batch(items[index:])
+                self.__count('inline_writes')
+                return
+
+    def flush(self):
+        """
+        Write all the queued items now, in the calling thread
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        batch = self.__take(self.batch_size, timeout=0)
+        while batch:
+            self.write_batch(batch)
+            batch = self.__take(self.batch_size, timeout=0)
+
+        if self.spool is not None:
+            self.replay_spool()
+
+    def replay_spool(self) -> Dict:
+        """
+        Drain the spool to CosmosDB by batches, until it is empty or a
+        batch fails entirely (CosmosDB unavailable, retried later).
+        Only the items CosmosDB rejects count an attempt (see
+        "AuditLogSpool.release"), an outage never dead-letters them.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            result: Dict ({'written': int, 'failed': int, 'dead_lettered': int})
+        """
+        result = {'written': 0, 'failed': 0, 'dead_lettered': 0}
+
+        while True:
+            items = self.spool.claim(self.batch_size)
+            if not items:
+                return result
+
+            outcomes = self.write_batch(items)
+            if not outcomes:
+                # CosmosDB unavailable: not the items' fault
+                self.spool.release(
+                    [item['id'] for item in items], count_attempt=False,
+                    retry_in_seconds=self.flush_interval)
+                result['failed'] += len(items)
+                return result
+
+            written_ids = {
+                items[outcome['index']]['id']
+                for outcome in outcomes if outcome['error'] is None}
+            retryable_ids = [
+                items[outcome['index']]['id']
+                for outcome in outcomes if is_retryable_outcome(outcome)]
+            rejected_ids = [
+                items[outcome['index']]['id']
+                for outcome in outcomes
+                if outcome['error'] is not None and not is_retryable_outcome(outcome)]
+            failed_ids = retryable_ids + rejected_ids
+
+            self.spool.remove(list(written_ids))
+            self.spool.release(
+                retryable_ids, count_attempt=False, retry_in_seconds=self.flush_interval)
+            dead_lettered = self.spool.release(rejected_ids)
+            if dead_lettered:
+                print(f"{dead_lettered} audit logs moved to the spool dead-letter table")
+                self.__count('dead_lettered', dead_lettered)
+
+            result['written'] += len(written_ids)
+            result['failed'] += len(failed_ids)
+            result['dead_lettered'] += dead_lettered
+            if not written_ids:
+                return result
+
+    def write_batch(self, items: List[Dict]) -> List[Dict]:
+        """
+        Write one batch of items to CosmosDB. Failures are logged, they
+        never reach the request that produced the audit log.
+        The items are upserted: writing them again (replay) is harmless.
+
+        Author: Matheus Henrique (m.araujo)
+
+        Returns:
+            outcomes: List[Dict] (see "CosmosDB.bulk_execute")
+        """
+        if not items:
+            return []
+
+        try:
+            client = CosmosDB()
+            container = client.get_container(self.container_id)
+            outcomes = client.bulk_upsert_items(container, items)
+        except Exception as error:
+            print(f"Error occurred when writing audit logs: {error}")
+            self.__count('failed', len(items))
+            return []
+
+        failed = [outcome for outcome in outcomes if outcome['error'] is not None]
+        for outcome in failed:
+            print(
+                f"Error occurred when writing audit log "
+                f"{items[outcome['index']]['id']}: {outcome['error']}")
+
+        self.__count('batches')
+        self.__count('written', len(items) - len(failed))
+        self.__count('failed', len(failed))
+        return outcomes
+
+    def __run(self):
+        if self.spool is not None:
+            return self.__run_spool_replayer()
+
+        while not (self._stopping.is_set() and self.queue.empty()):
+            batch = self.__take(self.batch_size, timeout=self.flush_interval)
+            if batch:
+                self.__write_until_accepted(batch)
+
+    def __write_until_accepted(self, batch: List[Dict]):
+        """
+        Write a batch, writing again the items CosmosDB couldn't take
+        (see "is_retryable_outcome") after 1, 2, 4... seconds (up to
+        "WRITE_RETRY_MAX_SECONDS"), until they are written or the writer stops
+        """
+        retries = 0
+        while True:
+            outcomes = self.write_batch(batch)
+            if outcomes:
+                batch = [
+                    batch[outcome['index']] for outcome in outcomes
+                    if is_retryable_outcome(outcome)]
+            if not batch:
+                return
+
+            if self._stopping.is_set():
+                print(
+                    f"{len(batch)} audit logs lost: CosmosDB is still "
+                    f"unavailable at the shutdown")
+                self.__count('lost', len(batch))
+                return
+
+            # Returns right away when stopping: one last write is tried
+            self._stopping.wait(min(2 ** retries, WRITE_RETRY_MAX_SECONDS))
+            retries += 1
+            self.__count('retries')
+
+    def __run_spool_replayer(self):
+        """
+        Replay the spool every "flush_interval" seconds, or as soon as
+        "batch_size" items were spooled
+        """
+        while not self._stopping.is_set():
+            self._spooled.wait(self.flush_interval)
+            with self._spooled_lock:
+                self._spooled.clear()
+                self._spooled_since_replay = 0
+
+            try:
+                # Also the in-memory queue (used if the spool can't be written)
+                self.flush()
+            except Exception as error:
+                print(f"Error occurred when replaying the audit logs spool: {error}")
+
+    def __append_to_spool(self, items: List[Dict]) -> bool:
+        try:
+            self.spool.append(items)
+        except Exception as error:
+            print(f"Error occurred when spooling audit logs: {error}")
+            return False
+
+        self.__count('spooled', len(items))
+        with self._spooled_lock:
+            self._spooled_since_replay += len(items)
+            if self._spooled_since_replay >= self.batch_size:
+                self._spooled.set()
+        return True
+
+    def __take(self, max_items: int, timeout: float) -> List[Dict]:
+        """
+        Take up to "max_items" from the queue, waiting at most "timeout"
+        seconds for the batch to fill up
+        """
+        batch = []
+        deadline = time.monotonic() + timeout
+        while len(batch) < max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0 and not self._stopping.is_set():
+                    batch.append(self.queue.get(timeout=remaining))
+                else:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def __count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+
+audit_log_writer = AuditLogWriter(
+    spool=AuditLogSpool(AUDIT_LOG_SPOOL_PATH) if AUDIT_LOG_SPOOL_PATH else None)
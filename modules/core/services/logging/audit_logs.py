@@ -1,12 +1,25 @@
-import json
-import copy
+import time
 from uuid import uuid4
-from typing import List
+from typing import Dict, List
 from datetime import datetime
-from modules.core.choices import AUDIT_LOGS_ACTIONS
+from sqlalchemy import inspect
+from modules.core.choices import AUDIT_LOGS_ACTIONS, EVENT_LISTEN_BEFORE_UPDATE
 from modules.core.services.azure.cosmosdb import CosmosDB
-from modules.core.env import COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER
+from modules.core.services.logging.audit_log_writer import audit_log_writer
+from modules.core.services.logging.audit_serializer import (
+    dumps_audit_json, serialize_object
+)
+from modules.core.services.logging.audit_diff import (
+    AUDIT_TYPE_DIFF, AUDIT_TYPE_SNAPSHOT, get_object_changes, rebuild_state,
+    should_snapshot
+)
+from modules.core.env import (
+    AUDIT_LOG_UPDATE_MODE, COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER, COSMOS_PAGE_SIZE
+)
 
+# Item key of the full snapshot kept until the audit type of a diff
+# candidate is chosen ("resolve_audit_types")
+SNAPSHOT_CANDIDATE_KEY = 'snapshot_json_object'
 
 
 def generate_audit_log(objects: List[any], trigger_action: str):
@@ -22,7 +35,7 @@ def generate_audit_log(objects: List[any], trigger_action: str):
             'source': obj.__class__.__name__,
             'object_uuid': dict_obj['uuid'],
             'object_version': dict_obj['version'],
-            'json_object': json.dumps(dict_obj, default=str, indent=4),
+            'json_object': dumps_audit_json(dict_obj),
             'auth_user_id': user.id
         }
 
@@ -36,24 +49,179 @@ def generate_audit_log(objects: List[any], trigger_action: str):
     Returns:
         None
     """
+    # Written in background by batches (see "AuditLogWriter")
+    audit_log_writer.write(resolve_audit_types(
+        build_audit_log_items(objects, trigger_action)))
+
+
+def build_audit_log_items(
+    objects: List[any], trigger_action: str, previous_values: Dict = None
+) -> List[Dict]:
+    """
+    Audit log items (see "generate_audit_log") of the given objects.
+
+    With "AUDIT_LOG_UPDATE_MODE" = "diff", the UPDATE logs of SQLAlchemy
+    instances store only the changed fields ({field: [old, new]}, from the
+    attribute history, so before the flush history is reset), except for a
+    full snapshot every "AUDIT_LOG_SNAPSHOT_EVERY" updates of the object
+    (see "rebuild_object_state"). "previous_values" ("load_previous_values",
+    InstanceState -> values) completes the old values missing in the history.
+
+    The UPDATE items that may be logged as a diff keep their full snapshot
+    too: "resolve_audit_types" must be called when they are really written.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        items: List[Dict]
+    """
+    diff_updates = trigger_action == EVENT_LISTEN_BEFORE_UPDATE and \
+        AUDIT_LOG_UPDATE_MODE == AUDIT_TYPE_DIFF
+
     items = []
     for obj in objects:
-        dict_obj = obj
-        if not isinstance(obj, dict):
-            dict_obj = copy.deepcopy(obj).__dict__
-            del dict_obj['_sa_instance_state']
+        # Only the loaded column values (no deepcopy, no lazy loads)
+        dict_obj = serialize_object(obj)
+        source = obj.__class__.__name__
+
+        audit_type = AUDIT_TYPE_SNAPSHOT
+        json_object = dict_obj
+        snapshot_candidate = None
+        if diff_updates and not isinstance(obj, dict):
+            changes = get_object_changes(
+                obj, (previous_values or {}).get(inspect(obj)))
+            # Without history (e.g. already flushed) the snapshot is kept
+            if changes:
+                audit_type = AUDIT_TYPE_DIFF
+                json_object = changes
+                snapshot_candidate = dumps_audit_json(dict_obj)
 
-        items.append({
+        item = {
             'id': str(uuid4()),
             'date_create': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'sequence': time.time_ns(),
             'action': AUDIT_LOGS_ACTIONS[trigger_action],
-            'source': obj.__class__.__name__,
+            'audit_type': audit_type,
+            'source': source,
             'object_uuid': dict_obj['uuid'],
-            'object_version': dict_obj['version'],
-            'json_object': json.dumps(dict_obj, default=str, indent=4),
+            'object_version': dict_obj.get('version'),
+            'json_object': dumps_audit_json(json_object),
             'auth_user_id': 'Must implement authentication in the application first'
-        })
+        }
+        if snapshot_candidate is not None:
+            item[SNAPSHOT_CANDIDATE_KEY] = snapshot_candidate
+        items.append(item)
+
+    return items
+
+
+def resolve_audit_types(items: List[Dict]) -> List[Dict]:
+    """
+    Choose the audit type of the diff candidates of "build_audit_log_items"
+    (in place): a full snapshot every "AUDIT_LOG_SNAPSHOT_EVERY" updates of
+    the object ("should_snapshot"), a diff otherwise. Must be called only for
+    the items written (e.g. after the commit), so the updates rolled back
+    are not counted.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        items: List[Dict]
+    """
+    for item in items:
+        snapshot = item.pop(SNAPSHOT_CANDIDATE_KEY, None)
+        if snapshot is not None and should_snapshot(item['source'], item['object_uuid']):
+            item['audit_type'] = AUDIT_TYPE_SNAPSHOT
+            item['json_object'] = snapshot
+    return items
+
 
+def rebuild_object_state(
+    object_uuid: str, until_log_id: str = None, until: datetime = None
+) -> Dict:
+    """
+    Rebuild the state of an object at any version (audit log id) or
+    moment from its audit logs (full snapshots and diffs)
+
+    Args:
+        object_uuid (str): the logged object uuid
+        until_log_id (str): state right after this audit log
+        until (datetime): state at this moment
+        (the latest state when neither is given)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        state: Dict (None when the object has no audit log)
+    """
     client = CosmosDB()
     container = client.get_container(COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER)
-    client.create_items(container=container, items=items)
+
+    return rebuild_state(
+        client.query_items_by_object_uuid(container, object_uuid),
+        until_log_id=until_log_id,
+        until=until
+    )
+
+
+def list_audit_logs_page(
+    object_uuid: str = None,
+    auth_user_id: str = None,
+    continuation_token: str = None,
+    page_size: int = COSMOS_PAGE_SIZE
+) -> Dict:
+    """
+    Cursor-paginated audit logs, to be served by API endpoints.
+    The "continuation_token" of a page is the cursor of the next one
+    (None on the last page).
+
+    Args:
+        object_uuid (str): filter by the logged object uuid
+        auth_user_id (str): filter by the user who made the action
+        continuation_token (str): cursor returned by the previous page
+        page_size (int): max amount of items of the page
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        page: Dict ({'items': List[Dict], 'continuation_token': str})
+    """
+    conditions = []
+    parameters = []
+    if object_uuid is not None:
+        conditions.append('r.object_uuid = @object_uuid')
+        parameters.append({'name': '@object_uuid', 'value': object_uuid})
+    if auth_user_id is not None:
+        conditions.append('r.auth_user_id = @auth_user_id')
+        parameters.append({'name': '@auth_user_id', 'value': auth_user_id})
+
+    query = 'SELECT * FROM r'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+
+    client = CosmosDB()
+    container = client.get_container(COSMOS_BASE_FASTAPI_AUDIT_LOG_CONTAINER)
+
+    # Single partition query when the container is partitioned by a filtered field
+    partition_key = None
+    if object_uuid is not None:
+        partition_key = client.partition_key_for_filter(
+            container, 'object_uuid', object_uuid)
+    if partition_key is None and auth_user_id is not None:
+        partition_key = client.partition_key_for_filter(
+            container, 'auth_user_id', auth_user_id)
+
+    return client.query_items_page(
+        container, query, parameters,
+        max_item_count=page_size,
+        continuation_token=continuation_token,
+        partition_key=partition_key
+    )
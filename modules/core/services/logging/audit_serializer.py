@@ -0,0 +1,66 @@
+import json
+import threading
+from typing import Dict, List
+from sqlalchemy import inspect
+from sqlalchemy.orm import Mapper
+
+# Mapper -> column attribute keys, computed once per mapped class
+_mapper_columns: Dict[Mapper, List[str]] = {}
+_mapper_columns_lock = threading.Lock()
+
+
+def get_mapper_columns(mapper: Mapper) -> List[str]:
+    """
+    Column attribute keys of a mapped class (relationships excluded),
+    cached per mapper
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    columns = _mapper_columns.get(mapper)
+    if columns is None:
+        columns = [column.key for column in mapper.column_attrs]
+        with _mapper_columns_lock:
+            _mapper_columns[mapper] = columns
+    return columns
+
+
+def serialize_object(obj) -> Dict:
+    """
+    Audit snapshot of an object: the values of the mapped columns of a
+    SQLAlchemy instance, or the object itself when it is already a dict.
+
+    Only the values already loaded in the instance are read (its state
+    dict), so no lazy load (relationships, deferred or expired columns)
+    is ever triggered and nothing is copied besides the column values.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        values: Dict
+    """
+    if isinstance(obj, dict):
+        return obj
+
+    state = inspect(obj)
+    loaded = state.dict
+
+    return {
+        key: loaded[key]
+        for key in get_mapper_columns(state.mapper)
+        if key in loaded
+    }
+
+
+def dumps_audit_json(values: Dict) -> str:
+    """
+    Compact JSON of an audit snapshot (non JSON types, e.g. datetime, as str)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    return json.dumps(values, default=str, separators=(',', ':'))
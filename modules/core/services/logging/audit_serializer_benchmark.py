@@ -0,0 +1,108 @@
+import copy
+import json
+import time
+from typing import Dict
+from datetime import datetime
+from sqlalchemy import (
+    Column, DateTime, ForeignKey, Integer, String, create_engine, select
+)
+from sqlalchemy.orm import (
+    Session, declarative_base, relationship, selectinload
+)
+from modules.core.services.logging.audit_serializer import (
+    dumps_audit_json, serialize_object
+)
+
+
+def build_benchmark_models(columns: int):
+    """
+    Wide parent model ("columns" extra String columns) with a
+    one-to-many relationship, on a private declarative base
+    """
+    BenchmarkBase = declarative_base()
+
+    parent_attributes = {
+        '__tablename__': 'audit_benchmark_parent',
+        'id': Column(Integer, primary_key=True),
+        'uuid': Column(String(36)),
+        'version': Column(String(36)),
+        'date_create': Column(DateTime),
+        'children': relationship('AuditBenchmarkChild', back_populates='parent'),
+    }
+    for index in range(columns):
+        parent_attributes[f'column_{index}'] = Column(String(64))
+
+    Parent = type('AuditBenchmarkParent', (BenchmarkBase,), parent_attributes)
+    Child = type('AuditBenchmarkChild', (BenchmarkBase,), {
+        '__tablename__': 'audit_benchmark_child',
+        'id': Column(Integer, primary_key=True),
+        'parent_id': Column(Integer, ForeignKey('audit_benchmark_parent.id')),
+        'payload': Column(String(256)),
+        'parent': relationship('AuditBenchmarkParent', back_populates='children'),
+    })
+
+    return BenchmarkBase, Parent, Child
+
+
+def legacy_serialize(obj) -> str:
+    """
+    Former audit serialization (deepcopy of the instance, indented JSON)
+    """
+    dict_obj = copy.deepcopy(obj).__dict__
+    del dict_obj['_sa_instance_state']
+    return json.dumps(dict_obj, default=str, indent=4)
+
+
+def run_audit_serializer_benchmark(
+    rows: int = 500, columns: int = 60, children: int = 20, repeat: int = 3
+) -> Dict:
+    """
+    Compare the former and the current audit serialization on wide rows
+    with loaded relationships (in-memory SQLite)
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+
+    Returns:
+        result: Dict (best seconds and average JSON size of each serializer)
+    """
+    BenchmarkBase, Parent, Child = build_benchmark_models(columns)
+
+    engine = create_engine('sqlite://')
+    BenchmarkBase.metadata.create_all(engine)
+
+    with Session(engine) as session:
+        for row in range(rows):
+            parent = Parent(
+                id=row, uuid=f'{row:036d}', version='1', date_create=datetime.now(),
+                **{f'column_{index}': f'value {index}' * 4 for index in range(columns)})
+            parent.children = [
+                Child(payload='x' * 200) for _ in range(children)]
+            session.add(parent)
+        session.commit()
+
+        objects = session.scalars(
+            select(Parent).options(selectinload(Parent.children))).all()
+
+        serializers = {
+            'legacy': legacy_serialize,
+            'current': lambda obj: dumps_audit_json(serialize_object(obj)),
+        }
+
+        result = {'rows': rows, 'columns': columns, 'children': children}
+        for name, serializer in serializers.items():
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                sizes = [len(serializer(obj)) for obj in objects]
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            result[name] = {
+                'seconds': round(best, 4),
+                'avg_json_bytes': sum(sizes) // len(sizes),
+            }
+
+    engine.dispose()
+    return result
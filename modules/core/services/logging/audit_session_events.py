@@ -0,0 +1,135 @@
+from typing import List
+from sqlalchemy import event
+from sqlalchemy.orm import Session, SessionTransaction
+from modules.core.env import AUDIT_LOG_UPDATE_MODE
+from modules.core.models.Core import BaseDB
+from modules.core.services.logging.audit_log_writer import audit_log_writer
+from modules.core.services.logging.audit_diff import (
+    AUDIT_TYPE_DIFF, load_previous_values
+)
+from modules.core.services.logging.audit_logs import (
+    build_audit_log_items, resolve_audit_types
+)
+from modules.core.choices import (
+    EVENT_LISTEN_AFTER_INSERT, EVENT_LISTEN_BEFORE_DELETE, EVENT_LISTEN_BEFORE_UPDATE
+)
+
+# "session.info" key of the audit log items waiting for the commit
+AUDIT_LOG_SESSION_KEY = 'audit_log_items'
+
+# "session.info" key of the previous values of the objects being flushed
+AUDIT_LOG_PREVIOUS_VALUES_KEY = 'audit_log_previous_values'
+
+
+def register_audit_session_events(session_class=Session):
+    """
+    Automatic audit logs of the "BaseDB" models: the objects inserted,
+    updated and deleted by a session are serialized when they are flushed,
+    and all the audit logs of the transaction are handed to the audit log
+    writer at once after a successful commit (nothing is logged on rollback).
+    With diff UPDATE logs, the old values not loaded are read before the
+    flush, and the snapshot/diff choice is made after the commit.
+
+    A model opts out with "__audit_log__ = False".
+
+    Registering twice is a no-op, also for a subclass (e.g. a
+    "sessionmaker" class) of a class already registered: its sessions
+    would log every object twice.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+    listeners = (
+        ('before_flush', _before_flush),
+        ('after_flush', _after_flush),
+        ('after_commit', _after_commit),
+        ('after_soft_rollback', _after_soft_rollback),
+    )
+    for identifier, listener in listeners:
+        registered = any(
+            event.contains(cls, identifier, listener)
+            for cls in session_class.__mro__ if issubclass(cls, Session))
+        if not registered:
+            event.listen(session_class, identifier, listener)
+
+
+def _is_audited(obj) -> bool:
+    return isinstance(obj, BaseDB) and getattr(obj, '__audit_log__', True)
+
+
+def _updated_objects(session: Session) -> List:
+    return [
+        obj for obj in session.dirty
+        if _is_audited(obj) and session.is_modified(obj, include_collections=False)
+    ]
+
+
+def _before_flush(session: Session, flush_context, instances):
+    """
+    Read the database values the diffs need before the flush overwrites
+    them (old values expired by the commit and "onupdate" columns)
+    """
+    session.info.pop(AUDIT_LOG_PREVIOUS_VALUES_KEY, None)
+    if AUDIT_LOG_UPDATE_MODE != AUDIT_TYPE_DIFF:
+        return
+
+    updated = _updated_objects(session)
+    if updated:
+        session.info[AUDIT_LOG_PREVIOUS_VALUES_KEY] = load_previous_values(
+            session, updated)
+
+
+def _after_flush(session: Session, flush_context):
+    """
+    Serialize the flushed objects (the session still lists them as
+    new, dirty and deleted, and their values are loaded)
+    """
+    previous_values = session.info.pop(AUDIT_LOG_PREVIOUS_VALUES_KEY, None)
+
+    inserted = [obj for obj in session.new if _is_audited(obj)]
+    updated = _updated_objects(session)
+    deleted = [obj for obj in session.deleted if _is_audited(obj)]
+
+    if not (inserted or updated or deleted):
+        return
+
+    items = build_audit_log_items(inserted, EVENT_LISTEN_AFTER_INSERT) +\
+        build_audit_log_items(updated, EVENT_LISTEN_BEFORE_UPDATE, previous_values) +\
+        build_audit_log_items(deleted, EVENT_LISTEN_BEFORE_DELETE)
+
+    # Tagged with the (savepoint) transaction, dropped if it is rolled back
+    transaction = session.get_nested_transaction() or session.get_transaction()
+    session.info.setdefault(AUDIT_LOG_SESSION_KEY, []).extend(
+        (transaction, item) for item in items)
+
+
+def _after_commit(session: Session):
+    pending = session.info.pop(AUDIT_LOG_SESSION_KEY, None)
+    if pending:
+        # Only the committed updates count for the snapshot interval
+        audit_log_writer.write(resolve_audit_types([item for _, item in pending]))
+
+
+def _after_soft_rollback(session: Session, previous_transaction: SessionTransaction):
+    pending: List = session.info.get(AUDIT_LOG_SESSION_KEY)
+    if not pending:
+        return
+
+    if not previous_transaction.nested:
+        session.info.pop(AUDIT_LOG_SESSION_KEY, None)
+        return
+
+    # Savepoint rollback: only the logs flushed inside it are dropped
+    session.info[AUDIT_LOG_SESSION_KEY] = [
+        (transaction, item) for transaction, item in pending
+        if not _is_within(transaction, previous_transaction)
+    ]
+
+
+def _is_within(transaction: SessionTransaction, ancestor: SessionTransaction) -> bool:
+    while transaction is not None:
+        if transaction is ancestor:
+            return True
+        transaction = transaction.parent
+    return False
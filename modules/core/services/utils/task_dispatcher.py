@@ -0,0 +1,205 @@
+import time
+import queue
+import threading
+from typing import Callable, Dict
+from modules.core.env import (
+    TASK_DISPATCHER_MAX_ATTEMPTS, TASK_DISPATCHER_PUT_TIMEOUT_SECONDS,
+    TASK_DISPATCHER_QUEUE_MAX_SIZE, TASK_DISPATCHER_RETRY_BACKOFF_SECONDS,
+    TASK_DISPATCHER_WORKERS
+)
+
+
+class TaskDispatcher:
+    """
+    Process-wide in-process task dispatcher: side effects of a request
+    (notifications, emails...) are put in a bounded queue and run by
+    "workers" background threads, so the response doesn't wait for them.
+
+    - A failed task is retried up to "max_attempts" times, after an
+      exponential backoff ("retry_backoff_seconds", doubled on each attempt).
+    - Backpressure: when the queue is full, "dispatch" blocks up to
+      "put_timeout" seconds and then runs the task itself (no task is
+      dropped). While the dispatcher is not started (e.g. scripts) the
+      tasks run inline.
+    - "stop" runs everything still queued (application shutdown).
+    - "snapshot" returns the counters, with the failures per task name.
+
+    Tasks are lost if the process crashes: use a queue (Service Bus) for
+    what must survive it.
+
+    Author: Matheus Henrique (m.araujo)
+
+    Date: 19th October 2026
+    """
+
+    def __init__(
+        self,
+        workers: int = TASK_DISPATCHER_WORKERS,
+        max_queue_size: int = TASK_DISPATCHER_QUEUE_MAX_SIZE,
+        max_attempts: int = TASK_DISPATCHER_MAX_ATTEMPTS,
+        retry_backoff_seconds: float = TASK_DISPATCHER_RETRY_BACKOFF_SECONDS,
+        put_timeout: float = TASK_DISPATCHER_PUT_TIMEOUT_SECONDS
+    ) -> None:
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.put_timeout = put_timeout
+
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = {
+            'dispatched': 0, 'succeeded': 0, 'failed': 0, 'retried': 0,
+            'inline': 0, 'total_seconds': 0.0,
+        }
+        self.failures: Dict[str, int] = {}
+        self._stats_lock = threading.Lock()
+        self._retry_timers: Dict[threading.Timer, Dict] = {}
+        self._stopping = threading.Event()
+        self._threads = []
+
+    @property
+    def is_running(self) -> bool:
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        """
+        Start the worker threads (application startup)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        if self.is_running:
+            return
+
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(target=self.__run, name=f'task-dispatcher-{index}', daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 30):
+        """
+        Run the queued tasks (and the waiting retries) and stop the worker
+        threads (application shutdown)
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        # From now on a failed task is not retried
+        self._stopping.set()
+
+        with self._stats_lock:
+            retries = list(self._retry_timers.items())
+            self._retry_timers.clear()
+        for timer, task in retries:
+            timer.cancel()
+            self.queue.put(task)
+
+        for _ in self._threads:
+            self.queue.put(None)
+
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+
+        # Anything left (e.g. the join timed out) runs here
+        while True:
+            try:
+                task = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if task is not None:
+                self.__execute(task, retry=False)
+
+    def dispatch(self, function: Callable, *args, **kwargs):
+        """
+        Run "function(*args, **kwargs)" in the background
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        task = {
+            'function': function, 'args': args, 'kwargs': kwargs, 'attempt': 1,
+            'name': getattr(function, '__qualname__', repr(function)),
+        }
+        self.__count('dispatched')
+
+        if not self.is_running:
+            self.__count('inline')
+            self.__execute(task, retry=False)
+            return
+
+        try:
+            self.queue.put(task, timeout=self.put_timeout)
+        except queue.Full:
+            # Backpressure: the caller pays for the task
+            self.__count('inline')
+            self.__execute(task, retry=False)
+
+    def snapshot(self) -> Dict:
+        """
+        Counters of the dispatcher
+
+        Author: Matheus Henrique (m.araujo)
+        """
+        with self._stats_lock:
+            return {
+                **self.stats,
+                'queued': self.queue.qsize(),
+                'waiting_retry': len(self._retry_timers),
+                'workers': len(self._threads),
+                'failures': dict(self.failures),
+            }
+
+    def __run(self):
+        while True:
+            task = self.queue.get()
+            if task is None:
+                return
+            self.__execute(task, retry=True)
+
+    def __execute(self, task: Dict, retry: bool):
+        started = time.monotonic()
+        try:
+            task['function'](*task['args'], **task['kwargs'])
+        except Exception as error:
+            self.__count('total_seconds', time.monotonic() - started)
+            print(
+                f"Error occurred in the task '{task['name']}' "
+                f"(attempt {task['attempt']}): {error}")
+
+            if retry and task['attempt'] < self.max_attempts and not self._stopping.is_set():
+                self.__schedule_retry(task)
+                return
+
+            self.__count('failed')
+            with self._stats_lock:
+                self.failures[task['name']] = self.failures.get(task['name'], 0) + 1
+            return
+
+        self.__count('total_seconds', time.monotonic() - started)
+        self.__count('succeeded')
+
+    def __schedule_retry(self, task: Dict):
+        delay = self.retry_backoff_seconds * 2 ** (task['attempt'] - 1)
+        task['attempt'] += 1
+        self.__count('retried')
+
+        def requeue():
+            with self._stats_lock:
+                if self._retry_timers.pop(timer, None) is None:
+                    # Cancelled by "stop", already queued again
+                    return
+            self.queue.put(task)
+
+        timer = threading.Timer(delay, requeue)
+        timer.daemon = True
+        with self._stats_lock:
+            self._retry_timers[timer] = task
+        timer.start()
+
+    def __count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+
+task_dispatcher = TaskDispatcher()
@@ -0,0 +1,102 @@
+import os
+from modules.core.services.logging.audit_log_spool import AuditLogSpool
+from modules.core.services.logging.audit_log_writer import AuditLogWriter
+
+
+def test_database_is_opened_on_the_first_use(tmp_path):
+    path = str(tmp_path / 'spool' / 'audit_log_spool.sqlite3')
+    spool = AuditLogSpool(path)
+
+    assert not os.path.exists(path)
+
+    spool.append([{'id': '1'}])
+
+    assert os.path.exists(path)
+    assert spool.count() == 1
+    spool.close()
+
+
+def test_claimed_items_are_leased(tmp_path):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), lease_seconds=60)
+    spool.append([{'id': str(index)} for index in range(5)])
+
+    assert [item['id'] for item in spool.claim(3)] == ['0', '1', '2']
+    assert [item['id'] for item in spool.claim(3)] == ['3', '4']
+    assert spool.claim(3) == []
+    spool.close()
+
+
+def test_item_failing_max_attempts_is_dead_lettered(tmp_path):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=2)
+    spool.append([{'id': '1'}, {'id': '2'}])
+
+    assert spool.release(['1']) == 0
+    assert spool.release(['1']) == 1
+
+    assert spool.count() == 1
+    assert spool.dead_letter_count() == 1
+    spool.close()
+
+
+def test_items_released_while_cosmos_is_unavailable_are_never_dead_lettered(tmp_path):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=2)
+    spool.append([{'id': '1'}])
+
+    for _ in range(5):
+        assert spool.release(['1'], count_attempt=False) == 0
+
+    assert [item['id'] for item in spool.claim(10)] == ['1']
+    assert spool.dead_letter_count() == 0
+    spool.close()
+
+
+def test_dead_letters_are_requeued(tmp_path):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=1)
+    spool.append([{'id': '1'}])
+    spool.release(['1'])
+
+    assert spool.requeue_dead_letters() == 1
+
+    assert spool.dead_letter_count() == 0
+    assert [item['id'] for item in spool.claim(10)] == ['1']
+    spool.close()
+
+
+def test_writer_keeps_the_spool_while_cosmos_is_unavailable(tmp_path, monkeypatch):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=1)
+    writer = AuditLogWriter(container_id='audit_logs', flush_interval=0, spool=spool)
+    monkeypatch.setattr(writer, 'write_batch', lambda items: [])
+
+    for _ in range(3):
+        # Spooled once (same id), replayed inline on every write
+        writer.write([{'id': '1'}])
+
+    assert spool.count() == 1
+    assert spool.dead_letter_count() == 0
+    spool.close()
+
+
+def test_writer_replays_the_spool_and_dead_letters_rejected_items(tmp_path, monkeypatch):
+    spool = AuditLogSpool(str(tmp_path / 'spool.sqlite3'), max_attempts=1)
+    writer = AuditLogWriter(container_id='audit_logs', spool=spool)
+    written = []
+
+    def write_batch(items):
+        written.extend(item['id'] for item in items if item['id'] != 'rejected')
+        return [
+            {'index': index, 'status_code': 400, 'error': 'Bad request'}
+            if item['id'] == 'rejected' else
+            {'index': index, 'status_code': 200, 'error': None}
+            for index, item in enumerate(items)
+        ]
+
+    monkeypatch.setattr(writer, 'write_batch', write_batch)
+
+    # Not started: the spool is replayed inline
+    writer.write([{'id': '1'}, {'id': 'rejected'}, {'id': '2'}])
+
+    assert written == ['1', '2']
+    assert spool.count() == 0
+    assert spool.dead_letter_count() == 1
+    assert writer.stats['dead_lettered'] == 1
+    spool.close()
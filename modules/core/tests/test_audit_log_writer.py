@@ -0,0 +1,63 @@
+import time
+from modules.core.services.logging.audit_log_writer import AuditLogWriter
+
+
+def outcomes_of(items, status_codes):
+    return [
+        {'index': index, 'status_code': status_code,
+         'error': None if status_code == 200 else 'Error'}
+        for index, status_code in enumerate(status_codes)
+    ]
+
+
+def wait_for(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_not_started_writer_writes_inline(monkeypatch):
+    writer = AuditLogWriter(container_id='audit_logs')
+    batches = []
+    monkeypatch.setattr(writer, 'write_batch', batches.append)
+
+    writer.write([{'id': '1'}, {'id': '2'}])
+
+    assert batches == [[{'id': '1'}, {'id': '2'}]]
+    assert writer.stats['inline_writes'] == 1
+
+
+def test_batch_is_written_again_while_cosmos_is_unavailable(monkeypatch):
+    writer = AuditLogWriter(container_id='audit_logs', flush_interval=0.01)
+    attempts = []
+
+    def write_batch(items):
+        attempts.append([item['id'] for item in items])
+        if len(attempts) == 1:
+            return []  # CosmosDB unreachable
+        if len(attempts) == 2:
+            return outcomes_of(items, [200, 429, 400])
+        return outcomes_of(items, [200] * len(items))
+
+    monkeypatch.setattr(writer, 'write_batch', write_batch)
+    writer.start()
+    writer.write([{'id': '1'}, {'id': '2'}, {'id': 'invalid'}])
+    wait_for(lambda: len(attempts) == 3)
+    writer.stop()
+
+    # The throttled item is written again, the rejected one is not
+    assert attempts == [['1', '2', 'invalid'], ['1', '2', 'invalid'], ['2']]
+    assert writer.stats['retries'] == 2
+    assert writer.stats['lost'] == 0
+
+
+def test_items_still_failing_at_the_shutdown_are_counted_as_lost(monkeypatch):
+    writer = AuditLogWriter(container_id='audit_logs', flush_interval=0.01)
+    monkeypatch.setattr(writer, 'write_batch', lambda items: [])
+
+    writer.start()
+    writer.write([{'id': '1'}])
+    time.sleep(0.1)
+    writer.stop()
+
+    assert writer.stats['lost'] == 1
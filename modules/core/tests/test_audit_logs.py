@@ -0,0 +1,144 @@
+import json
+import pytest
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Session, mapped_column
+from modules.core.models.Core import BaseDB
+from modules.core.services.logging import (
+    audit_diff, audit_logs, audit_session_events
+)
+from modules.core.services.logging.audit_diff import rebuild_state
+from modules.core.services.logging.audit_session_events import (
+    register_audit_session_events
+)
+
+
+class AuditedItem(BaseDB):
+    __tablename__ = 'tests_audited_item'
+
+    # SQLite only autoincrements an INTEGER primary key
+    id = mapped_column(Integer, primary_key=True, autoincrement=True, sort_order=-5)
+    name = mapped_column(String(50))
+    quantity = mapped_column(Integer)
+
+
+@pytest.fixture
+def written_logs(monkeypatch, session: Session):
+    """
+    Audit logs handed to the writer by the session events ("diff" mode)
+    """
+    logs = []
+    monkeypatch.setattr(audit_session_events.audit_log_writer, 'write', logs.extend)
+    monkeypatch.setattr(audit_session_events, 'AUDIT_LOG_UPDATE_MODE', 'diff')
+    monkeypatch.setattr(audit_logs, 'AUDIT_LOG_UPDATE_MODE', 'diff')
+    monkeypatch.setattr(audit_diff, '_updates_since_snapshot', audit_diff.OrderedDict())
+    return logs
+
+
+def test_commit_writes_the_audit_logs(session: Session, written_logs):
+    item = AuditedItem(name='pen', quantity=1)
+    session.add(item)
+    session.flush()
+    assert written_logs == []
+
+    session.commit()
+
+    assert [log['action'] for log in written_logs] == ['INSERT']
+    assert written_logs[0]['object_uuid'] == item.uuid
+
+
+def test_registering_a_session_subclass_again_logs_once(session: Session, written_logs):
+    # The "Session" events are registered by main.py (imported by conftest)
+    register_audit_session_events(type(session))
+
+    session.add(AuditedItem(name='pen', quantity=1))
+    session.commit()
+
+    assert len(written_logs) == 1
+
+
+def test_rollback_writes_nothing(session: Session, written_logs):
+    session.add(AuditedItem(name='pen', quantity=1))
+    session.flush()
+    session.rollback()
+
+    assert written_logs == []
+
+
+def test_savepoint_rollback_drops_only_its_logs(session: Session, written_logs):
+    session.add(AuditedItem(name='pen', quantity=1))
+    session.flush()
+    savepoint = session.begin_nested()
+    session.add(AuditedItem(name='pencil', quantity=2))
+    session.flush()
+    savepoint.rollback()
+    session.commit()
+
+    assert len(written_logs) == 1
+    assert json.loads(written_logs[0]['json_object'])['name'] == 'pen'
+
+
+def test_diff_has_the_old_values_expired_by_the_commit(session: Session, written_logs):
+    item = AuditedItem(name='pen', quantity=1)
+    session.add(item)
+    session.commit()  # Every attribute is expired ("expire_on_commit")
+
+    item.name = 'pencil'
+    session.commit()
+
+    snapshot_log = written_logs[-1]
+    snapshot = json.loads(snapshot_log['json_object'])
+    # First update seen: a full snapshot, with the columns not loaded too
+    assert snapshot_log['audit_type'] == 'snapshot'
+    assert snapshot['name'] == 'pencil'
+    assert snapshot['quantity'] == 1
+
+    previous_date_update = item.date_update
+    item.quantity = 5
+    session.commit()
+
+    diff_log = written_logs[-1]
+    changes = json.loads(diff_log['json_object'])
+    assert diff_log['audit_type'] == 'diff'
+    assert changes['quantity'] == [1, 5]
+    # "onupdate" column refreshed by the UPDATE
+    assert changes['date_update'] == [str(previous_date_update), str(item.date_update)]
+
+
+def test_rebuild_state_round_trip(session: Session, written_logs):
+    item = AuditedItem(name='pen', quantity=1)
+    session.add(item)
+    session.commit()
+
+    for quantity in range(2, 25):
+        item.quantity = quantity
+        session.commit()
+
+    state = rebuild_state(written_logs)
+
+    audit_types = [log['audit_type'] for log in written_logs[1:]]
+    assert audit_types == ['snapshot'] + ['diff'] * 19 + ['snapshot'] + ['diff'] * 2
+    assert state['quantity'] == 24
+    assert state['name'] == 'pen'
+    assert state['date_update'] == str(item.date_update)
+
+    # Any version can be rebuilt
+    state = rebuild_state(written_logs, until_log_id=written_logs[5]['id'])
+    assert state['quantity'] == 6
+
+
+def test_rolled_back_updates_do_not_count_for_the_snapshots(session: Session, written_logs):
+    item = AuditedItem(name='pen', quantity=1)
+    session.add(item)
+    session.commit()
+    item.quantity = 2
+    session.commit()  # Snapshot (first update)
+
+    for quantity in range(10, 30):
+        item.quantity = quantity
+        session.flush()
+        session.rollback()
+
+    item.quantity = 3
+    session.commit()
+
+    assert written_logs[-1]['audit_type'] == 'diff'
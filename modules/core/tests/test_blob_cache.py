@@ -0,0 +1,120 @@
+import os
+import pytest
+from types import SimpleNamespace
+from azure.core.exceptions import ResourceNotModifiedError
+from modules.core.services.azure.blob_cache import BlobCache, BlobDiskCache
+
+
+class FakeDownloader:
+
+    def __init__(self, content: bytes, etag: str, fail: bool = False) -> None:
+        self.content = content
+        self.properties = SimpleNamespace(etag=etag)
+        self.fail = fail
+
+    def readinto(self, file) -> int:
+        file.write(self.content[:1])
+        if self.fail:
+            raise ConnectionError('Connection reset')
+        file.write(self.content[1:])
+        return len(self.content)
+
+
+class FakeBlobServiceClient:
+    """
+    Blobs kept in a dict ({name: (content, etag)})
+    """
+
+    def __init__(self) -> None:
+        self.blobs = {}
+        self.downloads = 0
+        self.fail = False
+
+    def get_blob_client(self, container: str, blob: str):
+        return SimpleNamespace(download_blob=lambda **kwargs: self.download(blob, **kwargs))
+
+    def download(self, blob: str, etag: str = None, match_condition=None):
+        content, current_etag = self.blobs[blob]
+        if etag is not None and etag == current_etag:
+            raise ResourceNotModifiedError()
+        self.downloads += 1
+        return FakeDownloader(content, current_etag, fail=self.fail)
+
+
+def read_all(content) -> bytes:
+    try:
+        return bytes(content[:])
+    finally:
+        content.close()
+
+
+def test_blob_cache_is_abstract():
+    with pytest.raises(TypeError):
+        BlobCache()
+
+
+def test_hot_blob_is_served_from_disk(tmp_path):
+    client = FakeBlobServiceClient()
+    client.blobs['a.csv'] = (b'hello', 'etag-1')
+    cache = BlobDiskCache(directory=str(tmp_path), revalidate_seconds=3600)
+
+    assert read_all(cache.read(client, 'container', 'a.csv')) == b'hello'
+    assert read_all(cache.read(client, 'container', 'a.csv')) == b'hello'
+
+    assert client.downloads == 1
+    assert cache.stats()['hits'] == 1
+    cache.close()
+
+
+def test_changed_blob_is_downloaded_again(tmp_path):
+    client = FakeBlobServiceClient()
+    client.blobs['a.csv'] = (b'hello', 'etag-1')
+    cache = BlobDiskCache(directory=str(tmp_path), revalidate_seconds=0)
+
+    read_all(cache.read(client, 'container', 'a.csv'))
+    # Unchanged: revalidated by a conditional request
+    read_all(cache.read(client, 'container', 'a.csv'))
+    client.blobs['a.csv'] = (b'bye', 'etag-2')
+
+    assert read_all(cache.read(client, 'container', 'a.csv')) == b'bye'
+    assert client.downloads == 2
+    assert cache.stats()['revalidations'] == 1
+    cache.close()
+
+
+def test_other_processes_cache_files_are_kept(tmp_path):
+    other_process_directory = tmp_path / '1'
+    other_process_directory.mkdir()
+    other_file = other_process_directory / ('a' * 64)
+    other_file.write_bytes(b'cached by another worker')
+
+    cache = BlobDiskCache(directory=str(tmp_path))
+    cache.close()
+
+    assert other_file.exists()
+    assert not os.path.exists(cache.directory)
+
+
+def test_failed_download_leaves_no_temporary_file(tmp_path):
+    client = FakeBlobServiceClient()
+    client.blobs['a.csv'] = (b'hello', 'etag-1')
+    client.fail = True
+    cache = BlobDiskCache(directory=str(tmp_path))
+
+    with pytest.raises(ConnectionError):
+        cache.read(client, 'container', 'a.csv')
+
+    assert os.listdir(cache.directory) == []
+    assert cache.stats()['entries'] == 0
+    cache.close()
+
+
+def test_dead_processes_cache_directories_are_removed(tmp_path):
+    dead_pid = 2 ** 22 + 1  # Above the Linux "pid_max"
+    for name in (str(dead_pid), '1', 'not-a-pid'):
+        (tmp_path / name).mkdir()
+
+    cache = BlobDiskCache(directory=str(tmp_path))
+
+    assert sorted(os.listdir(tmp_path)) == sorted(['1', 'not-a-pid', str(os.getpid())])
+    cache.close()
@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from azure.core.exceptions import ServiceRequestError
+from modules.core.services.azure import cosmosdb_aio, cosmosdb_common
+from modules.core.services.azure.cosmosdb_aio import AsyncCosmosDB
+from modules.core.services.azure.cosmosdb_local import LocalCosmosContainer
+
+
+class AsyncLocalCosmosContainer:
+    """
+    Awaitable point operations of a "LocalCosmosContainer"
+    (the surface of an "azure.cosmos.aio" ContainerProxy used by the bulk methods)
+    """
+
+    def __init__(self, container: LocalCosmosContainer) -> None:
+        self.container = container
+        self.id = container.id
+
+    def __getattr__(self, name: str):
+        method = getattr(self.container, name)
+
+        async def call(*args, **kwargs):
+            await asyncio.sleep(0)
+            return method(*args, **kwargs)
+        return call
+
+
+def test_async_bulk_upsert_items_succeeds():
+    container = LocalCosmosContainer()
+    items = [{'id': str(index)} for index in range(50)]
+
+    outcomes = asyncio.run(AsyncCosmosDB().bulk_upsert_items(
+        AsyncLocalCosmosContainer(container), items, max_concurrency=8))
+
+    assert [outcome['index'] for outcome in outcomes] == list(range(50))
+    assert all(outcome['error'] is None for outcome in outcomes)
+    assert len(container.items) == 50
+
+
+def test_async_throttled_operations_are_retried():
+    # 429s injected whenever more than 2 requests are in flight
+    container = LocalCosmosContainer(max_concurrent_requests=2, retry_after_ms=1, latency_ms=5)
+    items = [{'id': str(index)} for index in range(40)]
+
+    async def create_items():
+        def create_item(body, **kwargs):
+            return asyncio.to_thread(container.create_item, body)
+        return await AsyncCosmosDB().bulk_execute(
+            [(create_item, {'body': item}) for item in items], max_concurrency=8)
+
+    outcomes = asyncio.run(create_items())
+
+    assert all(outcome['error'] is None for outcome in outcomes)
+    assert container.throttled_requests > 0
+    assert sum(outcome['retries'] for outcome in outcomes) == container.throttled_requests
+    assert len(container.items) == 40
+
+
+def test_async_bulk_client_leaves_the_429s_to_bulk_execute(monkeypatch):
+    class FakeCosmosClient:
+        def __init__(self, url, credential, **kwargs):
+            self.kwargs = kwargs
+
+        async def __aenter__(self):
+            return self
+
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(cosmosdb_aio, 'CosmosClient', FakeCosmosClient)
+    monkeypatch.setattr(cosmosdb_aio, 'COSMOS_BULK_SDK_THROTTLE_RETRIES', 0)
+
+    async def get_clients():
+        try:
+            return await AsyncCosmosDB().get_bulk_client(), await AsyncCosmosDB().get_bulk_client()
+        finally:
+            await cosmosdb_aio.close_async_cosmos_client()
+
+    first, second = asyncio.run(get_clients())
+
+    assert first is second
+    retry_options = first.kwargs['connection_policy'].RetryOptions
+    assert retry_options.MaxRetryAttemptCount == 0
+
+
+def test_async_throttled_operation_fails_after_max_retries():
+    container = AsyncLocalCosmosContainer(
+        LocalCosmosContainer(throttle_rate=1.0, retry_after_ms=1))
+
+    outcomes = asyncio.run(AsyncCosmosDB().bulk_execute(
+        [(container.upsert_item, {'body': {'id': '1'}})], max_retries=2))
+
+    assert outcomes[0]['status_code'] == 429
+    assert outcomes[0]['retries'] == 2
+    assert outcomes[0]['item'] is None
+
+
+def test_async_unexpected_error_releases_the_concurrency_slot():
+    container = LocalCosmosContainer()
+    calls = []
+
+    async def unreachable(**kwargs):
+        calls.append(kwargs)
+        raise ServiceRequestError('Connection refused')
+
+    # A single slot: a leaked one would block every following operation
+    operations = [(unreachable, {'body': {'id': '1'}})] + [
+        (AsyncLocalCosmosContainer(container).upsert_item, {'body': {'id': str(index)}})
+        for index in range(2, 6)]
+
+    with pytest.raises(ServiceRequestError):
+        asyncio.run(AsyncCosmosDB().bulk_execute(operations, max_concurrency=1))
+
+    assert len(calls) == 1
+
+
+def test_async_bulk_delete_items_by_partition(monkeypatch):
+    monkeypatch.setitem(cosmosdb_common.CONTAINERS_PARTITION_KEYS, 'by_user', '/user_id')
+    container = LocalCosmosContainer(id='by_user', partition_key_path='/user_id')
+    for index in range(5):
+        container.upsert_item({'id': str(index), 'user_id': 1})
+
+    outcomes = asyncio.run(AsyncCosmosDB().bulk_delete_items(
+        AsyncLocalCosmosContainer(container), ['0', '1', '2'],
+        partition_keys={'0': 1, '1': 1, '2': 1}))
+
+    assert [outcome['id'] for outcome in outcomes] == ['0', '1', '2']
+    assert all(outcome['error'] is None for outcome in outcomes)
+    assert sorted(container.items) == ['3', '4']
@@ -0,0 +1,89 @@
+import pytest
+from azure.core.exceptions import ServiceRequestError
+from azure.cosmos.exceptions import CosmosHttpResponseError
+from modules.core.services.azure import cosmosdb_common
+from modules.core.services.azure.cosmosdb import CosmosDB
+from modules.core.services.azure.cosmosdb_local import LocalCosmosContainer
+
+
+def test_bulk_upsert_items_succeeds():
+    container = LocalCosmosContainer()
+    items = [{'id': str(index)} for index in range(50)]
+
+    outcomes = CosmosDB().bulk_upsert_items(container, items, max_concurrency=8)
+
+    assert [outcome['index'] for outcome in outcomes] == list(range(50))
+    assert all(outcome['error'] is None for outcome in outcomes)
+    assert len(container.items) == 50
+
+
+def test_throttled_operations_are_retried():
+    container = LocalCosmosContainer(max_concurrent_requests=2, retry_after_ms=1, latency_ms=5)
+    items = [{'id': str(index)} for index in range(40)]
+
+    outcomes = CosmosDB().bulk_create_items(container, items, max_concurrency=8)
+
+    assert all(outcome['error'] is None for outcome in outcomes)
+    assert container.throttled_requests > 0
+    assert sum(outcome['retries'] for outcome in outcomes) == container.throttled_requests
+    assert len(container.items) == 40
+
+
+def test_throttled_operation_fails_after_max_retries():
+    container = LocalCosmosContainer(throttle_rate=1.0, retry_after_ms=1)
+
+    outcomes = CosmosDB().bulk_execute(
+        [(container.upsert_item, {'body': {'id': '1'}})], max_retries=2)
+
+    assert outcomes[0]['status_code'] == 429
+    assert outcomes[0]['retries'] == 2
+    assert outcomes[0]['item'] is None
+
+
+def test_failed_operation_does_not_stop_the_others():
+    container = LocalCosmosContainer()
+    container.upsert_item({'id': '1'})
+
+    outcomes = CosmosDB().bulk_create_items(
+        container, [{'id': '1'}, {'id': '2'}], max_concurrency=2)
+
+    assert outcomes[0]['status_code'] == 409
+    assert outcomes[0]['error'] is not None
+    assert outcomes[1]['error'] is None
+    with pytest.raises(CosmosHttpResponseError):
+        CosmosDB().create_items(container, [{'id': '2'}])
+
+
+def test_unexpected_error_releases_the_concurrency_slot():
+    container = LocalCosmosContainer()
+    calls = []
+
+    def unreachable(**kwargs):
+        calls.append(kwargs)
+        raise ServiceRequestError('Connection refused')
+
+    # A single slot: a leaked one would block every following operation
+    operations = [(unreachable, {'body': {'id': '1'}})] + [
+        (container.upsert_item, {'body': {'id': str(index)}}) for index in range(2, 6)]
+
+    with pytest.raises(ServiceRequestError):
+        CosmosDB().bulk_execute(operations, max_concurrency=1)
+
+    assert len(calls) == 1
+    assert len(container.items) == 4
+
+
+def test_bulk_delete_items_by_partition(monkeypatch):
+    monkeypatch.setitem(cosmosdb_common.CONTAINERS_PARTITION_KEYS, 'by_user', '/user_id')
+    container = LocalCosmosContainer(id='by_user', partition_key_path='/user_id')
+    for index in range(5):
+        container.upsert_item({'id': str(index), 'user_id': 1})
+
+    outcomes = CosmosDB().bulk_delete_items(
+        container, ['0', '1', '2', '9'],
+        partition_keys={'0': 1, '1': 1, '2': 1, '9': 1})
+
+    assert [outcome['id'] for outcome in outcomes] == ['0', '1', '2', '9']
+    # "9" doesn't exist, so its whole transactional batch is rolled back
+    assert all(outcome['status_code'] == 404 for outcome in outcomes)
+    assert sorted(container.items) == ['0', '1', '2', '3', '4']
@@ -0,0 +1,105 @@
+import time
+import pytest
+from modules.core.services.email import notification_coalescer as coalescer_module
+from modules.core.services.email.notification_coalescer import NotificationCoalescer
+from modules.core.services.utils.task_dispatcher import TaskDispatcher
+
+TEMPLATE = 'azure_integration_files_uploaded.html'
+
+
+@pytest.fixture
+def sent_emails(monkeypatch):
+    emails = []
+
+    class FakeEmail:
+        def send_email(self, **kwargs):
+            emails.append(kwargs)
+
+    monkeypatch.setattr(coalescer_module, 'Email', FakeEmail)
+    return emails
+
+
+def upload_event(file_name: str):
+    return {'partial_or_all': 'All', 'file_names': [file_name], 'upload_date': '2026-10-19'}
+
+
+def test_lone_notification_is_sent_with_its_template(sent_emails):
+    coalescer = NotificationCoalescer(window_seconds=0)
+
+    coalescer.notify('user@example.com', TEMPLATE, upload_event('a.csv'), 'Files uploaded')
+
+    assert sent_emails[0]['template'] == TEMPLATE
+    assert sent_emails[0]['render_vars'] == upload_event('a.csv')
+
+
+def test_digest_embeds_only_the_item_block_of_each_event(sent_emails):
+    coalescer = NotificationCoalescer(window_seconds=60, max_events=3)
+
+    for file_name in ('a.csv', 'b.csv', 'c.csv'):
+        coalescer.notify('user@example.com', TEMPLATE, upload_event(file_name), 'Files uploaded')
+    coalescer.close()
+
+    assert len(sent_emails) == 1
+    body = sent_emails[0]['body']
+    assert sent_emails[0]['subject'] == 'Files uploaded (3 notifications)'
+    for file_name in ('a.csv', 'b.csv', 'c.csv'):
+        assert f'<li>{file_name}</li>' in body
+    # A single greeting and signature: the digest ones
+    assert body.count('Hello!') == 1
+    assert body.count('Digital Innovation Team') == 1
+
+
+class FlakyEmail:
+    """
+    "Email" failing its first "failures" sends (e.g. Service Bus unavailable)
+    """
+    failures = 0
+    sent = []
+
+    def send_email(self, **kwargs):
+        if FlakyEmail.failures > 0:
+            FlakyEmail.failures -= 1
+            raise ConnectionError('Service Bus unavailable')
+        FlakyEmail.sent.append(kwargs)
+
+
+@pytest.fixture
+def dispatcher(monkeypatch):
+    dispatcher = TaskDispatcher(workers=1, max_attempts=3, retry_backoff_seconds=0.01)
+    monkeypatch.setattr(coalescer_module, 'task_dispatcher', dispatcher)
+    monkeypatch.setattr(coalescer_module, 'Email', FlakyEmail)
+    monkeypatch.setattr(FlakyEmail, 'sent', [])
+    dispatcher.start()
+    yield dispatcher
+    dispatcher.stop()
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Timed out'
+        time.sleep(0.01)
+
+
+def test_failed_send_is_retried_by_the_task_dispatcher(dispatcher, monkeypatch):
+    monkeypatch.setattr(FlakyEmail, 'failures', 1)
+    coalescer = NotificationCoalescer(window_seconds=0)
+
+    coalescer.notify('user@example.com', TEMPLATE, upload_event('a.csv'), 'Files uploaded')
+    wait_until(lambda: dispatcher.snapshot()['succeeded'] == 1)
+
+    assert len(FlakyEmail.sent) == 1
+    assert dispatcher.snapshot()['retried'] == 1
+    assert coalescer.stats['emails'] == 1
+
+
+def test_send_failing_every_attempt_is_a_dispatcher_failure(dispatcher, monkeypatch):
+    monkeypatch.setattr(FlakyEmail, 'failures', 3)
+    coalescer = NotificationCoalescer(window_seconds=0)
+
+    coalescer.notify('user@example.com', TEMPLATE, upload_event('a.csv'), 'Files uploaded')
+    wait_until(lambda: dispatcher.snapshot()['failed'] == 1)
+
+    assert FlakyEmail.sent == []
+    assert dispatcher.snapshot()['failures'] == {'NotificationCoalescer.send': 1}
+    assert coalescer.stats['emails'] == 0
@@ -0,0 +1,103 @@
+import pytest
+from modules.core.services.azure.service_bus import (
+    AzureServiceBusService, ServiceBusCoalescingSender, ServiceBusSenderPool
+)
+
+
+@pytest.fixture
+def sent_batches(monkeypatch):
+    batches = []
+
+    def send_batched(self, messages, queue_name=None):
+        batches.append(list(messages))
+        return [{'indexes': list(range(len(messages))), 'error': None}]
+
+    monkeypatch.setattr(AzureServiceBusService, 'send_batched', send_batched)
+    return batches
+
+
+def test_submissions_in_the_window_are_sent_together(sent_batches):
+    coalescing_sender = ServiceBusCoalescingSender('emails', linger_seconds=0.2)
+
+    futures = [coalescing_sender.submit([f'message-{index}']) for index in range(10)]
+    for future in futures:
+        future.result(timeout=5)
+    coalescing_sender.close()
+
+    assert sum(len(batch) for batch in sent_batches) == 10
+    assert len(sent_batches) < 10
+
+
+def test_close_sends_everything_submitted_before(sent_batches):
+    coalescing_sender = ServiceBusCoalescingSender('emails', linger_seconds=1, max_messages=3)
+
+    futures = [coalescing_sender.submit([f'message-{index}']) for index in range(10)]
+    coalescing_sender.close()
+
+    for future in futures:
+        assert future.result(timeout=0) is None
+    assert sum(len(batch) for batch in sent_batches) == 10
+
+
+def test_submit_is_rejected_after_close(sent_batches):
+    coalescing_sender = ServiceBusCoalescingSender('emails')
+    coalescing_sender.close()
+
+    with pytest.raises(Exception, match='is closed'):
+        coalescing_sender.submit(['message'])
+
+
+def test_send_error_is_set_in_the_futures(monkeypatch):
+    def send_batched(self, messages, queue_name=None):
+        raise ConnectionError('Service Bus unavailable')
+
+    monkeypatch.setattr(AzureServiceBusService, 'send_batched', send_batched)
+    coalescing_sender = ServiceBusCoalescingSender('emails', linger_seconds=0.01)
+
+    future = coalescing_sender.submit(['message'])
+    coalescing_sender.close()
+
+    with pytest.raises(ConnectionError):
+        future.result(timeout=0)
+
+
+class FakeServiceBusClient:
+    """
+    ServiceBusClient whose senders only record that they were closed
+    """
+
+    def __init__(self) -> None:
+        self.closed = False
+
+    def get_queue_sender(self, queue_name: str):
+        return FakeServiceBusSender()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeServiceBusSender(FakeServiceBusClient):
+
+    def __enter__(self):
+        return self
+
+
+def test_each_pooled_sender_has_its_own_client():
+    clients = []
+
+    def client_factory():
+        clients.append(FakeServiceBusClient())
+        return clients[-1]
+
+    pool = ServiceBusSenderPool(client_factory, 'emails', max_size=2)
+    first, second = pool.acquire(), pool.acquire()
+
+    assert len(clients) == 2
+    assert pool.clients == {first: clients[0], second: clients[1]}
+
+    pool.release(first)
+    pool.discard(second)
+
+    assert second.closed and clients[1].closed
+    assert pool.acquire() is first
+    assert pool.clients == {first: clients[0]}
@@ -0,0 +1,89 @@
+import json
+import threading
+from modules.core.services.azure.service_bus import AzureServiceBusService
+from modules.core.services.azure.service_bus_worker import ServiceBusWorker
+from modules.core.services.azure.service_bus_local import (
+    LocalServiceBusClient, LocalServiceBusMessage
+)
+
+
+def run_worker(client: LocalServiceBusClient, handler, **kwargs):
+    return ServiceBusWorker(
+        'emails', handler, servicebus_client=client, max_wait_time=0.05,
+        lock_renewal_seconds=0, stop_when_idle=True, **kwargs).run()
+
+
+def enqueue(client: LocalServiceBusClient, bodies):
+    for body in bodies:
+        client.get_queue('emails').put(LocalServiceBusMessage(json.dumps(body)))
+
+
+def test_handled_messages_are_completed():
+    client = LocalServiceBusClient()
+    enqueue(client, [{'index': index} for index in range(25)])
+    handled = []
+
+    stats = run_worker(client, handled.append, receivers=2, batch_size=10)
+
+    assert sorted(body['index'] for body in handled) == list(range(25))
+    assert stats['completed'] == 25
+    assert stats['abandoned'] == 0
+    assert client.completed['emails'] == 25
+
+
+def test_failed_message_is_abandoned_and_delivered_again():
+    client = LocalServiceBusClient()
+    enqueue(client, [{'index': 1}])
+    attempts = []
+
+    def flaky_handler(body):
+        attempts.append(body)
+        if len(attempts) == 1:
+            raise ConnectionError('SMTP server unavailable')
+
+    stats = run_worker(client, flaky_handler, receivers=1)
+
+    assert len(attempts) == 2
+    assert stats['abandoned'] == 1
+    assert stats['completed'] == 1
+    assert client.dead_letters['emails'] == []
+
+
+def test_message_failing_every_delivery_is_dead_lettered():
+    client = LocalServiceBusClient(max_delivery_count=3)
+    enqueue(client, [{'index': 1}, {'index': 2}])
+
+    def handler(body):
+        if body['index'] == 2:
+            raise ValueError('Invalid email')
+
+    stats = run_worker(client, handler, receivers=1)
+
+    assert stats['completed'] == 1
+    assert stats['abandoned'] == 3
+    assert [json.loads(str(message)) for message in client.dead_letters['emails']] == [
+        {'index': 2}]
+
+
+def test_each_receiver_thread_opens_its_own_client(monkeypatch):
+    queues = LocalServiceBusClient()
+    enqueue(queues, [{'index': index} for index in range(10)])
+    threads = {}
+
+    class ThreadClient:
+        def get_queue_receiver(self, **kwargs):
+            threads[threading.current_thread().name] = self
+            return queues.get_queue_receiver(**kwargs)
+
+        def close(self):
+            pass
+
+    monkeypatch.setattr(AzureServiceBusService, 'get_servicebus_client', lambda self: ThreadClient())
+
+    stats = ServiceBusWorker(
+        'emails', lambda body: None, receivers=3, max_wait_time=0.05,
+        lock_renewal_seconds=0, stop_when_idle=True).run()
+
+    assert stats['completed'] == 10
+    assert len(threads) == 3
+    assert len(set(map(id, threads.values()))) == 3
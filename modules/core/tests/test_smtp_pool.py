@@ -0,0 +1,69 @@
+import time
+import pytest
+from modules.core.services.email.smtp_local import LocalSMTPServer
+from modules.core.services.email.smtp_mail import SMTPConnectionPool, SMTPEmail
+
+
+@pytest.fixture
+def smtp_server():
+    server = LocalSMTPServer().start()
+    yield server
+    server.stop()
+
+
+def local_smtp_email(server: LocalSMTPServer, **pool_options) -> SMTPEmail:
+    smtp_email = SMTPEmail(server.host, server.port, None)
+    smtp_email.pool = SMTPConnectionPool(
+        server.host, server.port, 'sender@example.com', use_tls=False, **pool_options)
+    return smtp_email
+
+
+def send(smtp_email: SMTPEmail, subject: str):
+    smtp_email.send_html_mail(
+        '<p>Hello</p>', subject, ['user@example.com'], from_email='sender@example.com')
+
+
+def wait_until_dropped(server: LocalSMTPServer):
+    deadline = time.monotonic() + 5
+    while server._connections and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_connection_is_reused(smtp_server):
+    smtp_email = local_smtp_email(smtp_server)
+
+    for index in range(5):
+        send(smtp_email, f'Email {index}')
+
+    assert len(smtp_server.messages) == 5
+    assert smtp_email.pool.stats['connections'] == 1
+    smtp_email.pool.close()
+
+
+def test_idle_connection_closed_by_the_server_is_replaced(smtp_server):
+    smtp_email = local_smtp_email(smtp_server, health_check_seconds=0)
+    send(smtp_email, 'Before')
+
+    smtp_server.drop_connections()
+    wait_until_dropped(smtp_server)
+    send(smtp_email, 'After')
+
+    assert len(smtp_server.messages) == 2
+    # The NOOP health check found it closed before the send
+    assert smtp_email.pool.stats['reconnections'] == 1
+    assert smtp_email.pool.stats['connections'] == 2
+    smtp_email.pool.close()
+
+
+def test_send_on_a_dropped_connection_is_retried(smtp_server):
+    smtp_email = local_smtp_email(smtp_server, health_check_seconds=3600)
+    send(smtp_email, 'Before')
+
+    smtp_server.drop_connections()
+    wait_until_dropped(smtp_server)
+    send(smtp_email, 'After')
+
+    assert [message['data'].count(b'Subject: After') for message in smtp_server.messages] == [0, 1]
+    assert smtp_email.pool.stats['connections'] == 2
+    assert smtp_email.pool.size == 1
+    smtp_email.pool.close()
@@ -0,0 +1,137 @@
+import time
+import threading
+from modules.core.services.azure import blob_storage
+from modules.core.services.utils.task_dispatcher import TaskDispatcher
+from modules.core.services.azure.blob_storage import AzureBlobStorageService
+
+
+def wait_until(condition, timeout: float = 5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'Timed out'
+        time.sleep(0.01)
+
+
+class FakeNotificationCoalescer:
+
+    def __init__(self) -> None:
+        self.notifications = []
+
+    def notify(self, **kwargs):
+        self.notifications.append(kwargs)
+
+
+def test_dispatch_runs_inline_when_not_started():
+    dispatcher = TaskDispatcher(workers=1)
+    calls = []
+
+    dispatcher.dispatch(calls.append, 'done')
+
+    assert calls == ['done']
+    assert dispatcher.snapshot()['inline'] == 1
+    assert dispatcher.snapshot()['succeeded'] == 1
+
+
+def test_failed_task_is_retried_then_succeeds():
+    dispatcher = TaskDispatcher(workers=2, max_attempts=3, retry_backoff_seconds=0.01)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise Exception('Transient error')
+
+    dispatcher.start()
+    try:
+        dispatcher.dispatch(flaky)
+        wait_until(lambda: dispatcher.snapshot()['succeeded'] == 1)
+    finally:
+        dispatcher.stop()
+
+    snapshot = dispatcher.snapshot()
+    assert len(attempts) == 3
+    assert snapshot['retried'] == 2
+    assert snapshot['failed'] == 0
+
+
+def test_task_failing_every_attempt_is_counted_as_failure():
+    dispatcher = TaskDispatcher(workers=1, max_attempts=2, retry_backoff_seconds=0.01)
+
+    def broken():
+        raise Exception('Permanent error')
+
+    dispatcher.start()
+    try:
+        dispatcher.dispatch(broken)
+        wait_until(lambda: dispatcher.snapshot()['failed'] == 1)
+    finally:
+        dispatcher.stop()
+
+    snapshot = dispatcher.snapshot()
+    assert snapshot['retried'] == 1
+    assert snapshot['failures'] == {'test_task_failing_every_attempt_is_counted_as_failure.<locals>.broken': 1}
+
+
+def test_full_queue_runs_the_task_in_the_caller():
+    dispatcher = TaskDispatcher(workers=1, max_queue_size=1, put_timeout=0.01)
+    release = threading.Event()
+    callers = []
+
+    dispatcher.start()
+    try:
+        dispatcher.dispatch(release.wait)  # Keeps the single worker busy
+        wait_until(lambda: dispatcher.queue.empty())
+        dispatcher.dispatch(lambda: None)  # Fills the queue
+        dispatcher.dispatch(lambda: callers.append(threading.current_thread()))
+    finally:
+        release.set()
+        dispatcher.stop()
+
+    assert callers == [threading.main_thread()]
+    assert dispatcher.snapshot()['inline'] == 1
+    assert dispatcher.snapshot()['succeeded'] == 3
+
+
+def test_stop_runs_the_queued_tasks():
+    dispatcher = TaskDispatcher(workers=1)
+    calls = []
+
+    dispatcher.start()
+    for index in range(20):
+        dispatcher.dispatch(calls.append, index)
+    dispatcher.stop()
+
+    assert sorted(calls) == list(range(20))
+    assert not dispatcher.is_running
+
+
+def test_notify_uploader_user_notifies_once_inline(monkeypatch):
+    coalescer = FakeNotificationCoalescer()
+    monkeypatch.setattr(blob_storage, 'notification_coalescer', coalescer)
+    monkeypatch.setattr(blob_storage, 'task_dispatcher', TaskDispatcher(workers=1))
+
+    AzureBlobStorageService().notify_uploader_user(['a.csv'], ['a.csv'], 'user@domain.com')
+
+    assert len(coalescer.notifications) == 1
+    assert coalescer.notifications[0]['recipient'] == 'user@domain.com'
+    assert coalescer.notifications[0]['render_vars']['partial_or_all'] == 'All'
+
+
+def test_notify_uploader_user_notifies_once_from_a_worker(monkeypatch):
+    coalescer = FakeNotificationCoalescer()
+    dispatcher = TaskDispatcher(workers=2)
+    monkeypatch.setattr(blob_storage, 'notification_coalescer', coalescer)
+    monkeypatch.setattr(blob_storage, 'task_dispatcher', dispatcher)
+
+    dispatcher.start()
+    try:
+        AzureBlobStorageService().notify_uploader_user(
+            ['a.csv'], ['a.csv', 'b.csv'], 'user@domain.com', error=True)
+        wait_until(lambda: dispatcher.snapshot()['succeeded'] == 1)
+    finally:
+        dispatcher.stop()
+
+    snapshot = dispatcher.snapshot()
+    assert snapshot['dispatched'] == 1
+    assert len(coalescer.notifications) == 1
+    assert coalescer.notifications[0]['template'] == 'azure_integration_files_upload_error.html'